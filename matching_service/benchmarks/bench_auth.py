@@ -0,0 +1,61 @@
+"""
+Requests/sec for an authenticated API call with Basic authentication (password hasher
+on every request) versus a signed Bearer token from ``auth/token/``.
+
+    python -m benchmarks.bench_auth --requests 200
+
+Requests go through the full Django/DRF stack in-process (``django.test.Client``), so
+the numbers compare per-request server cost without network noise.
+"""
+import argparse
+import base64
+import time
+
+from .support import setup_django, test_database
+
+setup_django()
+
+from django.test import Client, override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from user.authentication import user_cache  # noqa: E402
+from user.models import CustomUser  # noqa: E402
+
+
+def requests_per_second(client, url, requests, **headers):
+    client.get(url, **headers)
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(url, **headers)
+        assert response.status_code == 200, response.status_code
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    with test_database():
+        CustomUser.objects.create_user(username='bench', password='bench-password')
+        client = Client()
+        url = reverse('user-request-status')
+        token = client.post(reverse('auth-token'), {'username': 'bench', 'password': 'bench-password'}).json()['token']
+        basic = base64.b64encode(b'bench:bench-password').decode()
+
+        results = {
+            'basic': requests_per_second(client, url, args.requests, HTTP_AUTHORIZATION=f'Basic {basic}'),
+            'bearer': requests_per_second(client, url, args.requests, HTTP_AUTHORIZATION=f'Bearer {token}'),
+        }
+        user_cache.clear()
+        with override_settings(MATCHING_AUTH_USER_CACHE_SECONDS=0):
+            results['bearer, no user cache'] = requests_per_second(client, url, args.requests,
+                                                                   HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        print(f"{'auth':>22} {'req/s':>10}")
+        for label, rate in results.items():
+            print(f"{label:>22} {rate:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
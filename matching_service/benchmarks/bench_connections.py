@@ -0,0 +1,89 @@
+"""
+Per-request database cost with a new connection per request (CONN_MAX_AGE=0), persistent
+connections (CONN_MAX_AGE>0), and the pooled backend, from several threads at once.
+
+    python -m benchmarks.bench_connections --threads 8 --requests 200 --pool-size 4
+
+Each simulated request runs what Django does around a view: close_if_unusable_or_obsolete()
+when it starts and finishes, plus a primary-key lookup. The pool is deliberately smaller
+than the thread count so checkout waits show up in its stats.
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from .support import setup_django, test_database
+
+setup_django()
+
+from django.db import connection  # noqa: E402
+from django.db.utils import load_backend  # noqa: E402
+
+from matching_service.db.backends.pooled_postgresql.base import close_pools, pool_stats  # noqa: E402
+from user.models import CustomUser  # noqa: E402
+
+POOLED_ENGINE = 'matching_service.db.backends.pooled_postgresql'
+
+
+def run(settings_dict, threads, requests):
+    """Per-request latencies, in ms, across ``threads`` threads each with its own connection."""
+    latencies = []
+    lock = threading.Lock()
+    user_id = CustomUser.objects.values_list('id', flat=True).first()
+
+    def worker():
+        wrapper = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict)
+        timings = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            wrapper.close_if_unusable_or_obsolete()
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT username FROM user_customuser WHERE id = %s', [user_id])
+                cursor.fetchone()
+            wrapper.close_if_unusable_or_obsolete()
+            timings.append((time.perf_counter() - start) * 1000)
+        wrapper.close()
+        with lock:
+            latencies.extend(timings)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--pool-size', type=int, default=4)
+    args = parser.parse_args()
+
+    with test_database():
+        CustomUser.objects.create_user(username='bench', password='bench-password')
+        base = dict(connection.settings_dict)
+        configs = {
+            'connect per request': dict(base, CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False),
+            'persistent': dict(base, CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=True),
+            'pooled': dict(base, ENGINE=POOLED_ENGINE, CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False,
+                           POOL=dict(base.get('POOL', {}), MAX_SIZE=args.pool_size)),
+        }
+
+        print(f"{'mode':>20} {'mean ms':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        for label, settings_dict in configs.items():
+            latencies = run(settings_dict, args.threads, args.requests)
+            p99 = statistics.quantiles(latencies, n=100)[98]
+            print(f"{label:>20} {statistics.mean(latencies):>9.3f} {statistics.median(latencies):>8.3f} {p99:>8.3f}")
+
+        stats = pool_stats()[base['NAME']]
+        print(f"\npool: {stats['connections_opened']} connections opened for {stats['checkouts']} checkouts, "
+              f"{stats['checkout_wait_seconds_total'] / stats['checkouts'] * 1000:.3f} ms mean checkout wait, "
+              f"{stats['checkout_wait_seconds_max'] * 1000:.1f} ms max, {stats['timeouts']} timeouts")
+        close_pools()
+
+
+if __name__ == '__main__':
+    main()
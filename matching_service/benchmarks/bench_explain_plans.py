@@ -0,0 +1,72 @@
+"""
+EXPLAIN the match-state hot-path queries with and without the indexes from
+``user/migrations/0002_match_state_indexes.py`` on a seeded PostgreSQL dataset.
+
+    python -m benchmarks.bench_explain_plans --users 1000000
+
+The dataset is ``support.seed_users`` with its request and match history, generated
+server-side so seeding 1M users takes seconds rather than hours of ORM inserts.
+"""
+import argparse
+
+from .support import seed_users, setup_django, test_database, timed
+
+setup_django()
+
+from django.db.models import Q  # noqa: E402
+
+from user.models import CustomUser, DeclinedMatch, MatchingRequest, MatchSuggestion, MatchUsers  # noqa: E402
+from user.utils.matching_algo import available_candidates  # noqa: E402
+
+INDEXED_MODELS = (CustomUser, MatchSuggestion, MatchingRequest, DeclinedMatch)
+
+
+def hot_path_queries(user):
+    return {
+        "available_candidates": available_candidates(18, 30, user),
+        "suggestion by user": MatchSuggestion.objects.filter(user1=user),
+        "request by sender/state": MatchingRequest.objects.filter(sender=user, state='Pending'),
+        "incoming requests": MatchingRequest.objects.filter(receiver=user, state='Pending'),
+        "match by sender/receiver": MatchUsers.objects.filter(Q(sender=user) | Q(receiver=user)),
+        "declined by user": DeclinedMatch.objects.filter(sender=user),
+        "declined user": DeclinedMatch.objects.filter(receiver=user),
+    }
+
+
+def explain_all(label, user):
+    print(f"\n===== {label} =====")
+    for name, queryset in hot_path_queries(user).items():
+        print(f"\n--- {name}")
+        print(queryset.explain(analyze=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with test_database() as connection:
+        if connection.vendor != 'postgresql':
+            raise SystemExit("EXPLAIN comparison requires PostgreSQL")
+
+        indexes = [(model, index) for model in INDEXED_MODELS for index in model._meta.indexes]
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.remove_index(model, index)
+
+        with timed(f"seeded {args.users} users"):
+            seed_users(connection, args.users, history=True)
+        user = CustomUser.objects.get(username=f"bench{args.users // 2}")
+        explain_all("without match-state indexes", user)
+
+        with timed("built match-state indexes"):
+            with connection.schema_editor() as editor:
+                for model, index in indexes:
+                    editor.add_index(model, index)
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        explain_all("with match-state indexes", user)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Users/sec when loading users with criteria and pool rows: per-row ``create_user`` (what
+RegisterView does), ``import_users`` with bulk_create, and ``import_users`` with COPY.
+
+    python -m benchmarks.bench_import --users 100000
+
+The per-row baseline hashes every password and is only run on ``--baseline-users`` rows.
+The import runs use ``--shared-password``, so the hasher runs once.
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+from io import StringIO
+
+from .support import setup_django, test_database
+
+setup_django()
+
+from django.core.management import call_command  # noqa: E402
+
+from user.models import CustomUser, MatchSuggestion  # noqa: E402
+from user.utils.matching_algo import create_match_suggestion, create_or_update_matching_criteria  # noqa: E402
+
+
+def write_users_csv(path, users, prefix):
+    with open(path, 'w', newline='') as out:
+        writer = csv.writer(out)
+        writer.writerow(['username', 'email', 'gender', 'age', 'min_age', 'max_age'])
+        for i in range(users):
+            age = 18 + (i * 37) % 63
+            writer.writerow([f'{prefix}{i}', f'{prefix}{i}@example.com', ('M', 'F', 'NS')[i % 3], age,
+                             max(18, age - 5), age + 5])
+
+
+def per_row(users):
+    start = time.perf_counter()
+    for i in range(users):
+        user = CustomUser.objects.create_user(username=f'row{i}', password='bench-password', age=18 + i % 63)
+        create_match_suggestion(user)
+        create_or_update_matching_criteria(user, 18, 40)
+    return users / (time.perf_counter() - start)
+
+
+def imported(tmp, prefix, users, *args):
+    path = os.path.join(tmp, f'{prefix}.csv')
+    write_users_csv(path, users, prefix)
+    before = MatchSuggestion.objects.count()
+    start = time.perf_counter()
+    call_command('import_users', path, '--shared-password', 'bench-password', *args, stderr=StringIO())
+    elapsed = time.perf_counter() - start
+    assert MatchSuggestion.objects.count() - before == users
+    return users / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--baseline-users', type=int, default=200)
+    args = parser.parse_args()
+
+    with test_database(), tempfile.TemporaryDirectory() as tmp:
+        results = {
+            'create_user per row': per_row(args.baseline_users),
+            'import, bulk_create': imported(tmp, 'bulk', args.users, '--no-copy'),
+            'import, COPY': imported(tmp, 'copy', args.users),
+        }
+
+    print(f"{'method':>22} {'users/s':>10}")
+    for label, rate in results.items():
+        print(f"{label:>22} {rate:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
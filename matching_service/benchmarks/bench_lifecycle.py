@@ -0,0 +1,91 @@
+"""
+Load-test the match lifecycle (``benchmarks/lifecycle.py``) at several pool sizes.
+
+    python -m benchmarks.bench_lifecycle --users 1000 100000 1000000 --lifecycles 300 --threads 4
+
+Each size gets a fresh test database seeded with ``support.seed_users``. A few warm-up
+lifecycles load the process-wide candidate pool and caches, then ``--threads`` drivers
+each run their share of ``--lifecycles``. The report gives throughput over the timed
+phase and p50/p95/p99 latency per endpoint.
+"""
+import argparse
+import threading
+import time
+from collections import defaultdict
+
+from .support import seed_users, setup_django, test_database, timed
+
+setup_django()
+
+from django.db import connection  # noqa: E402
+
+from .lifecycle import LifecycleDriver, requesters, summarize  # noqa: E402
+
+
+def load_test(lifecycles, threads, warmup):
+    pool = requesters(limit=(lifecycles + warmup) * 8)
+    warmup_driver = LifecycleDriver()
+    warmup_driver.run(pool, warmup)
+
+    drivers = [LifecycleDriver(seed=i) for i in range(threads)]
+    for driver in drivers:
+        driver.used |= warmup_driver.used
+    shares = [pool[i::threads] for i in range(threads)]
+    counts = [lifecycles // threads + (i < lifecycles % threads) for i in range(threads)]
+
+    def work(driver, share, count):
+        try:
+            driver.run(share, count)
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=work, args=args) for args in zip(drivers, shares, counts)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = defaultdict(list)
+    for driver in drivers:
+        for endpoint, samples in driver.latencies.items():
+            latencies[endpoint].extend(samples)
+    return elapsed, drivers, latencies
+
+
+def report(users, elapsed, drivers, latencies):
+    completed = sum(driver.lifecycles for driver in drivers)
+    requests = sum(len(samples) for samples in latencies.values())
+    print(f"\n{users} users: {completed} lifecycles in {elapsed:.2f}s, {completed / elapsed:.1f} lifecycles/s, "
+          f"{requests / elapsed:.1f} req/s; {sum(driver.conflicts for driver in drivers)} conflicts, "
+          f"{sum(driver.no_candidates for driver in drivers)} requesters without candidates")
+    errors = defaultdict(int)
+    for driver in drivers:
+        for endpoint, count in driver.errors.items():
+            errors[endpoint] += count
+    if errors:
+        print("server errors: " + ", ".join(f"{endpoint} {count}" for endpoint, count in errors.items()))
+    print(f"{'endpoint':>18} {'count':>7} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for endpoint, stats in summarize(latencies).items():
+        print(f"{endpoint:>18} {stats['count']:>7} {stats['mean']:>9.2f} {stats['p50']:>8.2f} "
+              f"{stats['p95']:>8.2f} {stats['p99']:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, nargs='+', default=[1000])
+    parser.add_argument('--lifecycles', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--warmup', type=int, default=5)
+    args = parser.parse_args()
+
+    for users in args.users:
+        with test_database() as db:
+            with timed(f"seed {users} users"):
+                seed_users(db, users)
+            report(users, *load_test(args.lifecycles, args.threads, args.warmup))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Latency of get-status polls computed from the live pool versus read from MaterializedSuggestion.
+
+    python -m benchmarks.bench_materialized --users 100000 --polls 200
+
+Each poll follows a pool change, so the candidate cache is always cold: the live path
+recomputes the user's candidates (from the in-memory pool) while the materialized path
+reads one row and re-checks its ids. Also reports the time for ``refresh_suggestions``
+to build every row and to catch up after a single user joins the pool.
+"""
+import argparse
+import statistics
+import time
+
+from .support import seed_users, setup_django, test_database, timed
+
+setup_django()
+
+from django.core.cache import cache  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from user.models import CustomUser  # noqa: E402
+from user.utils.matching_algo import create_match_suggestion  # noqa: E402
+from user.utils.materialized import SuggestionRefresher  # noqa: E402
+
+from .lifecycle import LifecycleDriver, percentile, requesters  # noqa: E402
+
+
+def poll_latencies(driver, pollers):
+    url = reverse('user-status')
+    driver.request('get-status', 'get', url, pollers[0])
+    samples = []
+    for user_id in pollers:
+        cache.clear()
+        start = time.perf_counter()
+        driver.request('get-status', 'get', url, user_id)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, nargs='+', default=[1000])
+    parser.add_argument('--polls', type=int, default=200)
+    args = parser.parse_args()
+
+    for users in args.users:
+        with test_database() as db:
+            with timed(f"seed {users} users"):
+                seed_users(db, users)
+            pool = requesters()
+            pollers = [user_id for user_id, age in pool[::max(1, len(pool) // args.polls)][:args.polls]]
+            driver = LifecycleDriver()
+            for user_id in pollers:
+                driver.headers(user_id)
+
+            with override_settings(MATCHING_MATERIALIZED_SUGGESTIONS=False):
+                live = poll_latencies(driver, pollers)
+
+            with override_settings(MATCHING_MATERIALIZED_SUGGESTIONS=True):
+                refresher = SuggestionRefresher()
+                start = time.perf_counter()
+                refresher.run()
+                full = time.perf_counter() - start
+                materialized = poll_latencies(driver, pollers)
+
+                joiner = CustomUser.objects.create_user(username='bench-joiner', age=30)
+                create_match_suggestion(joiner)
+                start = time.perf_counter()
+                refresher.run()
+                incremental = time.perf_counter() - start
+
+            print(f"\n{users} users: full refresh of {users} rows {full:.2f}s ({users / full:.0f} rows/s); "
+                  f"one joiner re-marked {refresher.marked} rows, caught up in {incremental:.2f}s")
+            print(f"{'get-status':>14} {'mean ms':>9} {'p50 ms':>8} {'p99 ms':>8}")
+            for label, samples in (('live', live), ('materialized', materialized)):
+                print(f"{label:>14} {statistics.mean(samples) * 1000:>9.2f} {percentile(samples, 50) * 1000:>8.2f} "
+                      f"{percentile(samples, 99) * 1000:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Per-middleware cost of an authenticated JSON API call, with Django's browser middleware
+versus the path-scoped classes in ``matching_service/middleware.py``.
+
+    python -m benchmarks.bench_middleware --requests 2000
+
+Each middleware is timed by wrapping its instance and taking the time spent inside it
+minus the time spent in the rest of the chain below it, plus its view hooks. Requests go through the full
+stack in-process (``django.test.Client``) with a Bearer token, so authentication is cheap
+and the middleware cost is visible.
+"""
+import argparse
+import time
+from collections import defaultdict
+
+from .support import setup_django, test_database
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.core.handlers import base  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from django.utils.module_loading import import_string  # noqa: E402
+
+from user.authentication import issue_token  # noqa: E402
+from user.models import CustomUser  # noqa: E402
+
+DJANGO_MIDDLEWARE = [
+    "user.instrumentation.InstrumentationMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "allauth.account.middleware.AccountMiddleware",
+]
+
+
+class Timings:
+    """Time spent in each middleware itself: its own call minus the rest of the chain, plus its hooks."""
+
+    def __init__(self):
+        self.exclusive = defaultdict(float)
+
+    def wrap(self, name, factory):
+        def timed_factory(get_response):
+            downstream = []
+
+            def timed_get_response(request):
+                start = time.perf_counter()
+                try:
+                    return get_response(request)
+                finally:
+                    downstream.append(time.perf_counter() - start)
+
+            instance = factory(timed_get_response)
+
+            def middleware(request):
+                downstream.clear()
+                start = time.perf_counter()
+                try:
+                    return instance(request)
+                finally:
+                    self.exclusive[name] += time.perf_counter() - start - sum(downstream)
+
+            # Keep (and time) the hooks Django collects from middleware instances.
+            for hook in ('process_view', 'process_exception', 'process_template_response'):
+                if hasattr(instance, hook):
+                    setattr(middleware, hook, self.timed_hook(name, getattr(instance, hook)))
+            return middleware
+        return timed_factory
+
+    def timed_hook(self, name, hook):
+        def timed(*args):
+            start = time.perf_counter()
+            try:
+                return hook(*args)
+            finally:
+                self.exclusive[name] += time.perf_counter() - start
+        return timed
+
+
+def run(middleware, url, token, requests):
+    timings = Timings()
+    original_import_string = base.import_string
+
+    def timed_import_string(path):
+        return timings.wrap(path, import_string(path)) if path in middleware else original_import_string(path)
+
+    base.import_string = timed_import_string
+    try:
+        with override_settings(MIDDLEWARE=middleware):
+            client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+            client.get(url)
+            timings.exclusive.clear()
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                for _ in range(requests):
+                    assert client.get(url).status_code == 200
+                total = time.perf_counter() - start
+    finally:
+        base.import_string = original_import_string
+
+    return total, len(queries) / requests, dict(timings.exclusive)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    with test_database():
+        user = CustomUser.objects.create_user(username='bench', password='bench-password')
+        token = issue_token(user)
+        url = reverse('user-request-status')
+        results = {
+            'django': run(DJANGO_MIDDLEWARE, url, token, args.requests),
+            'scoped': run(list(settings.MIDDLEWARE), url, token, args.requests),
+        }
+
+    print(f"{'middleware':>46} {'django us/req':>14} {'scoped us/req':>14}")
+    for django_path, scoped_path in zip(DJANGO_MIDDLEWARE, settings.MIDDLEWARE):
+        django_us = results['django'][2][django_path] / args.requests * 1e6
+        scoped_us = results['scoped'][2][scoped_path] / args.requests * 1e6
+        print(f"{django_path.rsplit('.', 1)[-1]:>46} {django_us:>14.1f} {scoped_us:>14.1f}")
+    for label, (total, queries, exclusive) in results.items():
+        print(f"{label}: {args.requests / total:.0f} req/s, {queries:.1f} queries/req, "
+              f"{sum(exclusive.values()) / args.requests * 1e6:.1f} us/req in middleware")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Time the global pairing engine (``user/utils/pairing.py``) on a seeded pool.
+
+    python -m benchmarks.bench_pairing --users 100000
+
+The pool is seeded with ``support.seed_users``.
+"""
+import argparse
+
+from .support import seed_users, setup_django, test_database, timed
+
+setup_django()
+
+from user.utils.batch_matching import load_declined_ids  # noqa: E402
+from user.utils.pairing import apply_pairs, compatible_edges, greedy_pairing, load_pool  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--neighbors', type=int, default=5)
+    parser.add_argument('--window', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    with test_database() as connection:
+        with timed(f"seed {args.users} users"):
+            seed_users(connection, args.users)
+        with timed("load pool and declines"):
+            pool = load_pool()
+            declined = load_declined_ids()
+        with timed("build compatibility graph"):
+            edges = compatible_edges(pool, declined, neighbors=args.neighbors, window=args.window)
+        print(f"  {len(edges)} edges over {len(pool)} users")
+        with timed("greedy pairing"):
+            pairs = greedy_pairing(pool, declined, neighbors=args.neighbors, window=args.window)
+        print(f"  {len(pairs)} pairs, {2 * len(pairs) / len(pool):.1%} of the pool paired")
+        written = 0
+        with timed(f"write pairs in batches of {args.batch_size}"):
+            for start in range(0, len(pairs), args.batch_size):
+                written += len(apply_pairs(pairs[start:start + args.batch_size]))
+        print(f"  {written} pairs written")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Compare UserProfileSerializer(many=True) on model instances with the ``.values()`` fast
+path in UserProfileListSerializer.
+
+    python -m benchmarks.bench_profile_serializer --rows 1000 10000 50000
+"""
+import argparse
+import time
+
+from .support import setup_django, test_database
+
+setup_django()
+
+from rest_framework import serializers  # noqa: E402
+
+from user.models import CustomUser  # noqa: E402
+from user.serializers import UserProfileSerializer  # noqa: E402
+
+
+def seed(rows):
+    CustomUser.objects.bulk_create(
+        CustomUser(username=f"bench{index}", password='!', email=f"bench{index}@example.com",
+                   first_name="Bench", last_name=str(index), gender='M', phone_number='555-555-5555',
+                   age=18 + index % 83)
+        for index in range(rows)
+    )
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with test_database():
+        seed(max(args.rows))
+        fields = UserProfileSerializer.Meta.fields
+        print(f"{'rows':>8} {'model serializer':>18} {'values fast path':>18} {'speedup':>8}")
+        for rows in args.rows:
+            queryset = CustomUser.objects.order_by('pk')[:rows]
+            model_path = best_of(args.repeat, lambda: serializers.ListSerializer(
+                queryset.all(), child=UserProfileSerializer()).data)
+            fast_path = best_of(args.repeat, lambda: UserProfileSerializer(
+                queryset.values(*fields), many=True).data)
+            print(f"{rows:>8} {model_path:>17.3f}s {fast_path:>17.3f}s {model_path / fast_path:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
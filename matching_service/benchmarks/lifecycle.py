@@ -0,0 +1,140 @@
+"""
+Drives the match lifecycle through the API for the load-test scripts and the
+pytest-benchmark tests:
+
+    get-a-match -> send-request -> incoming-requests -> accept / decline -> get-status
+
+Requests go through the full Django/DRF stack in-process (``django.test.Client``) with
+Bearer tokens, against users seeded with ``support.seed_users``.
+"""
+import random
+import statistics
+import time
+from collections import defaultdict
+
+from django.test import Client
+from django.urls import reverse
+
+from user.authentication import issue_token
+from user.models import CustomUser, MatchSuggestion
+
+ENDPOINTS = ('get-a-match', 'send-request', 'incoming-requests', 'accept', 'decline', 'get-status')
+
+
+class LifecycleDriver:
+    """
+    Runs lifecycles for requesters in ``(user_id, age)`` order and records each request's
+    latency per endpoint. Every ``decline_every``-th lifecycle declines instead of
+    accepting. Users already part of a lifecycle are skipped as requesters and as
+    candidates, and the candidate is picked at random from the first page. Concurrent
+    drivers may still pick the same user: a request that loses that race (HTTP 409) is
+    counted in ``conflicts``, a server error in ``errors``, and the lifecycle is abandoned.
+    """
+
+    def __init__(self, decline_every=3, search_span=10, seed=0):
+        self.client = Client(raise_request_exception=False)
+        self.decline_every = decline_every
+        self.search_span = search_span
+        self.random = random.Random(seed)
+        self.latencies = defaultdict(list)
+        self.lifecycles = 0
+        self.conflicts = 0
+        self.errors = defaultdict(int)
+        self.no_candidates = 0
+        self.used = set()
+        self._headers = {}
+
+    def headers(self, user_id):
+        headers = self._headers.get(user_id)
+        if headers is None:
+            token = issue_token(CustomUser.objects.only('password').get(pk=user_id))
+            headers = self._headers[user_id] = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        return headers
+
+    def request(self, endpoint, method, url, user_id, data=None):
+        headers = self.headers(user_id)
+        start = time.perf_counter()
+        if method == 'post':
+            response = self.client.post(url, data, content_type='application/json', **headers)
+        else:
+            response = self.client.get(url, **headers)
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        if response.status_code >= 500:
+            self.errors[endpoint] += 1
+        elif response.status_code >= 400 and response.status_code != 409:
+            raise AssertionError(f'{endpoint} returned {response.status_code}: {response.content[:200]!r}')
+        return response
+
+    def failed(self, response):
+        if response.status_code == 409:
+            self.conflicts += 1
+        return response.status_code >= 400
+
+    def run_one(self, requester_id, age):
+        """One lifecycle for ``requester_id``; False when it could not be completed."""
+        self.used.add(requester_id)
+        self.headers(requester_id)
+        criteria = {'min_age': max(18, age - self.search_span), 'max_age': min(100, age + self.search_span)}
+        response = self.request('get-a-match', 'post', reverse('get-a-match'), requester_id, criteria)
+        if self.failed(response):
+            return False
+        candidates = [match['pk'] for match in response.json().get('possible_matches', ())
+                      if match['pk'] not in self.used]
+        if not candidates:
+            self.no_candidates += 1
+            return False
+        receiver_id = self.random.choice(candidates)
+        self.used.add(receiver_id)
+        self.headers(receiver_id)
+
+        response = self.request('send-request', 'post',
+                                reverse('match-request-create', kwargs={'receiver_id': receiver_id}), requester_id)
+        if self.failed(response):
+            return False
+        if self.failed(self.request('incoming-requests', 'get', reverse('match-request-list'), receiver_id)):
+            return False
+        action = 'decline' if (self.lifecycles + 1) % self.decline_every == 0 else 'accept'
+        response = self.request(action, 'post', reverse(f'match-request-{action}', kwargs={'sender_id': requester_id}),
+                                receiver_id)
+        if self.failed(response):
+            return False
+        self.lifecycles += 1
+        self.failed(self.request('get-status', 'get', reverse('user-status'), requester_id))
+        return True
+
+    def run(self, requesters, lifecycles):
+        """Run until ``lifecycles`` complete or ``requesters`` (``(user_id, age)`` pairs) run out."""
+        completed = 0
+        for user_id, age in requesters:
+            if completed == lifecycles:
+                break
+            if user_id not in self.used and self.run_one(user_id, age):
+                completed += 1
+        return completed
+
+
+def requesters(limit=None):
+    """Unmatched users as ``(user_id, age)`` in id order, which seed_users spreads across ages."""
+    queryset = MatchSuggestion.objects.filter(state='Unmatched', user1__isnull=False).order_by(
+        'user1_id').values_list('user1_id', 'age')
+    return list(queryset[:limit] if limit else queryset)
+
+
+def percentile(samples, p):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[p - 1]
+
+
+def summarize(latencies):
+    """``{endpoint: {count, mean, p50, p95, p99}}`` in milliseconds."""
+    return {
+        endpoint: {
+            'count': len(samples),
+            'mean': statistics.mean(samples) * 1000,
+            'p50': percentile(samples, 50) * 1000,
+            'p95': percentile(samples, 95) * 1000,
+            'p99': percentile(samples, 99) * 1000,
+        }
+        for endpoint in ENDPOINTS if (samples := latencies.get(endpoint))
+    }
@@ -0,0 +1,98 @@
+"""
+Shared setup for the standalone benchmark scripts.
+
+Scripts are run from the project directory, e.g. ``python -m benchmarks.bench_explain_plans``.
+Each one works against a throwaway ``test_`` database created from the migrations, so the
+configured database is never touched.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "matching_service.settings")
+    django.setup()
+
+
+@contextmanager
+def test_database(keepdb=False):
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+SEED_SQL = """
+INSERT INTO {user} (password, last_login, is_superuser, username, first_name, last_name, email,
+                    is_staff, is_active, date_joined, gender, phone_number, age)
+SELECT '!', NULL, false, 'bench' || g, '', '', '', false, true, now(),
+       (ARRAY['M', 'F', 'NS'])[1 + g % 3], '', 18 + (g * 37) % 63
+FROM generate_series(1, {users}) AS g;
+
+INSERT INTO {suggestion} (user1_id, user2_id, state, age, gender)
+SELECT id, NULL, 'Unmatched', age, gender FROM {user};
+
+INSERT INTO {criteria} (user_id, min_age, max_age)
+SELECT id, GREATEST(18, age - 2 - id % 8), age + 2 + id % 8 FROM {user};
+
+INSERT INTO {declined} (sender_id, receiver_id, timestamp)
+SELECT id, first_id + (id * 104729) % {users}, now()
+FROM {user}, (SELECT min(id) AS first_id FROM {user}) AS seeded WHERE id % 4 = 0;
+"""
+
+HISTORY_SQL = """
+UPDATE {suggestion} SET state = 'Pending' WHERE user1_id % 10 >= 7;
+
+INSERT INTO {request} (sender_id, receiver_id, state)
+SELECT id, first_id + (id * 7919) % {users}, (ARRAY['Pending', 'Accepted', 'Declined'])[1 + id % 3]
+FROM {user}, (SELECT min(id) AS first_id FROM {user}) AS seeded WHERE id % 5 = 0;
+
+INSERT INTO {match} (sender_id, receiver_id)
+SELECT id, first_id + (id * 15485863) % {users}
+FROM {user}, (SELECT min(id) AS first_id FROM {user}) AS seeded WHERE id % 10 = 9;
+"""
+
+
+def seed_users(connection, users, history=False):
+    """
+    Seed ``users`` Unmatched users with ages 18-80, MatchingCriteria of ``age - spread ..
+    age + spread`` (narrower for some users, so not every pair is mutual) and a decline
+    history for a quarter of them. With ``history``, 30% of them are Pending instead and
+    there are matching requests and matches as well. The rows are generated server-side
+    with ``generate_series`` and expect an empty user table.
+    """
+    from user.models import CustomUser, DeclinedMatch, MatchingCriteria, MatchingRequest, MatchSuggestion, \
+        MatchUsers
+
+    params = {
+        'users': int(users),
+        'user': CustomUser._meta.db_table,
+        'suggestion': MatchSuggestion._meta.db_table,
+        'criteria': MatchingCriteria._meta.db_table,
+        'declined': DeclinedMatch._meta.db_table,
+        'request': MatchingRequest._meta.db_table,
+        'match': MatchUsers._meta.db_table,
+    }
+    sql = SEED_SQL + HISTORY_SQL if history else SEED_SQL
+    with connection.cursor() as cursor:
+        for statement in sql.format(**params).split(';'):
+            if statement.strip():
+                cursor.execute(statement)
+        cursor.execute("ANALYZE")
+
+
+@contextmanager
+def timed(label):
+    start = time.perf_counter()
+    yield
+    print(f"{label}: {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,61 @@
+"""
+pytest-benchmark versions of ``bench_lifecycle``, skipped unless the plugin is installed:
+
+    pytest benchmarks --benchmark-only
+    LIFECYCLE_BENCHMARK_USERS=100000 pytest benchmarks --benchmark-only
+
+Compare runs with ``--benchmark-autosave`` and ``--benchmark-compare``. Per-endpoint
+p50/p95/p99 of the lifecycle run are stored in its ``extra_info``.
+"""
+import os
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from django.db import connection  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from .lifecycle import LifecycleDriver, requesters, summarize  # noqa: E402
+from .support import seed_users  # noqa: E402
+
+USERS = int(os.environ.get('LIFECYCLE_BENCHMARK_USERS', 1000))
+
+
+@pytest.fixture
+def seeded_users(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        seed_users(connection, USERS)
+    return requesters()
+
+
+@pytest.mark.django_db
+def test_lifecycle(benchmark, seeded_users):
+    driver = LifecycleDriver()
+    pool = iter(seeded_users)
+
+    def lifecycle():
+        for user_id, age in pool:
+            if user_id not in driver.used and driver.run_one(user_id, age):
+                return
+
+    benchmark.pedantic(lifecycle, rounds=50, warmup_rounds=2)
+    assert driver.lifecycles == 52
+    benchmark.extra_info.update(users=USERS, endpoints=summarize(driver.latencies))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('endpoint', ['get-a-match', 'user-status', 'match-request-list'])
+def test_read_endpoint(benchmark, seeded_users, endpoint):
+    user_id, age = seeded_users[0]
+    driver = LifecycleDriver()
+    url = reverse(endpoint)
+    if endpoint == 'get-a-match':
+        call = driver.request, endpoint, 'post', url, user_id, {'min_age': max(18, age - 10), 'max_age': age + 10}
+    else:
+        # user-status lists candidates from the criteria get-a-match saved.
+        driver.request('get-a-match', 'post', reverse('get-a-match'), user_id, {'min_age': 18, 'max_age': 100})
+        call = driver.request, endpoint, 'get', url, user_id
+
+    response = benchmark(*call)
+    assert response.status_code < 300
@@ -0,0 +1,84 @@
+"""
+PostgreSQL backend that takes its connections from a process-wide ConnectionPool
+instead of opening a new one per connect().
+
+Configured like the stock backend plus an optional ``POOL`` dict in the database
+settings (MAX_SIZE, TIMEOUT, MAX_LIFETIME, CHECK_IDLE_AFTER; see ConnectionPool).
+Closing a connection returns it to the pool. CONN_MAX_AGE is ignored: a connection is
+always returned at the end of the request that checked it out, since a thread holding
+one between requests keeps it from every other thread and exhausts the pool.
+"""
+import os
+import threading
+import time
+
+from django.db.backends.postgresql import base, creation
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from .pool import ConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(conn_params, pool_settings, connect):
+    """The pool for these connection parameters in this process (pools are not shared across fork())."""
+    key = (os.getpid(), repr(sorted(conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(
+                connect,
+                max_size=pool_settings.get('MAX_SIZE', 10),
+                timeout=pool_settings.get('TIMEOUT', 10.0),
+                max_lifetime=pool_settings.get('MAX_LIFETIME', 1800.0),
+                check_idle_after=pool_settings.get('CHECK_IDLE_AFTER', 30.0),
+            )
+            pool.dbname = conn_params.get('dbname') or conn_params.get('database')
+        return pool
+
+
+def pool_stats():
+    """``{database name: ConnectionPool.stats()}`` for this process's pools."""
+    with _pools_lock:
+        pools = [pool for (pid, key), pool in _pools.items() if pid == os.getpid()]
+    return {pool.dbname: pool.stats() for pool in pools}
+
+
+def close_pools(dbname=None):
+    """Close (and forget) this process's pools, or only those connecting to ``dbname``."""
+    with _pools_lock:
+        keys = [key for key, pool in _pools.items() if dbname is None or pool.dbname == dbname]
+        pools = [_pools.pop(key) for key in keys]
+    for pool in pools:
+        pool.close()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would otherwise keep the test database in use.
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(conn_params, self.settings_dict.get('POOL', {}),
+                             lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        connection = self.pool.getconn()
+        self.isolation_level = IsolationLevel(
+            self.settings_dict['OPTIONS'].get('isolation_level', IsolationLevel.READ_COMMITTED))
+        return connection
+
+    def connect(self):
+        super().connect()
+        # Obsolete at once, so close_if_unusable_or_obsolete hands it back when the request ends.
+        self.close_at = time.monotonic()
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection)
@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import deque
+
+from psycopg2 import extensions
+from psycopg2 import Error, OperationalError
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    A bounded, thread-safe pool of psycopg2 connections made by ``connect()``.
+
+    ``getconn`` hands out the most recently returned idle connection, opens a new one
+    while fewer than ``max_size`` exist, and otherwise waits up to ``timeout`` seconds
+    for one to be returned (then raises PoolTimeout). Connections are recycled once
+    older than ``max_lifetime`` seconds. A connection that sat idle for more than
+    ``check_idle_after`` seconds is pinged before being handed out.
+    """
+
+    def __init__(self, connect, max_size=10, timeout=10.0, max_lifetime=1800.0, check_idle_after=30.0):
+        self._connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_idle_after = check_idle_after
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._in_use = {}
+        self._size = 0
+        self._closed = False
+        self._stats = dict.fromkeys(('connections_opened', 'checkouts', 'timeouts', 'recycled',
+                                     'health_check_failures'), 0)
+        self._stats.update(checkout_wait_seconds_total=0.0, checkout_wait_seconds_max=0.0)
+
+    def getconn(self):
+        start = time.monotonic()
+        while True:
+            entry = self._reserve(start)
+            if entry is None:
+                conn, created = self._open(), time.monotonic()
+            else:
+                conn, created, returned = entry
+                if not self._usable(conn, created, returned):
+                    self._discard(conn)
+                    continue
+            waited = time.monotonic() - start
+            with self._cond:
+                self._in_use[conn] = created
+                self._stats['checkouts'] += 1
+                self._stats['checkout_wait_seconds_total'] += waited
+                self._stats['checkout_wait_seconds_max'] = max(self._stats['checkout_wait_seconds_max'], waited)
+            return conn
+
+    def _reserve(self, start):
+        """An idle ``(conn, created, returned)`` entry, or None after reserving room for a new connection."""
+        with self._cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None
+                remaining = start + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f"No database connection available within {self.timeout}s "
+                                      f"({self.max_size} in use)")
+                self._cond.wait(remaining)
+
+    def _open(self):
+        try:
+            conn = self._connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats['connections_opened'] += 1
+        return conn
+
+    def _usable(self, conn, created, returned):
+        if conn.closed:
+            return False
+        now = time.monotonic()
+        if now - created > self.max_lifetime:
+            with self._cond:
+                self._stats['recycled'] += 1
+            return False
+        if now - returned > self.check_idle_after:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            except Error:
+                with self._cond:
+                    self._stats['health_check_failures'] += 1
+                return False
+        return True
+
+    def putconn(self, conn):
+        with self._cond:
+            created = self._in_use.pop(conn)
+            closed = self._closed
+        if closed or conn.closed or time.monotonic() - created > self.max_lifetime:
+            self._discard(conn)
+            return
+        if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except Error:
+                self._discard(conn)
+                return
+        with self._cond:
+            self._idle.append((conn, created, time.monotonic()))
+            self._cond.notify()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def close(self):
+        """Close every idle connection; connections in use are closed when returned."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+        for conn, created, returned in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._cond:
+            return dict(self._stats, size=self._size, idle=len(self._idle), in_use=len(self._in_use),
+                        max_size=self.max_size)
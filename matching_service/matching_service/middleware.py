@@ -0,0 +1,64 @@
+"""
+Path-scoped versions of the browser-oriented middleware.
+
+The JSON API authenticates every request itself (see REST_FRAMEWORK) and keeps no
+state between calls, so sessions, CSRF, ``request.user``, messages and X-Frame-Options
+are only overhead there. Each class below is the Django middleware of the same name,
+except that it steps aside for stateless API requests, which are requests:
+
+* under STATELESS_API_PATH_PREFIXES,
+* not under STATELESS_API_EXCLUDED_PREFIXES (the dj-rest-auth/allauth views, which log
+  users into a session),
+* not asking for HTML (the browsable API and its session login).
+
+Everything else, the admin included, goes through the full middleware.
+"""
+from django.conf import settings
+from django.contrib.auth import middleware as auth_middleware
+from django.contrib.messages import middleware as messages_middleware
+from django.contrib.sessions import middleware as sessions_middleware
+from django.middleware import clickjacking, csrf
+
+
+def is_stateless_api_request(request):
+    try:
+        return request._is_stateless_api
+    except AttributeError:
+        path = request.path_info
+        request._is_stateless_api = (path.startswith(tuple(settings.STATELESS_API_PATH_PREFIXES))
+                                     and not path.startswith(tuple(settings.STATELESS_API_EXCLUDED_PREFIXES))
+                                     and 'text/html' not in request.META.get('HTTP_ACCEPT', ''))
+        return request._is_stateless_api
+
+
+class StatelessAPIMixin:
+
+    def __call__(self, request):
+        if is_stateless_api_request(request):
+            # In async mode this returns the coroutine, which the caller awaits.
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SessionMiddleware(StatelessAPIMixin, sessions_middleware.SessionMiddleware):
+    pass
+
+
+class CsrfViewMiddleware(StatelessAPIMixin, csrf.CsrfViewMiddleware):
+
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if is_stateless_api_request(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class AuthenticationMiddleware(StatelessAPIMixin, auth_middleware.AuthenticationMiddleware):
+    pass
+
+
+class MessageMiddleware(StatelessAPIMixin, messages_middleware.MessageMiddleware):
+    pass
+
+
+class XFrameOptionsMiddleware(StatelessAPIMixin, clickjacking.XFrameOptionsMiddleware):
+    pass
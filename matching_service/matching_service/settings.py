@@ -51,17 +51,23 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
 ]
 
+# The matching_service.middleware classes are the Django ones, skipped for stateless
+# JSON API requests (see that module).
 MIDDLEWARE = [
+    "user.instrumentation.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "matching_service.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
-    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "matching_service.middleware.CsrfViewMiddleware",
+    "matching_service.middleware.AuthenticationMiddleware",
+    "matching_service.middleware.MessageMiddleware",
+    "matching_service.middleware.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
 ]
 
+STATELESS_API_PATH_PREFIXES = ['/api/']
+STATELESS_API_EXCLUDED_PREFIXES = ['/api/auth/']
+
 SITE_ID = 1
 
 ROOT_URLCONF = "matching_service.urls"
@@ -89,12 +95,33 @@ WSGI_APPLICATION = "matching_service.wsgi.application"
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # 'matching_service.db.backends.pooled_postgresql' hands out connections from an in-process pool
+        'ENGINE': config('DB_ENGINE', default='django.db.backends.postgresql'),
         'NAME': config('DB_NAME'),
         'USER': config('DB_USER'),
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST'),
         'PORT': config('DB_PORT', default='5432'),  # Default PostgreSQL port
+        # Seconds a thread keeps its connection between requests (0 closes it after each request);
+        # ignored by the pooled backend, which returns the connection to its pool after each request
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        # Check a persistent connection is still alive before reusing it for a new request
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        # Only read by the pooled backend: connections per process, seconds to wait for one,
+        # seconds before a connection is replaced, and seconds idle before it is pinged on checkout
+        'POOL': {
+            'MAX_SIZE': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'TIMEOUT': config('DB_POOL_TIMEOUT', default=10.0, cast=float),
+            'MAX_LIFETIME': config('DB_POOL_MAX_LIFETIME', default=1800.0, cast=float),
+            'CHECK_IDLE_AFTER': config('DB_POOL_CHECK_IDLE_AFTER', default=30.0, cast=float),
+        },
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='matching-service'),
     }
 }
 
@@ -140,6 +167,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         # 'rest_framework.authentication.SessionAuthentication',
+        'user.authentication.SignedTokenAuthentication',
         'rest_framework.authentication.BasicAuthentication',
         # 'rest_framework.authentication.TokenAuthentication',
     )
@@ -160,6 +188,47 @@ ACCOUNT_UNIQUE_EMAIL = True
 
 AUTH_USER_MODEL = 'user.CustomUser'
 
+# Where matching_algorithm reads the Unmatched pool from: 'memory' (process-local age index,
+# rebuilt every MATCHING_POOL_REFRESH_SECONDS) or 'database'.
+MATCHING_CANDIDATE_POOL = config('MATCHING_CANDIDATE_POOL', default='memory')
+MATCHING_POOL_REFRESH_SECONDS = config('MATCHING_POOL_REFRESH_SECONDS', default=30, cast=int)
+# Users whose declined-match exclusion set is held in memory at once (LRU).
+MATCHING_DECLINED_CACHE_SIZE = config('MATCHING_DECLINED_CACHE_SIZE', default=10000, cast=int)
+# Fail send/accept/decline with HTTP 409 instead of waiting when another request holds
+# the users' MatchSuggestion row locks.
+MATCHING_LOCK_NOWAIT = config('MATCHING_LOCK_NOWAIT', default=True, cast=bool)
+# Seconds a user's cached candidate list may be served; 0 disables the cache.
+MATCHING_CANDIDATE_CACHE_TIMEOUT = config('MATCHING_CANDIDATE_CACHE_TIMEOUT', default=30, cast=int)
+# Pub/sub class behind the match event stream, and per-connection stream settings.
+MATCHING_EVENT_BROKER = config('MATCHING_EVENT_BROKER', default='user.utils.events.InProcessBroker')
+MATCHING_EVENT_QUEUE_SIZE = config('MATCHING_EVENT_QUEUE_SIZE', default=100, cast=int)
+MATCHING_EVENT_HEARTBEAT_SECONDS = config('MATCHING_EVENT_HEARTBEAT_SECONDS', default=15, cast=int)
+# Where dispatch_outbox sends MatchEvent rows: 'log', 'queue' or 'webhook'. The 'log' sink
+# appends JSON lines to MATCHING_OUTBOX_LOG_PATH, or writes them to stdout when it is empty.
+MATCHING_OUTBOX_SINK = config('MATCHING_OUTBOX_SINK', default='log')
+MATCHING_OUTBOX_BATCH_SIZE = config('MATCHING_OUTBOX_BATCH_SIZE', default=500, cast=int)
+MATCHING_OUTBOX_LOG_PATH = config('MATCHING_OUTBOX_LOG_PATH', default='')
+MATCHING_OUTBOX_WEBHOOK_URL = config('MATCHING_OUTBOX_WEBHOOK_URL', default='http://localhost:8080/match-events')
+# Serve get-a-match and get-status from MaterializedSuggestion rows (kept up to date by the
+# refresh_suggestions command) when one exists for the requested range. Only enable it
+# where that command runs: it is also what consumes the PoolChange log the views write.
+# How many of the best candidates each row keeps, and how many rows the command
+# refreshes per transaction.
+MATCHING_MATERIALIZED_SUGGESTIONS = config('MATCHING_MATERIALIZED_SUGGESTIONS', default=False, cast=bool)
+MATCHING_MATERIALIZED_CANDIDATES = config('MATCHING_MATERIALIZED_CANDIDATES', default=1000, cast=int)
+MATCHING_MATERIALIZED_BATCH_SIZE = config('MATCHING_MATERIALIZED_BATCH_SIZE', default=1000, cast=int)
+# Lifetime of tokens from auth/token/, and how long SignedTokenAuthentication keeps a
+# resolved user in its per-process cache (0 disables the cache).
+MATCHING_AUTH_TOKEN_MAX_AGE = config('MATCHING_AUTH_TOKEN_MAX_AGE', default=60 * 60, cast=int)
+MATCHING_AUTH_USER_CACHE_SECONDS = config('MATCHING_AUTH_USER_CACHE_SECONDS', default=60, cast=int)
+MATCHING_AUTH_USER_CACHE_SIZE = config('MATCHING_AUTH_USER_CACHE_SIZE', default=10000, cast=int)
+# Add a Server-Timing header (DB, serializer and total milliseconds) to every response; off
+# by default since it exposes timings to any client. Also the request duration histogram
+# buckets, in seconds, served by metrics/.
+MATCHING_SERVER_TIMING = config('MATCHING_SERVER_TIMING', default=False, cast=bool)
+MATCHING_METRICS_BUCKETS = config('MATCHING_METRICS_BUCKETS', default='0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5',
+                                  cast=lambda value: [float(bound) for bound in value.split(',')])
+
 APPEND_SLASH = False
 
 SWAGGER_SETTINGS = {
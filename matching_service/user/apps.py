@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class UserConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "user"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .instrumentation import install_query_recorder
+        connection_created.connect(install_query_recorder, dispatch_uid='user.instrumentation')
@@ -0,0 +1,141 @@
+"""
+Async variants of the polling endpoints, for deployments served through ``asgi.py``.
+
+Idle clients poll these endpoints continuously and each poll mostly waits on the
+database, so here they are plain async Django views on the async ORM (``aget``,
+async iteration) instead of sync DRF views holding a worker thread each.
+Authentication still goes through the DRF authenticators configured in REST_FRAMEWORK,
+and responses have the same shape as their sync counterparts in ``views.py``.
+"""
+import asyncio
+import functools
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .models import CustomUser, MatchingRequest
+from .pagination import ProfileCursorPagination
+from .serializers import UserProfileSerializer
+from .utils.events import get_broker
+from .utils.match_state import aload_match_state
+from .utils.matching_algo import matching_algorithm
+from .utils.ranking import ranked_profiles
+
+
+def async_api_view(view):
+    """
+    Run ``view`` for authenticated GET requests only, passing it a DRF Request whose
+    user was resolved by the configured DRF authenticators (in a worker thread, since
+    they are sync).
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return JsonResponse({'detail': f'Method "{request.method}" not allowed.'},
+                                status=status.HTTP_405_METHOD_NOT_ALLOWED, headers={'Allow': 'GET'})
+        authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+        drf_request = Request(request, authenticators=authenticators)
+        try:
+            user = await sync_to_async(lambda: drf_request.user)()
+            if not user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+        except exceptions.APIException as exc:
+            response = JsonResponse({'detail': exc.detail}, status=status.HTTP_401_UNAUTHORIZED)
+            if authenticators:
+                response['WWW-Authenticate'] = authenticators[0].authenticate_header(drf_request)
+            return response
+        return await view(drf_request, *args, **kwargs)
+    return wrapper
+
+
+async def possible_matches_apage(request, min_age, max_age):
+    """Async possible_matches_page: one serialized page of the user's candidates, plus cursor links."""
+    user = request.user
+    queryset = await sync_to_async(matching_algorithm)(min_age, max_age, user)
+    paginator = ProfileCursorPagination()
+    fields = UserProfileSerializer.Meta.fields
+    if request.query_params.get('ordering') == 'score':
+        page = await sync_to_async(ranked_profiles)(queryset, user, paginator.get_page_size(request), fields)
+        links = {'next': None, 'previous': None}
+    else:
+        page = await paginator.apaginate_queryset(queryset.values(*fields), request)
+        links = paginator.get_links()
+    return UserProfileSerializer(page, many=True).data, links
+
+
+@async_api_view
+async def user_match_status(request):
+    state = await aload_match_state(request.user)
+    state.apply_profile(request.user)
+    if state.matched:
+        return JsonResponse({"status": "Matched", "detail": "You are currently Matched"}, status=status.HTTP_200_OK)
+    if state.suggestion_state is None:
+        return JsonResponse({"detail": "You are currently No Available for Matching"}, status=status.HTTP_200_OK)
+    if state.criteria is None:
+        return JsonResponse({'status': state.suggestion_state, 'Possible Matches': [], 'next': None, 'previous': None},
+                            status=status.HTTP_200_OK)
+    possible_matches, links = await possible_matches_apage(request, *state.criteria)
+    return JsonResponse({'status': state.suggestion_state, 'Possible Matches': possible_matches, **links},
+                        status=status.HTTP_200_OK)
+
+
+@async_api_view
+async def user_match_request_status(request):
+    state = await aload_match_state(request.user)
+    if state.request_state is not None:
+        return JsonResponse({"status": state.request_state}, status=status.HTTP_200_OK)
+    else:
+        return JsonResponse({'status': "no request sent to any user"}, status=status.HTTP_200_OK)
+
+
+@async_api_view
+async def match_request_list(request):
+    senders = MatchingRequest.objects.filter(receiver=request.user, state='Pending').values('sender')
+    queryset = CustomUser.objects.filter(id__in=senders).values(*UserProfileSerializer.Meta.fields)
+    paginator = ProfileCursorPagination()
+    page = await paginator.apaginate_queryset(queryset, request)
+    return JsonResponse({**paginator.get_links(), 'results': UserProfileSerializer(page, many=True).data},
+                        status=status.HTTP_200_OK)
+
+
+async def event_stream(broker, user_id):
+    """Server-sent events for ``user_id`` until the client disconnects, with a comment line as heartbeat."""
+    queue = broker.subscribe(user_id)
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                event_id, event_type, data = await asyncio.wait_for(queue.get(),
+                                                                    settings.MATCHING_EVENT_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            yield f'id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n'
+    finally:
+        broker.unsubscribe(user_id, queue)
+
+
+@async_api_view
+async def match_events(request):
+    """
+    Server-sent event stream of the user's match transitions: request_received,
+    request_accepted, request_declined and matched. Replaces polling get-status/ and
+    get-request-status/; clients re-read those once after (re)connecting.
+
+    Only served under ASGI: a WSGI server would consume the stream synchronously and
+    hold a worker thread for as long as the client stays connected.
+    """
+    if not isinstance(request._request, ASGIRequest):
+        return JsonResponse({'detail': 'The event stream needs the ASGI server (asgi.py); poll get-status/ instead.'},
+                            status=status.HTTP_501_NOT_IMPLEMENTED)
+    response = StreamingHttpResponse(event_stream(get_broker(), request.user.id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,99 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+TOKEN_SALT = 'user.authentication.SignedTokenAuthentication'
+
+
+def _password_fingerprint(user):
+    # Changes whenever the password does, which revokes every token issued before.
+    return user.get_session_auth_hash()[:16]
+
+
+def issue_token(user):
+    """A signed ``Bearer`` token for ``user``, valid for MATCHING_AUTH_TOKEN_MAX_AGE seconds."""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(f'{user.pk}:{_password_fingerprint(user)}')
+
+
+class UserCache:
+    """
+    Process-local LRU of active users by primary key, each entry kept for
+    MATCHING_AUTH_USER_CACHE_SECONDS, so a token's user is not re-read on every request.
+    Callers get their own copy of the cached instance. Profile updates evict their user
+    in this process; views that act on profile columns re-read them (see MatchState).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = OrderedDict()
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+    def evict(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and time.monotonic() - entry[0] <= settings.MATCHING_AUTH_USER_CACHE_SECONDS:
+                self._users.move_to_end(user_id)
+                return copy.copy(entry[1])
+        user = get_user_model().objects.filter(pk=user_id, is_active=True).first()
+        if user is not None and settings.MATCHING_AUTH_USER_CACHE_SECONDS > 0:
+            with self._lock:
+                self._users[user_id] = (time.monotonic(), copy.copy(user))
+                self._users.move_to_end(user_id)
+                while len(self._users) > settings.MATCHING_AUTH_USER_CACHE_SIZE:
+                    self._users.popitem(last=False)
+        return user
+
+
+user_cache = UserCache()
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Stateless ``Authorization: Bearer <token>`` authentication with tokens from issue_token.
+
+    Checking a token is an HMAC and, at most once per MATCHING_AUTH_USER_CACHE_SECONDS
+    per user, a primary-key lookup. Basic authentication runs the password hasher on
+    every request instead. A password change revokes the user's tokens once the cached
+    entry expires.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+
+        try:
+            value = signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+                auth[1].decode(), max_age=settings.MATCHING_AUTH_TOKEN_MAX_AGE)
+            user_id, fingerprint = value.split(':')
+            user_id = int(user_id)
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        except (signing.BadSignature, UnicodeDecodeError, ValueError):
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        user = user_cache.get(user_id)
+        if user is None or _password_fingerprint(user) != fingerprint:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        return user, None
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,217 @@
+"""
+Per-request instrumentation for the API: database query count and time, time spent in
+serializers (and anything else wrapped in ``timed``) and wall time.
+
+InstrumentationMiddleware aggregates these per endpoint (URL name and method) for the
+Prometheus ``metrics/`` endpoint and reports the current request's numbers in a
+``Server-Timing`` response header.
+
+Queries are counted by ``record_query``, a ``connection.execute_wrapper`` that is
+installed on every database connection when it opens, rather than around each request:
+async views run their ORM calls on another thread's connection. It only records while
+a request is being measured, which it finds through a context variable that Django
+carries across ``sync_to_async``.
+"""
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """What one request spent: queries, their seconds, and seconds per ``timed`` component."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.timings = defaultdict(float)
+
+
+def current_metrics():
+    """The RequestMetrics of the request being measured, or None."""
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_seconds += time.perf_counter() - start
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """``connection_created`` receiver adding record_query to the new connection."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def timed(component):
+    """Decorator adding the wrapped function's run time to the current request's ``component``."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = _current.get()
+            if metrics is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.timings[component] += time.perf_counter() - start
+        return wrapper
+    return decorator
+
+
+class EndpointMetrics:
+    """Process-wide totals per ``(endpoint, method)``, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def clear(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def observe(self, endpoint, method, wall_seconds, metrics):
+        buckets = settings.MATCHING_METRICS_BUCKETS
+        with self._lock:
+            stats = self._endpoints.get((endpoint, method))
+            if stats is None:
+                stats = self._endpoints[(endpoint, method)] = {
+                    'requests': 0, 'wall_seconds': 0.0, 'buckets': [0] * len(buckets),
+                    'queries': 0, 'db_seconds': 0.0, 'timings': defaultdict(float),
+                }
+            stats['requests'] += 1
+            stats['wall_seconds'] += wall_seconds
+            for i, bound in enumerate(buckets):
+                if wall_seconds <= bound:
+                    stats['buckets'][i] += 1
+            stats['queries'] += metrics.queries
+            stats['db_seconds'] += metrics.db_seconds
+            for component, seconds in metrics.timings.items():
+                stats['timings'][component] += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {key: dict(stats, buckets=list(stats['buckets']), timings=dict(stats['timings']))
+                    for key, stats in self._endpoints.items()}
+
+    def render(self, pool_stats=None):
+        """
+        The metrics as Prometheus text exposition, with ``pool_stats``
+        (``{database: stats}`` from the pooled backend) as gauges.
+        """
+        snapshot = sorted(self.snapshot().items())
+        buckets = settings.MATCHING_METRICS_BUCKETS
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(f'{name}{_labels(labels)} {value}' for labels, value in samples)
+
+        def by_endpoint(key):
+            return [({'endpoint': endpoint, 'method': method}, stats[key]) for (endpoint, method), stats in snapshot]
+
+        family('matching_http_requests_total', 'counter', 'Requests handled.', by_endpoint('requests'))
+        histogram = []
+        for (endpoint, method), stats in snapshot:
+            labels = {'endpoint': endpoint, 'method': method}
+            histogram.extend((dict(labels, le=str(bound)), count) for bound, count in zip(buckets, stats['buckets']))
+            histogram.append((dict(labels, le='+Inf'), stats['requests']))
+        lines.append('# HELP matching_http_request_duration_seconds Wall time per request.')
+        lines.append('# TYPE matching_http_request_duration_seconds histogram')
+        lines.extend(f'matching_http_request_duration_seconds_bucket{_labels(labels)} {value}'
+                     for labels, value in histogram)
+        for (endpoint, method), stats in snapshot:
+            labels = _labels({'endpoint': endpoint, 'method': method})
+            lines.append(f'matching_http_request_duration_seconds_sum{labels} {stats["wall_seconds"]}')
+            lines.append(f'matching_http_request_duration_seconds_count{labels} {stats["requests"]}')
+        family('matching_db_queries_total', 'counter', 'Database queries run by requests.', by_endpoint('queries'))
+        family('matching_db_query_seconds_total', 'counter', 'Time requests spent in database queries.',
+               by_endpoint('db_seconds'))
+        family('matching_component_seconds_total', 'counter', 'Time requests spent in timed components.',
+               [({'endpoint': endpoint, 'method': method, 'component': component}, seconds)
+                for (endpoint, method), stats in snapshot for component, seconds in sorted(stats['timings'].items())])
+
+        for database, stats in sorted((pool_stats or {}).items()):
+            for key, value in stats.items():
+                kind = 'counter' if key.endswith('_total') or key in _POOL_COUNTERS else 'gauge'
+                name = f'matching_db_pool_{key}' + ('_total' if kind == 'counter' and not key.endswith('_total') else '')
+                family(name, kind, f'Connection pool {key.replace("_", " ")}.', [({'database': database}, value)])
+        return '\n'.join(lines) + '\n'
+
+
+_POOL_COUNTERS = {'connections_opened', 'checkouts', 'timeouts', 'recycled', 'health_check_failures'}
+
+
+def _labels(labels):
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for value in labels.values())
+    return '{' + ','.join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + '}'
+
+
+endpoint_metrics = EndpointMetrics()
+
+
+def server_timing(metrics, wall_seconds):
+    """The ``Server-Timing`` header value for one request."""
+    entries = [f'db;dur={metrics.db_seconds * 1000:.2f};desc="{metrics.queries} queries"']
+    entries.extend(f'{component};dur={seconds * 1000:.2f}' for component, seconds in sorted(metrics.timings.items()))
+    entries.append(f'total;dur={wall_seconds * 1000:.2f}')
+    return ', '.join(entries)
+
+
+class InstrumentationMiddleware:
+    """
+    Measures every request (see the module docstring). Put it first in MIDDLEWARE so
+    the wall time covers the other middleware too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token, start = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        metrics, token, start = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, start)
+
+    def _start(self):
+        metrics = RequestMetrics()
+        return metrics, _current.set(metrics), time.perf_counter()
+
+    def _finish(self, request, response, metrics, start):
+        wall_seconds = time.perf_counter() - start
+        match = request.resolver_match
+        endpoint_metrics.observe(match.view_name if match else 'unresolved', request.method, wall_seconds, metrics)
+        if settings.MATCHING_SERVER_TIMING:
+            response['Server-Timing'] = server_timing(metrics, wall_seconds)
+        return response
@@ -0,0 +1,26 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...utils.outbox import SINKS, dispatch_outbox
+
+
+class Command(BaseCommand):
+    help = "Drain the MatchEvent outbox to a sink in batches, once or continuously with --follow."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sink', choices=sorted(SINKS), default=settings.MATCHING_OUTBOX_SINK)
+        parser.add_argument('--batch-size', type=int, default=settings.MATCHING_OUTBOX_BATCH_SIZE)
+        parser.add_argument('--follow', action='store_true', help="Keep polling for new events.")
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds between polls with --follow.")
+
+    def handle(self, *args, **options):
+        sink = SINKS[options['sink']]()
+        while True:
+            sent = dispatch_outbox(sink, batch_size=options['batch_size'])
+            if sent:
+                self.stderr.write(f"Dispatched {sent} events to the {options['sink']} sink")
+            if not options['follow']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...utils.importing import DEFAULT_BATCH_SIZE, RecordError, UserImporter, read_records
+
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+
+def open_stream(path):
+    return nullcontext(sys.stdin) if path == '-' else open(path, newline='', encoding='utf-8')
+
+
+def stream_format(path, format):
+    if format:
+        return format
+    try:
+        return FORMATS[os.path.splitext(path)[1].lower()]
+    except KeyError:
+        raise CommandError(f"Cannot tell the format of {path!r}; pass --format csv or --format jsonl.")
+
+
+class Command(BaseCommand):
+    help = ("Bulk-load users from a CSV (with a header row) or JSON Lines file, with their MatchingCriteria "
+            "(min_age/max_age) and an Unmatched MatchSuggestion (unless pool is false), and optionally "
+            "DeclinedMatch history (sender/receiver usernames). Uses PostgreSQL COPY where available and "
+            "bulk_create otherwise, one transaction per batch.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Users file, or - for standard input.")
+        parser.add_argument('--format', choices=('csv', 'jsonl'), help="Defaults to the file extension.")
+        parser.add_argument('--declines',
+                            help="DeclinedMatch file (sender,receiver usernames), loaded after the users.")
+        parser.add_argument('--declines-format', choices=('csv', 'jsonl'), help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Rows per transaction.")
+        parser.add_argument('--shared-password',
+                            help="Give every imported user this password, hashed once, instead of hashing "
+                                 "each row's password field.")
+        parser.add_argument('--no-copy', action='store_true', help="Use bulk_create even where COPY is available.")
+        parser.add_argument('--skip-existing', action='store_true',
+                            help="Skip usernames that already exist instead of failing, e.g. to resume an import.")
+
+    def handle(self, *args, **options):
+        importer = UserImporter(batch_size=options['batch_size'], use_copy=False if options['no_copy'] else None,
+                                shared_password=options['shared_password'], skip_existing=options['skip_existing'])
+        start = time.perf_counter()
+        try:
+            with open_stream(options['path']) as stream:
+                importer.import_users(read_records(stream, stream_format(options['path'], options['format'])))
+            declines = 0
+            if options['declines']:
+                with open_stream(options['declines']) as stream:
+                    declines = importer.import_declines(
+                        read_records(stream, stream_format(options['declines'], options['declines_format'])))
+        except RecordError as error:
+            raise CommandError(f"{error} (batches before it were committed: {importer.users} users)")
+        method = 'COPY' if importer.use_copy else 'bulk_create'
+        self.stderr.write(f"Imported {importer.users} users ({importer.skipped} skipped), {importer.criteria} "
+                          f"criteria, {importer.suggestions} pool rows, {declines} declines "
+                          f"in {time.perf_counter() - start:.1f}s using {method}")
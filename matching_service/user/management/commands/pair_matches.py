@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from ...utils.pairing import DEFAULT_BATCH_SIZE, DEFAULT_NEIGHBORS, DEFAULT_WINDOW, run_pairing
+
+
+class Command(BaseCommand):
+    help = ("Pair the whole Unmatched pool in one run (greedy maximum-weight matching on mutual "
+            "MatchingCriteria, closest ages first) and send the resulting match requests in bulk. "
+            "Meant to be run on a schedule, e.g. from cron.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--neighbors', type=int, default=DEFAULT_NEIGHBORS,
+                            help="Compatible partners kept per user in the graph.")
+        parser.add_argument('--window', type=int, default=DEFAULT_WINDOW,
+                            help="Pool entries inspected per user to find them.")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help="Pairs written per transaction.")
+        parser.add_argument('--dry-run', action='store_true', help="Compute the pairing without writing it.")
+
+    def handle(self, *args, **options):
+        pool, pairs, written = run_pairing(neighbors=options['neighbors'], window=options['window'],
+                                           batch_size=options['batch_size'], dry_run=options['dry_run'])
+        self.stderr.write(f"Pool: {len(pool)} users, proposed pairs: {len(pairs)}, written pairs: {len(written)}")
@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import CustomUser
+from ...utils.batch_matching import batch_candidate_ids, load_declined_ids, saved_criteria
+
+
+class Command(BaseCommand):
+    help = ("Compute candidate lists for many users in one pass over the Unmatched pool and write "
+            "them as JSON lines ({\"user\": id, \"candidates\": [ids]}).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, nargs='+',
+                            help="Only these user ids (default: everyone with saved MatchingCriteria).")
+        parser.add_argument('--min-age', type=int, help="Use this range instead of each user's saved criteria.")
+        parser.add_argument('--max-age', type=int)
+        parser.add_argument('--output', help="File to write to (default: stdout).")
+
+    def handle(self, *args, **options):
+        user_ids = options['users']
+        if options['min_age'] is not None or options['max_age'] is not None:
+            if user_ids is None:
+                raise CommandError("--min-age/--max-age need --users")
+            ages = dict(CustomUser.objects.filter(id__in=user_ids).values_list('id', 'age'))
+            criteria = [(user_id, options['min_age'] or 18, options['max_age'] or 100, ages.get(user_id))
+                        for user_id in user_ids]
+        else:
+            criteria = list(saved_criteria(user_ids))
+
+        declined = load_declined_ids(user_ids)
+        results = batch_candidate_ids(criteria, declined=declined)
+
+        output = open(options['output'], 'w') if options['output'] else self.stdout
+        try:
+            for user_id, candidates in results.items():
+                output.write(json.dumps({'user': user_id, 'candidates': candidates}) + '\n')
+        finally:
+            if options['output']:
+                output.close()
+        self.stderr.write(f"Computed candidates for {len(results)} users")
@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...utils.materialized import SuggestionRefresher, mark_all_stale
+
+
+class Command(BaseCommand):
+    help = ("Bring MaterializedSuggestion up to date: add rows for new waiting users, apply logged pool changes "
+            "and recompute stale rows, once or continuously with --follow.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.MATCHING_MATERIALIZED_BATCH_SIZE,
+                            help="Rows recomputed per transaction.")
+        parser.add_argument('--all', action='store_true', help="Recompute every row, not just the stale ones.")
+        parser.add_argument('--follow', action='store_true', help="Keep polling for changes.")
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds between passes with --follow.")
+
+    def handle(self, *args, **options):
+        refresher = SuggestionRefresher(batch_size=options['batch_size'])
+        if options['all']:
+            mark_all_stale()
+        while True:
+            start = time.perf_counter()
+            refreshed = refresher.run()
+            if refreshed or not options['follow']:
+                self.stderr.write(f"Refreshed {refreshed} materialized suggestions in "
+                                  f"{time.perf_counter() - start:.2f}s ({refresher.created} rows added, "
+                                  f"{refresher.deleted} deleted, {refresher.marked} marked stale so far)")
+            if not options['follow']:
+                return
+            time.sleep(options['interval'])
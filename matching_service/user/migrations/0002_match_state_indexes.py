@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['age'], name='user_age_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='declinedmatch',
+            index=models.Index(fields=['sender', 'receiver'], name='declined_sender_receiver_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='declinedmatch',
+            index=models.Index(fields=['receiver', 'sender'], name='declined_receiver_sender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='matchingrequest',
+            index=models.Index(fields=['sender', 'state'], name='request_sender_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='matchingrequest',
+            index=models.Index(fields=['receiver', 'state'], name='request_receiver_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='matchingrequest',
+            index=models.Index(condition=models.Q(('state', 'Pending')), fields=['receiver'], name='request_pending_receiver_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='matchsuggestion',
+            index=models.Index(fields=['state', 'user1'], name='suggestion_state_user1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='matchsuggestion',
+            index=models.Index(condition=models.Q(('state', 'Unmatched')), fields=['user1'], name='suggestion_unmatched_idx'),
+        ),
+    ]
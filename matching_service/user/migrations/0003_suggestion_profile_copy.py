@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:01
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_user_profile(apps, schema_editor):
+    MatchSuggestion = apps.get_model('user', 'MatchSuggestion')
+    CustomUser = apps.get_model('user', 'CustomUser')
+    users = CustomUser.objects.filter(pk=OuterRef('user1_id'))
+    MatchSuggestion.objects.filter(user1__isnull=False).update(
+        age=Subquery(users.values('age')[:1]),
+        gender=Subquery(users.values('gender')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_match_state_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='matchsuggestion',
+            name='age',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='matchsuggestion',
+            name='gender',
+            field=models.CharField(blank=True, choices=[('M', 'Male'), ('F', 'Female'), ('NS', 'Not Specified')], default='', max_length=20),
+        ),
+        migrations.RunPython(copy_user_profile, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='matchsuggestion',
+            index=models.Index(condition=models.Q(('state', 'Unmatched')), fields=['age'], include=('user1', 'gender'), name='suggestion_unmatched_age_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0003_suggestion_profile_copy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('request_received', 'Request received'), ('request_accepted', 'Request accepted'), ('request_declined', 'Request declined'), ('matched', 'Matched')], max_length=30)),
+                ('recipients', models.JSONField(default=list)),
+                ('payload', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('dispatched_at', models.DateTimeField(null=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('dispatched_at__isnull', True)), fields=['id'], name='event_undispatched_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:52
+
+from django.conf import settings
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0004_match_event_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PoolChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('age', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MaterializedSuggestion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='materialized_suggestion', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('min_age', models.PositiveIntegerField(null=True)),
+                ('max_age', models.PositiveIntegerField(null=True)),
+                ('candidate_ids', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), default=list, size=None)),
+                ('stale', models.BooleanField(default=True)),
+                ('refreshed_at', models.DateTimeField(null=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('stale', True)), fields=['user'], name='materialized_stale_idx'), models.Index(condition=models.Q(('stale', False)), fields=['min_age', 'max_age'], name='materialized_fresh_range_idx')],
+            },
+        ),
+        # Stored out of line uncompressed; see MaterializedSuggestion.candidate_ids.
+        migrations.RunSQL(
+            'ALTER TABLE user_materializedsuggestion ALTER COLUMN candidate_ids SET STORAGE EXTERNAL',
+            'ALTER TABLE user_materializedsuggestion ALTER COLUMN candidate_ids SET STORAGE EXTENDED',
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:24
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0005_materialized_suggestion'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='matchsuggestion',
+            name='suggestion_state_user1_idx',
+        ),
+    ]
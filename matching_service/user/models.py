@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.fields import ArrayField
 
 GENDER_SELECTION = [
     ('M', 'Male'),
@@ -13,6 +14,11 @@ class CustomUser(AbstractUser):
     phone_number = models.CharField(max_length=30)
     age = models.PositiveIntegerField(null=True)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['age'], name='user_age_idx'),
+        ]
+
 
 class MatchingCriteria(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='matching_criteria')
@@ -39,6 +45,19 @@ class MatchSuggestion(models.Model):
     user1 = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='user1', null=True)
     user2 = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='user2', null=True)
     state = models.CharField(max_length=15, choices=MATCH_STATE_CHOICES, default='Unmatched')
+    # Copies of user1's profile so the pool can be range-scanned without joining CustomUser.
+    # Kept in sync by sync_match_suggestion_profile.
+    age = models.PositiveIntegerField(null=True)
+    gender = models.CharField(max_length=20, choices=GENDER_SELECTION, blank=True, default='')
+
+    class Meta:
+        # Lookups by user1 use the foreign key's index; the pool is probed per candidate by
+        # suggestion_unmatched_idx and range-scanned by age through suggestion_unmatched_age_idx.
+        indexes = [
+            models.Index(fields=['user1'], condition=models.Q(state='Unmatched'), name='suggestion_unmatched_idx'),
+            models.Index(fields=['age'], include=['user1', 'gender'], condition=models.Q(state='Unmatched'),
+                         name='suggestion_unmatched_age_idx'),
+        ]
 
 
 class MatchingRequest(models.Model):
@@ -51,6 +70,13 @@ class MatchingRequest(models.Model):
     receiver = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='request_receiver', null=True)
     state = models.CharField(max_length=15, choices=REQUEST_STATE, default='Pending')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['sender', 'state'], name='request_sender_state_idx'),
+            models.Index(fields=['receiver', 'state'], name='request_receiver_state_idx'),
+            models.Index(fields=['receiver'], condition=models.Q(state='Pending'), name='request_pending_receiver_idx'),
+        ]
+
     def __str__(self):
         return f"Matching Request from {self.sender.username} to {self.receiver.username} (State: {self.state})"
 
@@ -60,5 +86,77 @@ class DeclinedMatch(models.Model):
     receiver = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='received_declines')
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['sender', 'receiver'], name='declined_sender_receiver_idx'),
+            models.Index(fields=['receiver', 'sender'], name='declined_receiver_sender_idx'),
+        ]
+
     def __str__(self):
         return f"{self.receiver} declined a request from {self.sender}"
+
+
+class MatchEvent(models.Model):
+    EVENT_TYPES = [
+        ('request_received', 'Request received'),
+        ('request_accepted', 'Request accepted'),
+        ('request_declined', 'Request declined'),
+        ('matched', 'Matched'),
+    ]
+    event_type = models.CharField(max_length=30, choices=EVENT_TYPES)
+    recipients = models.JSONField(default=list)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Set by dispatch_outbox once the event has been handed to the sink.
+    dispatched_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(dispatched_at__isnull=True), name='event_undispatched_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} for {self.recipients}"
+
+
+class MaterializedSuggestion(models.Model):
+    """
+    A waiting user's best candidates for their saved MatchingCriteria, chosen by
+    utils.ranking, so polls read one row instead of scanning the pool. Written by the
+    refresh_suggestions command, which recomputes the rows marked ``stale``. The ranking
+    only decides which candidates are kept: reads page them by pk like any other
+    candidate list, or re-rank them with ``?ordering=score``.
+    """
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True,
+                                related_name='materialized_suggestion')
+    # The range candidate_ids were computed for; null until the first refresh.
+    min_age = models.PositiveIntegerField(null=True)
+    max_age = models.PositiveIntegerField(null=True)
+    # An array rather than JSON, stored uncompressed (migration 0005):
+    # refresh_suggestions rewrites thousands per batch, and both JSON parsing and
+    # compression cost several times more than the write itself.
+    candidate_ids = ArrayField(models.BigIntegerField(), default=list)
+    stale = models.BooleanField(default=True)
+    refreshed_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user'], condition=models.Q(stale=True), name='materialized_stale_idx'),
+            models.Index(fields=['min_age', 'max_age'], condition=models.Q(stale=False),
+                         name='materialized_fresh_range_idx'),
+        ]
+
+    def __str__(self):
+        return f"{len(self.candidate_ids)} materialized candidates for {self.user_id}"
+
+
+class PoolChange(models.Model):
+    """
+    An age at which the Unmatched pool (or a pool member's criteria) changed. Appended by
+    the views; refresh_suggestions consumes them and marks the MaterializedSuggestion rows
+    whose range covers the age stale.
+    """
+    age = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"Pool change at age {self.age}"
@@ -0,0 +1,61 @@
+from rest_framework.pagination import CursorPagination
+
+
+def _reverse_ordering(ordering):
+    """``('-created', 'uuid')`` -> ``('created', '-uuid')``: the ordering that walks pages backwards."""
+    return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+
+def _position(row, ordering):
+    """The cursor position of ``row``, a model instance or ``values()`` dict: its first ordering field, as text."""
+    field = ordering[0].lstrip('-')
+    return str(row[field] if isinstance(row, dict) else getattr(row, field))
+
+
+class ProfileCursorPagination(CursorPagination):
+    """
+    Keyset pagination for lists of user profiles. Pages are ordered by primary key, so a
+    cursor stays valid while users enter and leave the pool between polls.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = 'pk'
+
+    def get_links(self):
+        return {'next': self.get_next_link(), 'previous': self.get_previous_link()}
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        ``paginate_queryset`` for async views: the same cursors and links, with the page
+        fetched by async iteration instead of a blocking query. Uses local copies of the
+        DRF helpers it needs rather than their private originals.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+        queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+        if current_position is not None:
+            order = self.ordering[0]
+            lookup = 'lt' if reverse != order.startswith('-') else 'gt'
+            queryset = queryset.filter(**{f"{order.lstrip('-')}__{lookup}": current_position})
+
+        results = [row async for row in queryset[offset:offset + self.page_size + 1]]
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = _position(results[-1], self.ordering) if has_following_position else None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            self.next_position, self.previous_position = current_position, following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position, self.previous_position = following_position, current_position
+        return self.page
@@ -1,11 +1,37 @@
+from django.db.models import QuerySet
 from rest_framework import serializers
 
+from .instrumentation import timed
 from .models import CustomUser, MatchUsers
 
 
+class UserProfileListSerializer(serializers.ListSerializer):
+    """
+    Read-only fast path for ``UserProfileSerializer(many=True)``. Rows that arrive as
+    dicts (or querysets, which are read with ``.values()``) are emitted as-is with the
+    child's fields, skipping model instantiation and per-field to_representation.
+    Model instances still go through the regular serializer.
+    """
+
+    def to_representation(self, data):
+        fields = self.child.Meta.fields
+        if isinstance(data, QuerySet):
+            data = data.values(*fields)
+        return [
+            {field: row[field] for field in fields} if isinstance(row, dict) else self.child.to_representation(row)
+            for row in data
+        ]
+
+    @property
+    @timed('serializer')
+    def data(self):
+        return super().data
+
+
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = CustomUser
+        list_serializer_class = UserProfileListSerializer
         fields = (
             'pk',
             'email',
@@ -18,6 +44,11 @@ class UserProfileSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('pk', 'email',)
 
+    @property
+    @timed('serializer')
+    def data(self):
+        return super().data
+
 
 class AgeRangeSerializer(serializers.Serializer):
     min_age = serializers.IntegerField(min_value=18)
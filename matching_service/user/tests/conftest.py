@@ -6,3 +6,24 @@ import os
 
 # This switches environments to use test database.
 os.environ["ENVIRONMENT"] = "PYTEST"
+
+import pytest
+from django.core.cache import cache
+
+from ..authentication import user_cache
+from ..utils.candidate_pool import candidate_pool
+from ..utils.declined_index import declined_index
+
+
+@pytest.fixture(autouse=True)
+def reset_candidate_pool():
+    """The in-memory indexes and caches are process-wide; each test starts from empty ones."""
+    candidate_pool.clear()
+    declined_index.clear()
+    user_cache.clear()
+    cache.clear()
+    yield
+    candidate_pool.clear()
+    declined_index.clear()
+    user_cache.clear()
+    cache.clear()
@@ -0,0 +1,88 @@
+import base64
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..models import CustomUser, MatchingRequest, MatchSuggestion
+from ..utils.matching_algo import create_match_suggestion, create_or_update_matching_criteria
+
+
+def basic_auth(username, password="password"):
+    credentials = base64.b64encode(f"{username}:{password}".encode()).decode()
+    return {'HTTP_AUTHORIZATION': f"Basic {credentials}"}
+
+
+class TestAsyncPollingViews:
+
+    @pytest.fixture(scope="function")
+    def users(self):
+        users = []
+        for index, age in enumerate([20, 22, 24, 26]):
+            user = CustomUser.objects.create_user(username=f"user{index}", password="password", age=age)
+            create_match_suggestion(user)
+            create_or_update_matching_criteria(user, 18, 30)
+            users.append(user)
+        return users
+
+    def sync_get(self, user, name, query=''):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client.get(reverse(name) + query).json()
+
+    @pytest.mark.django_db
+    def test_requires_authentication(self):
+        response = Client().get(reverse('async-user-status'))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response['WWW-Authenticate'] == 'Bearer'
+
+    @pytest.mark.django_db
+    def test_serves_through_the_asgi_handler(self, users):
+        MatchingRequest.objects.create(sender=users[0], receiver=users[1], state='Pending')
+        headers = {'Authorization': basic_auth('user0')['HTTP_AUTHORIZATION']}
+
+        async def get():
+            return await AsyncClient().get(reverse('async-user-request-status'), headers=headers)
+
+        response = async_to_sync(get)()
+        assert response.json() == {'status': 'Pending'}
+
+    @pytest.mark.django_db
+    def test_rejects_other_methods(self, users):
+        response = Client().post(reverse('async-user-status'), **basic_auth('user0'))
+        assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+
+    @pytest.mark.django_db
+    def test_match_status_matches_sync_view(self, users):
+        response = Client().get(reverse('async-user-status') + '?page_size=2', **basic_auth('user0'))
+        assert response.status_code == status.HTTP_200_OK
+        sync_data = self.sync_get(users[0], 'user-status', '?page_size=2')
+        # Same payload and cursor; only the link's path differs.
+        assert response.json()['next'] == sync_data.pop('next').replace('/api/', '/api/async/')
+        assert {key: value for key, value in response.json().items() if key != 'next'} == sync_data
+
+        page_two = Client().get(response.json()['next'], **basic_auth('user0')).json()
+        assert [match['username'] for match in page_two['Possible Matches']] == ['user3']
+
+    @pytest.mark.django_db
+    def test_match_status_without_suggestion(self, users):
+        MatchSuggestion.objects.filter(user1=users[0]).delete()
+        response = Client().get(reverse('async-user-status'), **basic_auth('user0'))
+        assert response.json() == {"detail": "You are currently No Available for Matching"}
+
+    @pytest.mark.django_db
+    def test_request_status_and_incoming_requests(self, users):
+        MatchingRequest.objects.create(sender=users[1], receiver=users[0], state='Pending')
+        MatchingRequest.objects.create(sender=users[2], receiver=users[0], state='Pending')
+
+        response = Client().get(reverse('async-user-request-status'), **basic_auth('user1'))
+        assert response.json() == {'status': 'Pending'}
+        response = Client().get(reverse('async-user-request-status'), **basic_auth('user0'))
+        assert response.json() == {'status': "no request sent to any user"}
+
+        response = Client().get(reverse('async-match-request-list'), **basic_auth('user0'))
+        assert response.json() == self.sync_get(users[0], 'match-request-list')
+        assert [row['username'] for row in response.json()['results']] == ['user1', 'user2']
@@ -0,0 +1,112 @@
+import base64
+
+import pytest
+from django.core import signing
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..authentication import issue_token, user_cache
+from ..models import CustomUser, MatchingRequest, MatchSuggestion
+
+
+class TestSignedTokenAuthentication:
+
+    @pytest.fixture(scope="function")
+    def user(self):
+        return CustomUser.objects.create_user(username="user1", password="password1")
+
+    def get_status(self, token):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return client.get(reverse('user-request-status'))
+
+    @pytest.mark.django_db
+    def test_issues_a_token_for_valid_credentials(self, user):
+        response = APIClient().post(reverse('auth-token'), {'username': 'user1', 'password': 'password1'},
+                                    format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert self.get_status(response.data['token']).data == {'status': "no request sent to any user"}
+
+    @pytest.mark.django_db
+    def test_rejects_invalid_credentials(self, user):
+        response = APIClient().post(reverse('auth-token'), {'username': 'user1', 'password': 'wrong'}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.django_db
+    def test_resolved_user_is_cached(self, user, django_assert_num_queries):
+        MatchingRequest.objects.create(sender=user, receiver=user, state='Pending')
+        token = issue_token(user)
+        self.get_status(token)
+        # Only the view's own query once the user is cached.
+        with django_assert_num_queries(1):
+            assert self.get_status(token).data == {'status': 'Pending'}
+
+    def bearer_client(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {issue_token(user)}")
+        return client
+
+    @pytest.mark.django_db
+    def test_profile_update_evicts_the_cached_user(self, user, django_capture_on_commit_callbacks):
+        client = self.bearer_client(user)
+        client.get(reverse('profile'))
+        with django_capture_on_commit_callbacks(execute=True):
+            client.patch(reverse('profile'), {'age': 40}, format='json')
+        assert client.get(reverse('profile')).data['age'] == 40
+
+    @pytest.mark.django_db
+    def test_profile_update_does_not_write_back_a_cached_snapshot(self, user):
+        client = self.bearer_client(user)
+        client.get(reverse('profile'))
+        # Changed by another process, whose eviction does not reach this one's cache.
+        CustomUser.objects.filter(pk=user.pk).update(email="new@example.com")
+        client.patch(reverse('profile'), {'age': 40}, format='json')
+        user.refresh_from_db()
+        assert (user.email, user.age) == ("new@example.com", 40)
+
+    @pytest.mark.django_db
+    def test_get_a_match_copies_the_current_age(self, user):
+        client = self.bearer_client(user)
+        CustomUser.objects.filter(pk=user.pk).update(age=20)
+        client.get(reverse('profile'))
+        CustomUser.objects.filter(pk=user.pk).update(age=40)
+        client.post(reverse('get-a-match'), {'min_age': 18, 'max_age': 30}, format='json')
+        assert MatchSuggestion.objects.get(user1=user).age == 40
+
+    @pytest.mark.django_db
+    def test_rejects_tampered_and_expired_tokens(self, user, settings):
+        token = issue_token(user)
+        assert self.get_status(token[:-1] + ('A' if token[-1] != 'A' else 'B')).status_code == \
+            status.HTTP_401_UNAUTHORIZED
+        settings.MATCHING_AUTH_TOKEN_MAX_AGE = -1
+        response = self.get_status(token)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response['WWW-Authenticate'] == 'Bearer'
+
+    @pytest.mark.django_db
+    def test_password_change_revokes_tokens(self, user):
+        token = issue_token(user)
+        assert self.get_status(token).status_code == status.HTTP_200_OK
+        user.set_password("password2")
+        user.save()
+        user_cache.clear()
+        assert self.get_status(token).status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.django_db
+    def test_inactive_user_is_rejected(self, user):
+        token = issue_token(user)
+        CustomUser.objects.filter(pk=user.pk).update(is_active=False)
+        assert self.get_status(token).status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.django_db
+    def test_token_for_another_salt_is_rejected(self, user):
+        token = signing.TimestampSigner().sign(f'{user.pk}:{user.get_session_auth_hash()[:16]}')
+        assert self.get_status(token).status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.django_db
+    def test_basic_authentication_still_works(self, user):
+        client = APIClient()
+        credentials = base64.b64encode(b"user1:password1").decode()
+        client.credentials(HTTP_AUTHORIZATION=f"Basic {credentials}")
+        assert client.get(reverse('user-request-status')).status_code == status.HTTP_200_OK
@@ -0,0 +1,52 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from ..models import CustomUser, DeclinedMatch, MatchSuggestion
+from ..utils.batch_matching import batch_candidate_ids
+from ..utils.matching_algo import candidate_ids, create_match_suggestion, create_or_update_matching_criteria
+
+
+class TestBatchMatching:
+
+    @pytest.fixture(scope="function")
+    def users(self):
+        users = []
+        for index, (age, min_age, max_age) in enumerate([(20, 18, 30), (25, 24, 26), (26, 30, 40), (35, 18, 100),
+                                                         (40, 18, 25), (22, 22, 22)]):
+            user = CustomUser.objects.create_user(username=f"user{index}", password="password", age=age)
+            create_match_suggestion(user)
+            create_or_update_matching_criteria(user, min_age, max_age)
+            users.append(user)
+        MatchSuggestion.objects.filter(user1=users[5]).update(state='Pending')
+        DeclinedMatch.objects.create(sender=users[0], receiver=users[1])
+        DeclinedMatch.objects.create(sender=users[3], receiver=users[0])
+        return users
+
+    @pytest.mark.django_db
+    def test_matches_per_user_candidate_ids(self, users, settings, django_assert_num_queries):
+        settings.MATCHING_CANDIDATE_POOL = 'database'
+        criteria = [(user.id, user.matching_criteria.min_age, user.matching_criteria.max_age, user.age)
+                    for user in users]
+        with django_assert_num_queries(2):
+            results = batch_candidate_ids(criteria)
+        for user, (user_id, min_age, max_age, user_age) in zip(users, criteria):
+            assert sorted(results[user_id]) == sorted(candidate_ids(min_age, max_age, user))
+
+    @pytest.mark.django_db
+    def test_command_writes_json_lines(self, users):
+        out = StringIO()
+        call_command('precompute_matches', '--users', str(users[0].id), str(users[3].id), stdout=out, stderr=StringIO())
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert {line['user']: line['candidates'] for line in lines} == {
+            # user2 (30-40) does not accept user0 (20); only user2 accepts user3 (35).
+            users[0].id: [],
+            users[3].id: [users[2].id],
+        }
+
+    @pytest.mark.django_db
+    def test_command_age_range_needs_users(self):
+        with pytest.raises(CommandError, match="need --users"):
+            call_command('precompute_matches', '--min-age', '20', stdout=StringIO(), stderr=StringIO())
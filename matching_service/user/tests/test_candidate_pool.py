@@ -0,0 +1,171 @@
+import threading
+
+import pytest
+from django.db import transaction
+
+from ..models import CustomUser, DeclinedMatch, MatchSuggestion
+from ..utils.candidate_pool import CandidatePool
+from ..utils.declined_index import DeclinedIndex, declined_index
+from ..utils.matching_algo import add_to_declined_matches, create_match_suggestion
+
+
+class TestCandidatePool:
+
+    @pytest.fixture(scope="function")
+    def pool(self):
+        pool = CandidatePool()
+        pool.rebuild()
+        return pool
+
+    @pytest.mark.django_db
+    def test_rebuild_reads_only_unmatched_suggestions(self):
+        user1 = CustomUser.objects.create_user(username="user1", password="password1", age=20)
+        user2 = CustomUser.objects.create_user(username="user2", password="password2", age=25)
+        MatchSuggestion.objects.create(user1=user1, age=20)
+        MatchSuggestion.objects.create(user1=user2, age=25, state='Pending')
+        pool = CandidatePool()
+        pool.rebuild()
+        assert pool.user_ids_in_range(18, 100) == [user1.id]
+
+    @pytest.mark.django_db
+    def test_range_lookup_is_inclusive_and_ordered_by_age(self, pool):
+        pool.add(1, 30)
+        pool.add(2, 18)
+        pool.add(3, 25)
+        pool.add(4, 31)
+        assert pool.user_ids_in_range(18, 30) == [2, 3, 1]
+        assert pool.user_ids_in_range(26, 29) == []
+
+    @pytest.mark.django_db
+    def test_incremental_updates(self, pool):
+        pool.add(1, 20)
+        pool.add(2, 20)
+        pool.discard(1)
+        pool.discard(99)
+        assert pool.user_ids_in_range(18, 100) == [2]
+        pool.update_age(2, 40)
+        pool.update_age(3, 40)
+        assert pool.user_ids_in_range(18, 30) == []
+        assert pool.user_ids_in_range(40, 40) == [2]
+        assert 3 not in pool
+
+    @pytest.mark.django_db
+    def test_member_without_age_is_indexed_once_it_has_one(self, pool):
+        pool.add(1, None)
+        assert 1 in pool and pool.user_ids_in_range(18, 100) == []
+        pool.update_age(1, 30)
+        assert pool.user_ids_in_range(18, 100) == [1]
+
+    @pytest.mark.django_db
+    def test_updates_during_a_rebuild_are_replayed(self):
+        user1 = CustomUser.objects.create_user(username="user1", password="password1", age=20)
+        MatchSuggestion.objects.create(user1=user1, age=20)
+
+        class RacingPool(CandidatePool):
+            def _read_rows(self):
+                rows = super()._read_rows()
+                # Other requests commit while the rebuild is reading the table.
+                self.discard(user1.id)
+                self.add(99, 25)
+                self.set_criteria(99, 18, 19)
+                return rows
+
+        pool = RacingPool()
+        pool.rebuild()
+        pool.rebuild()
+        assert pool.user_ids_in_range(18, 100) == [99]
+        assert pool.user_ids_in_range(18, 100, accepting_age=30) == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rolled_back_transition_leaves_the_pool_alone(self, pool):
+        user1 = CustomUser.objects.create_user(username="user1", password="password1", age=20)
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                create_match_suggestion(user1)
+                raise RuntimeError
+        assert user1.id not in pool
+
+    @pytest.mark.django_db
+    def test_refreshes_after_max_age(self, pool, settings):
+        user1 = CustomUser.objects.create_user(username="user1", password="password1", age=20)
+        MatchSuggestion.objects.create(user1=user1, age=20)
+        assert pool.user_ids_in_range(18, 100) == []
+        settings.MATCHING_POOL_REFRESH_SECONDS = -1
+        assert pool.user_ids_in_range(18, 100) == [user1.id]
+
+    def test_one_reader_rebuilds_an_expired_index(self, settings):
+        reading, release = threading.Event(), threading.Event()
+
+        class SlowPool(CandidatePool):
+            reads = 0
+
+            def _read_rows(self):
+                self.reads += 1
+                if self.reads > 1:
+                    reading.set()
+                    release.wait(5)
+                return [('Unmatched', 20, self.reads, None, None)]
+
+        pool = SlowPool()
+        pool.rebuild()
+        settings.MATCHING_POOL_REFRESH_SECONDS = -1
+        rebuilder = threading.Thread(target=pool.user_ids_in_range, args=(18, 100))
+        rebuilder.start()
+        assert reading.wait(5)
+        # Served from the expired index rather than a second read of the table.
+        assert pool.user_ids_in_range(18, 100) == [1]
+        release.set()
+        rebuilder.join()
+        assert pool.reads == 2
+
+
+class TestDeclinedIndex:
+
+    @pytest.fixture(scope="function")
+    def users(self):
+        return [CustomUser.objects.create_user(username=f"user{index}", password="password") for index in range(4)]
+
+    @pytest.mark.django_db
+    def test_loads_both_directions(self, users):
+        user1, user2, user3, user4 = users
+        DeclinedMatch.objects.create(sender=user1, receiver=user2)
+        DeclinedMatch.objects.create(sender=user3, receiver=user1)
+        index = DeclinedIndex()
+        assert list(index.excluded_ids(user1.id)) == sorted([user2.id, user3.id])
+        assert index.subtract(user1.id, [user4.id, user3.id, user1.id, user2.id]) == [user4.id]
+
+    @pytest.mark.django_db
+    def test_add_updates_loaded_users(self, users, django_assert_num_queries, django_capture_on_commit_callbacks):
+        user1, user2, user3, user4 = users
+        declined_index.excluded_ids(user1.id)
+        with django_capture_on_commit_callbacks(execute=True):
+            add_to_declined_matches(sender=user4, receiver=user1)
+        with django_assert_num_queries(0):
+            assert declined_index.subtract(user1.id, [user2.id, user4.id]) == [user2.id]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rolled_back_decline_is_not_indexed(self, users):
+        user1, user2, user3, user4 = users
+        declined_index.excluded_ids(user1.id)
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                add_to_declined_matches(sender=user4, receiver=user1)
+                raise RuntimeError
+        assert declined_index.subtract(user1.id, [user2.id, user4.id]) == [user2.id, user4.id]
+
+    @pytest.mark.django_db
+    def test_decline_committed_during_a_load_is_kept(self, users):
+        user1, user2, user3, user4 = users
+
+        class RacingIndex(DeclinedIndex):
+            def _load(self, user_id):
+                loaded = super()._load(user_id)
+                # Commits after the load read the table, before its result is stored.
+                self.add(user3.id, user_id)
+                return loaded
+
+        index = RacingIndex()
+        DeclinedMatch.objects.create(sender=user1, receiver=user2)
+        assert list(index.excluded_ids(user1.id)) == sorted([user2.id, user3.id])
+        assert index.subtract(user1.id, [user2.id, user3.id, user4.id]) == [user4.id]
+        assert not index._loading
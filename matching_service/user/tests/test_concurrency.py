@@ -0,0 +1,87 @@
+import threading
+from collections import Counter
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..models import CustomUser, MatchingRequest, MatchSuggestion
+
+
+def run_concurrently(calls):
+    """Start every call at the same moment on its own thread and DB connection."""
+    barrier = threading.Barrier(len(calls))
+    results = [None] * len(calls)
+
+    def worker(index, call):
+        try:
+            barrier.wait()
+            results[index] = call()
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(index, call)) for index, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestConcurrentMatchRequests:
+
+    @pytest.fixture(scope="function")
+    def pool_users(self):
+        users = []
+        for index in range(8):
+            user = CustomUser.objects.create_user(username=f"user{index}", password="password", age=20 + index)
+            MatchSuggestion.objects.create(user1=user, age=user.age)
+            users.append(user)
+        return users
+
+    def post_as(self, user, url):
+        def call():
+            client = APIClient()
+            client.force_authenticate(user=user)
+            return client.post(url, format='json').status_code
+        return call
+
+    @pytest.mark.django_db(transaction=True)
+    def test_one_sender_wins_a_contended_receiver(self, pool_users):
+        receiver, *senders = pool_users
+        url = reverse('match-request-create', kwargs={'receiver_id': receiver.id})
+        codes = run_concurrently([self.post_as(sender, url) for sender in senders])
+        assert Counter(codes) == {status.HTTP_201_CREATED: 1, status.HTTP_409_CONFLICT: len(senders) - 1}
+
+        # Once the winner has committed, the receiver is Pending and every loser still conflicts.
+        losers = [sender for sender, code in zip(senders, codes) if code == status.HTTP_409_CONFLICT]
+        codes = run_concurrently([self.post_as(sender, url) for sender in losers])
+        assert set(codes) == {status.HTTP_409_CONFLICT}
+
+        winner_request = MatchingRequest.objects.get(receiver=receiver)
+        receiver_suggestion = MatchSuggestion.objects.get(user1=receiver)
+        assert receiver_suggestion.state == 'Pending'
+        assert receiver_suggestion.user2_id == winner_request.sender_id
+        assert MatchSuggestion.objects.filter(state='Pending').count() == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_accept_and_decline_race_applies_one_transition(self, pool_users):
+        receiver, sender = pool_users[:2]
+        client = APIClient()
+        client.force_authenticate(user=sender)
+        client.post(reverse('match-request-create', kwargs={'receiver_id': receiver.id}), format='json')
+
+        codes = run_concurrently([
+            self.post_as(receiver, reverse('match-request-accept', kwargs={'sender_id': sender.id})),
+            self.post_as(receiver, reverse('match-request-decline', kwargs={'sender_id': sender.id})),
+        ])
+        assert sorted(codes) == [status.HTTP_200_OK, status.HTTP_409_CONFLICT]
+        state = MatchingRequest.objects.get(sender=sender).state
+        assert state in ('Accepted', 'Declined')
+        if state == 'Accepted':
+            assert not MatchSuggestion.objects.filter(user1__in=[sender, receiver]).exists()
+        else:
+            assert set(MatchSuggestion.objects.filter(user1__in=[sender, receiver])
+                       .values_list('state', flat=True)) == {'Unmatched'}
@@ -0,0 +1,117 @@
+import threading
+
+import psycopg2
+import pytest
+from django.db import connection, connections
+from django.db.utils import load_backend
+
+from matching_service.db.backends.pooled_postgresql.base import close_pools, pool_stats
+from matching_service.db.backends.pooled_postgresql.pool import ConnectionPool, PoolTimeout
+
+
+@pytest.fixture
+def connect():
+    params = connection.get_connection_params()
+    opened = []
+
+    def connect():
+        conn = psycopg2.connect(**params)
+        opened.append(conn)
+        return conn
+    yield connect
+    for conn in opened:
+        conn.close()
+
+
+@pytest.mark.django_db
+class TestConnectionPool:
+
+    def test_returned_connections_are_reused(self, connect):
+        pool = ConnectionPool(connect, max_size=2)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        assert pool.getconn() is conn
+        stats = pool.stats()
+        assert (stats['connections_opened'], stats['checkouts'], stats['in_use'], stats['idle']) == (1, 2, 1, 0)
+
+    def test_open_transaction_is_rolled_back_on_return(self, connect):
+        pool = ConnectionPool(connect)
+        conn = pool.getconn()
+        conn.autocommit = False
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        pool.putconn(conn)
+        assert conn.info.transaction_status == 0  # TRANSACTION_STATUS_IDLE
+
+    def test_checkout_waits_for_a_returned_connection(self, connect):
+        pool = ConnectionPool(connect, max_size=1, timeout=5)
+        conn = pool.getconn()
+        timer = threading.Timer(0.1, pool.putconn, [conn])
+        timer.start()
+        assert pool.getconn() is conn
+        timer.join()
+        assert pool.stats()['checkout_wait_seconds_max'] >= 0.1
+
+    def test_checkout_times_out_when_exhausted(self, connect):
+        pool = ConnectionPool(connect, max_size=1, timeout=0.05)
+        pool.getconn()
+        with pytest.raises(PoolTimeout):
+            pool.getconn()
+        assert pool.stats()['timeouts'] == 1
+
+    def test_old_connections_are_recycled(self, connect):
+        pool = ConnectionPool(connect, max_lifetime=0)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        assert conn.closed
+        assert pool.getconn() is not conn
+        assert pool.stats()['size'] == 1
+
+    def test_dead_idle_connection_is_replaced(self, connect):
+        pool = ConnectionPool(connect, check_idle_after=0)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        with connect().cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [conn.info.backend_pid])
+        replacement = pool.getconn()
+        assert replacement is not conn
+        assert pool.stats()['health_check_failures'] == 1
+
+
+@pytest.mark.django_db
+def test_pooled_backend_returns_connections_to_the_pool():
+    settings_dict = dict(connections.settings['default'], NAME=connection.settings_dict['NAME'],
+                         ENGINE='matching_service.db.backends.pooled_postgresql')
+    wrapper = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, 'pooled')
+    try:
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            pid = cursor.fetchone()[0]
+        wrapper.close()
+        before = pool_stats()[settings_dict['NAME']]
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            assert cursor.fetchone()[0] == pid
+        wrapper.close()
+        after = pool_stats()[settings_dict['NAME']]
+        assert after['connections_opened'] == before['connections_opened']
+        assert after['checkouts'] == before['checkouts'] + 1
+        assert after['idle'] == before['idle']
+    finally:
+        close_pools(settings_dict['NAME'])
+
+
+@pytest.mark.django_db
+def test_pooled_backend_returns_the_connection_when_the_request_ends():
+    settings_dict = dict(connections.settings['default'], NAME=connection.settings_dict['NAME'],
+                         ENGINE='matching_service.db.backends.pooled_postgresql', CONN_MAX_AGE=60)
+    wrapper = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, 'pooled')
+    try:
+        wrapper.ensure_connection()
+        assert pool_stats()[settings_dict['NAME']]['in_use'] == 1
+        # What the request_finished handler does for every connection.
+        wrapper.close_if_unusable_or_obsolete()
+        assert wrapper.connection is None
+        assert pool_stats()[settings_dict['NAME']]['in_use'] == 0
+    finally:
+        close_pools(settings_dict['NAME'])
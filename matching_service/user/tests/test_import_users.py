@@ -0,0 +1,81 @@
+import json
+from io import StringIO
+
+import pytest
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from ..models import CustomUser, DeclinedMatch, MatchingCriteria, MatchSuggestion
+from ..utils.matching_algo import candidate_ids
+
+USERS_CSV = """username,email,first_name,last_name,gender,phone_number,age,min_age,max_age,password,pool
+alice,alice@example.com,Alice,A,F,555-0001,25,20,30,alice-password,
+bob,,Bob,B,M,,27,,35,,true
+carol,,"Carol, Jr.",C,NS,,31,,,,false
+"""
+
+
+def write(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(content)
+    return str(path)
+
+
+class TestImportUsers:
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('copy', [True, False])
+    def test_imports_users_criteria_and_pool(self, tmp_path, copy):
+        args = [write(tmp_path, 'users.csv', USERS_CSV), '--batch-size', '2'] + ([] if copy else ['--no-copy'])
+        call_command('import_users', *args, stderr=StringIO())
+
+        alice = CustomUser.objects.get(username='alice')
+        assert (alice.email, alice.first_name, alice.gender, alice.phone_number, alice.age) == \
+               ('alice@example.com', 'Alice', 'F', '555-0001', 25)
+        assert alice.check_password('alice-password')
+        assert not CustomUser.objects.get(username='bob').has_usable_password()
+        assert CustomUser.objects.get(username='carol').first_name == 'Carol, Jr.'
+        assert set(MatchingCriteria.objects.values_list('user__username', 'min_age', 'max_age')) == \
+               {('alice', 20, 30), ('bob', None, 35)}
+        assert set(MatchSuggestion.objects.values_list('user1__username', 'state', 'age', 'gender')) == \
+               {('alice', 'Unmatched', 25, 'F'), ('bob', 'Unmatched', 27, 'M')}
+        assert candidate_ids(18, 40, alice) == [CustomUser.objects.get(username='bob').id]
+
+    @pytest.mark.django_db
+    def test_shared_password_is_hashed_once(self, tmp_path, monkeypatch):
+        calls = []
+        monkeypatch.setattr('user.utils.importing.make_password',
+                            lambda password: calls.append(password) or make_password(password))
+        call_command('import_users', write(tmp_path, 'users.csv', USERS_CSV), '--shared-password', 'shared',
+                     stderr=StringIO())
+        assert calls == ['shared', None]
+        assert all(user.check_password('shared') for user in CustomUser.objects.all())
+
+    @pytest.mark.django_db
+    def test_jsonl_with_declines(self, tmp_path):
+        users = ''.join(json.dumps({'username': name, 'age': age, 'last_name': 'Tab\there \\N'}) + '\n'
+                        for name, age in [('dave', 22), ('erin', 23)])
+        declines = 'sender,receiver\ndave,erin\n'
+        call_command('import_users', write(tmp_path, 'users.jsonl', users),
+                     '--declines', write(tmp_path, 'declines.csv', declines), stderr=StringIO())
+        assert list(DeclinedMatch.objects.values_list('sender__username', 'receiver__username')) == [('dave', 'erin')]
+        assert CustomUser.objects.get(username='dave').last_name == 'Tab\there \\N'
+        assert candidate_ids(18, 40, CustomUser.objects.get(username='dave')) == []
+
+    @pytest.mark.django_db
+    def test_skip_existing(self, tmp_path):
+        CustomUser.objects.create_user(username='alice', password='password', age=40)
+        stderr = StringIO()
+        call_command('import_users', write(tmp_path, 'users.csv', USERS_CSV), '--skip-existing', stderr=stderr)
+        assert CustomUser.objects.get(username='alice').age == 40
+        assert CustomUser.objects.count() == 3
+        assert 'Imported 2 users (1 skipped)' in stderr.getvalue()
+
+    @pytest.mark.django_db
+    def test_invalid_record_names_its_line(self, tmp_path):
+        content = 'username,age\nfrank,30\ngrace,old\n'
+        with pytest.raises(CommandError, match="line 3: age must be an integer, got 'old'"):
+            call_command('import_users', write(tmp_path, 'users.csv', content), '--batch-size', '1',
+                         stderr=StringIO())
+        assert list(CustomUser.objects.values_list('username', flat=True)) == ['frank']
@@ -0,0 +1,106 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..models import CustomUser, MatchingCriteria, MatchingRequest, MatchSuggestion, MatchUsers
+from ..utils.match_state import MatchState, load_match_state
+from ..utils.matching_algo import create_match_suggestion, create_or_update_matching_criteria
+
+
+class TestLoadMatchState:
+
+    @pytest.fixture(scope="function")
+    def users(self):
+        return [CustomUser.objects.create_user(username=f"user{index}", password="password", age=20 + index)
+                for index in range(2)]
+
+    @pytest.mark.django_db
+    def test_new_user(self, users, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            state = load_match_state(users[0])
+        assert state == MatchState(matched=False, suggestion_state=None, request_state=None, criteria=None,
+                                   age=20, gender=users[0].gender)
+
+    @pytest.mark.django_db
+    def test_waiting_user(self, users, django_assert_num_queries):
+        create_match_suggestion(users[0])
+        create_or_update_matching_criteria(users[0], 18, 30)
+        with django_assert_num_queries(1):
+            state = load_match_state(users[0])
+        assert state == MatchState(matched=False, suggestion_state='Unmatched', request_state=None, criteria=(18, 30),
+                                   age=20, gender=users[0].gender)
+
+    @pytest.mark.django_db
+    def test_sent_request(self, users, django_assert_num_queries):
+        for user in users:
+            MatchSuggestion.objects.create(user1=user, age=user.age, state='Pending')
+        MatchingRequest.objects.create(sender=users[0], receiver=users[1], state='Pending')
+        with django_assert_num_queries(2):
+            sender, receiver = load_match_state(users[0]), load_match_state(users[1])
+        assert (sender.suggestion_state, sender.request_state) == ('Pending', 'Pending')
+        assert (receiver.suggestion_state, receiver.request_state) == ('Pending', None)
+
+    @pytest.mark.django_db
+    def test_matched_either_side(self, users):
+        MatchUsers.objects.create(sender=users[0], receiver=users[1])
+        assert load_match_state(users[0]).matched and load_match_state(users[1]).matched
+
+
+class TestViewsLoadStateOnce:
+    """The match-state reads of each view are the one loader query, whatever branch it takes."""
+
+    @pytest.fixture(scope="function")
+    def client(self):
+        return APIClient()
+
+    @pytest.fixture(scope="function")
+    def user(self, client):
+        user = CustomUser.objects.create_user(username="user", password="password", age=25)
+        client.force_authenticate(user=user)
+        return user
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('endpoint', ['user-status', 'user-request-status',
+                                          'async-user-status', 'async-user-request-status'])
+    def test_status_of_a_new_user(self, client, user, endpoint, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = client.get(reverse(endpoint))
+        assert response.status_code == status.HTTP_200_OK
+
+    @pytest.mark.django_db
+    def test_status_of_a_matched_user(self, client, user, django_assert_num_queries):
+        other = CustomUser.objects.create_user(username="other", password="password", age=26)
+        MatchUsers.objects.create(sender=other, receiver=user)
+        with django_assert_num_queries(1):
+            response = client.get(reverse('user-status'))
+        assert response.data['status'] == "Matched"
+
+    @pytest.mark.django_db
+    def test_status_without_criteria(self, client, user, django_assert_num_queries):
+        # Bulk-imported users are in the pool before they ever save criteria.
+        MatchSuggestion.objects.create(user1=user, age=user.age)
+        with django_assert_num_queries(1):
+            response = client.get(reverse('user-status'))
+        assert response.data == {'status': 'Unmatched', 'Possible Matches': [], 'next': None, 'previous': None}
+
+    @pytest.mark.django_db
+    def test_get_a_match_with_unchanged_criteria_writes_nothing(self, client, user, django_assert_num_queries):
+        other = CustomUser.objects.create_user(username="other", password="password", age=26)
+        for waiting in (user, other):
+            create_match_suggestion(waiting)
+            create_or_update_matching_criteria(waiting, 18, 30)
+        client.post(reverse('get-a-match'), {'min_age': 18, 'max_age': 30}, format='json')
+        # Savepoint pair, the state load and the profiles of the cached candidate ids.
+        with django_assert_num_queries(4):
+            response = client.post(reverse('get-a-match'), {'min_age': 18, 'max_age': 30}, format='json')
+        assert response.data['Status'] == 'Unmatched'
+        assert [match['username'] for match in response.data['possible_matches']] == ['other']
+
+    @pytest.mark.django_db
+    def test_get_a_match_saves_changed_criteria_in_one_statement(self, client, user):
+        client.post(reverse('get-a-match'), {'min_age': 18, 'max_age': 30}, format='json')
+        client.post(reverse('get-a-match'), {'min_age': 20, 'max_age': 40}, format='json')
+        criteria = MatchingCriteria.objects.get(user=user)
+        assert (criteria.min_age, criteria.max_age) == (20, 40)
+        assert MatchSuggestion.objects.filter(user1=user).count() == 1
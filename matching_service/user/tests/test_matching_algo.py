@@ -0,0 +1,163 @@
+import pytest
+
+from ..models import CustomUser, DeclinedMatch, MatchSuggestion
+from ..utils.candidate_pool import candidate_pool
+from ..utils.matching_algo import add_to_declined_matches, create_match_suggestion, \
+    create_or_update_matching_criteria, matching_algorithm, \
+    sync_match_suggestion_profile
+
+
+class TestMatchingAlgorithm:
+
+    @pytest.fixture(scope="function", params=['memory', 'database'], autouse=True)
+    def candidate_pool_backend(self, request, settings):
+        settings.MATCHING_CANDIDATE_POOL = request.param
+        return request.param
+
+    @pytest.fixture(scope="function")
+    def pool_users(self):
+        users = []
+        for index, age in enumerate([20, 25, 26, 40]):
+            user = CustomUser.objects.create_user(username=f"pool{index}", password="password", age=age)
+            create_match_suggestion(user)
+            users.append(user)
+        return users
+
+    @pytest.mark.django_db
+    def test_returns_unmatched_users_in_age_range(self, pool_users):
+        user1, user2, user3, user4 = pool_users
+        candidates = matching_algorithm(18, 30, user1)
+        assert set(candidates.values_list('id', flat=True)) == {user2.id, user3.id}
+
+    @pytest.mark.django_db
+    def test_excludes_declined_users_in_both_directions(self, pool_users):
+        user1, user2, user3, user4 = pool_users
+        DeclinedMatch.objects.create(sender=user1, receiver=user2)
+        DeclinedMatch.objects.create(sender=user3, receiver=user1)
+        assert list(matching_algorithm(18, 30, user1)) == []
+        assert set(matching_algorithm(18, 30, user2).values_list('id', flat=True)) == {user3.id}
+
+    @pytest.mark.django_db
+    def test_excludes_pending_users(self, pool_users):
+        user1, user2, user3, user4 = pool_users
+        MatchSuggestion.objects.filter(user1__in=[user2, user3]).update(state='Pending')
+        candidate_pool.clear()
+        assert list(matching_algorithm(18, 30, user1)) == []
+
+    @pytest.mark.django_db
+    def test_runs_a_single_query(self, pool_users, candidate_pool_backend, settings, django_assert_num_queries):
+        if candidate_pool_backend == 'memory':
+            pytest.skip("the in-memory pool is loaded into its own index rather than queried")
+        # Uncached, the pool is a subquery of the profile query.
+        settings.MATCHING_CANDIDATE_CACHE_TIMEOUT = 0
+        with django_assert_num_queries(1):
+            assert len(list(matching_algorithm(18, 30, pool_users[0]))) == 2
+
+    @pytest.mark.django_db
+    def test_cached_call_runs_a_single_query(self, pool_users, django_assert_num_queries):
+        user1 = pool_users[0]
+        list(matching_algorithm(18, 30, user1))
+        with django_assert_num_queries(1):
+            assert len(list(matching_algorithm(18, 30, user1))) == 2
+
+    @pytest.mark.django_db
+    def test_profile_sync_moves_user_between_age_ranges(self, pool_users, django_capture_on_commit_callbacks):
+        user1, user2, user3, user4 = pool_users
+        user4.age = 29
+        user4.save()
+        assert user4.id not in matching_algorithm(18, 30, user1).values_list('id', flat=True)
+        with django_capture_on_commit_callbacks(execute=True):
+            sync_match_suggestion_profile(user4, 40)
+        assert user4.id in matching_algorithm(18, 30, user1).values_list('id', flat=True)
+
+    @pytest.mark.django_db
+    def test_excludes_candidates_whose_criteria_reject_the_user(self, pool_users):
+        user1, user2, user3, user4 = pool_users
+        create_or_update_matching_criteria(user2, 24, 30)
+        create_or_update_matching_criteria(user3, 18, 22)
+        assert set(matching_algorithm(18, 30, user1).values_list('id', flat=True)) == {user3.id}
+
+    @pytest.mark.django_db
+    def test_criteria_change_after_the_pool_is_loaded(self, pool_users, django_capture_on_commit_callbacks):
+        user1, user2, user3, user4 = pool_users
+        assert set(matching_algorithm(18, 30, user1).values_list('id', flat=True)) == {user2.id, user3.id}
+        with django_capture_on_commit_callbacks(execute=True):
+            create_or_update_matching_criteria(user2, 30, 40)
+        assert set(matching_algorithm(18, 30, user1).values_list('id', flat=True)) == {user3.id}
+
+
+class TestCandidateCache:
+
+    @pytest.fixture(scope="function", autouse=True)
+    def database_backend(self, settings):
+        settings.MATCHING_CANDIDATE_POOL = 'database'
+
+    @pytest.fixture(scope="function")
+    def pool_users(self):
+        users = []
+        for index, age in enumerate([20, 25, 26]):
+            user = CustomUser.objects.create_user(username=f"pool{index}", password="password", age=age)
+            create_match_suggestion(user)
+            users.append(user)
+        return users
+
+    def candidates(self, user, min_age=18, max_age=30):
+        return set(matching_algorithm(min_age, max_age, user).values_list('id', flat=True))
+
+    @pytest.mark.django_db
+    def test_repeated_calls_only_fetch_profiles(self, pool_users, django_assert_num_queries):
+        user1 = pool_users[0]
+        self.candidates(user1)
+        with django_assert_num_queries(1) as queries:
+            self.candidates(user1)
+        # The cached ids are one array parameter, however many there are.
+        assert ' = ANY(' in queries.captured_queries[0]['sql']
+        assert ' IN (' not in queries.captured_queries[0]['sql']
+
+    @pytest.mark.django_db
+    def test_other_age_range_misses(self, pool_users):
+        user1, user2, user3 = pool_users
+        assert self.candidates(user1) == {user2.id, user3.id}
+        assert self.candidates(user1, 25, 25) == {user2.id}
+
+    @pytest.mark.django_db
+    def test_decline_invalidates_both_users(self, pool_users):
+        user1, user2, user3 = pool_users
+        assert self.candidates(user1) == {user2.id, user3.id}
+        assert self.candidates(user2) == {user1.id, user3.id}
+        add_to_declined_matches(sender=user1, receiver=user2)
+        assert self.candidates(user1) == {user3.id}
+        assert self.candidates(user2) == {user3.id}
+
+    @pytest.mark.django_db
+    def test_pool_changes_invalidate_overlapping_ranges(self, pool_users):
+        user1, user2, user3 = pool_users
+        assert self.candidates(user1) == {user2.id, user3.id}
+        user4 = CustomUser.objects.create_user(username="pool3", password="password", age=22)
+        create_match_suggestion(user4)
+        assert self.candidates(user1) == {user2.id, user3.id, user4.id}
+        user4.age = 45
+        user4.save()
+        sync_match_suggestion_profile(user4, 22)
+        assert self.candidates(user1) == {user2.id, user3.id}
+        assert self.candidates(user1, 40, 50) == {user4.id}
+
+    @pytest.mark.django_db
+    def test_pool_changes_outside_the_range_keep_the_entry(self, pool_users, django_assert_num_queries):
+        user1 = pool_users[0]
+        self.candidates(user1)
+        user4 = CustomUser.objects.create_user(username="pool3", password="password", age=60)
+        create_match_suggestion(user4)
+        with django_assert_num_queries(1):
+            self.candidates(user1)
+
+    @pytest.mark.django_db
+    def test_own_age_change_invalidates_own_entry(self, pool_users):
+        user1, user2, user3 = pool_users
+        create_or_update_matching_criteria(user2, 18, 22)
+        assert self.candidates(user1, 25, 30) == {user2.id, user3.id}
+        # 20 and 23 are outside the range, so only the user's own entry says user2 now rejects them.
+        user1.age = 23
+        user1.save()
+        sync_match_suggestion_profile(user1, 20)
+        assert self.candidates(user1, 25, 30) == {user3.id}
@@ -0,0 +1,128 @@
+from io import StringIO
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+
+from ..models import CustomUser, DeclinedMatch, MatchSuggestion, MaterializedSuggestion, PoolChange
+from ..utils.matching_algo import available_candidates, candidate_ids, create_match_suggestion, \
+    create_or_update_matching_criteria, matching_algorithm
+from ..utils.materialized import SuggestionRefresher
+from ..utils.ranking import rank_candidates
+
+
+def candidates(user, min_age=18, max_age=30):
+    # A fresh cache each time, so matching_algorithm reaches the materialized row.
+    cache.clear()
+    return set(matching_algorithm(min_age, max_age, user).values_list('id', flat=True))
+
+
+class TestMaterializedSuggestions:
+
+    @pytest.fixture(scope="function", autouse=True)
+    def enabled(self, settings):
+        settings.MATCHING_MATERIALIZED_SUGGESTIONS = True
+
+    @pytest.fixture(scope="function")
+    def users(self):
+        users = []
+        for index, (age, min_age, max_age) in enumerate([(20, 18, 30), (25, 18, 30), (26, 18, 30), (29, 23, 30),
+                                                         (40, 18, 100)]):
+            user = CustomUser.objects.create_user(username=f"user{index}", password="password", age=age)
+            create_match_suggestion(user)
+            create_or_update_matching_criteria(user, min_age, max_age)
+            users.append(user)
+        SuggestionRefresher().run()
+        return users
+
+    @pytest.mark.django_db
+    def test_refresh_stores_ranked_candidate_ids(self, users, settings):
+        settings.MATCHING_CANDIDATE_POOL = 'database'
+        DeclinedMatch.objects.create(sender=users[2], receiver=users[0])
+        MaterializedSuggestion.objects.update(stale=True)
+        SuggestionRefresher().run()
+        for user in users:
+            row = MaterializedSuggestion.objects.get(user=user)
+            criteria = user.matching_criteria
+            assert (row.min_age, row.max_age, row.stale) == (criteria.min_age, criteria.max_age, False)
+            assert sorted(row.candidate_ids) == sorted(candidate_ids(criteria.min_age, criteria.max_age, user))
+            assert row.candidate_ids == rank_candidates(
+                available_candidates(criteria.min_age, criteria.max_age, user), user, 1000)
+
+    @pytest.mark.django_db
+    def test_keeps_the_best_candidates(self, users, settings):
+        settings.MATCHING_MATERIALIZED_CANDIDATES = 1
+        MaterializedSuggestion.objects.update(stale=True)
+        SuggestionRefresher().run()
+        # user3 rejects user0's age; user2 (26) joined after user1 (25), which outweighs a year of age gap.
+        assert MaterializedSuggestion.objects.get(user=users[0]).candidate_ids == [users[2].id]
+
+    @pytest.mark.django_db
+    def test_failed_refresh_leaves_the_batch_stale(self, users, monkeypatch):
+        MaterializedSuggestion.objects.update(stale=True, candidate_ids=[])
+
+        def fail(batch, pool):
+            raise RuntimeError
+        refresher = SuggestionRefresher()
+        monkeypatch.setattr(refresher, 'refresh', fail)
+        with pytest.raises(RuntimeError):
+            refresher.run()
+        assert not MaterializedSuggestion.objects.filter(stale=False).exists()
+
+        SuggestionRefresher().run()
+        assert MaterializedSuggestion.objects.get(user=users[0]).candidate_ids
+
+    @pytest.mark.django_db
+    def test_poll_reads_the_row_in_two_queries(self, users, django_assert_num_queries):
+        cache.clear()
+        with django_assert_num_queries(2):
+            ids = {user.id for user in matching_algorithm(18, 30, users[0])}
+        assert ids == {users[1].id, users[2].id}
+
+    @pytest.mark.django_db
+    def test_joiners_appear_after_the_next_refresh(self, users):
+        joiner = CustomUser.objects.create_user(username="joiner", password="password", age=24)
+        create_match_suggestion(joiner)
+        assert list(PoolChange.objects.values_list('age', flat=True)) == [24]
+        assert joiner.id not in candidates(users[0])
+
+        refresher = SuggestionRefresher()
+        refresher.run()
+        assert joiner.id in candidates(users[0])
+        assert PoolChange.objects.count() == 0
+        # Every range covers 24; the joiner gets a row once it saves criteria.
+        assert refresher.marked == 5
+        assert not MaterializedSuggestion.objects.filter(stale=True).exists()
+
+    @pytest.mark.django_db
+    def test_leavers_and_declines_are_dropped_before_a_refresh(self, users):
+        MatchSuggestion.objects.filter(user1=users[1]).update(state='Pending')
+        DeclinedMatch.objects.create(sender=users[0], receiver=users[2])
+        assert candidates(users[0]) == set()
+
+    @pytest.mark.django_db
+    def test_criteria_change_falls_back_until_refreshed(self, users):
+        create_or_update_matching_criteria(users[0], 18, 26)
+        assert MaterializedSuggestion.objects.get(user=users[0]).stale
+        assert candidates(users[0], 18, 26) == {users[1].id, users[2].id}
+
+        SuggestionRefresher().run()
+        row = MaterializedSuggestion.objects.get(user=users[0])
+        assert (row.min_age, row.max_age, row.stale) == (18, 26, False)
+
+    @pytest.mark.django_db
+    def test_disabled(self, users, settings):
+        settings.MATCHING_MATERIALIZED_SUGGESTIONS = False
+        settings.MATCHING_CANDIDATE_POOL = 'database'
+        joiner = CustomUser.objects.create_user(username="joiner", password="password", age=24)
+        create_match_suggestion(joiner)
+        assert joiner.id in candidates(users[0])
+        assert not PoolChange.objects.exists()
+
+    @pytest.mark.django_db
+    def test_command_removes_departed_users(self, users):
+        MatchSuggestion.objects.filter(user1=users[4]).delete()
+        err = StringIO()
+        call_command('refresh_suggestions', '--all', stderr=err)
+        assert not MaterializedSuggestion.objects.filter(user=users[4]).exists()
+        assert err.getvalue().startswith("Refreshed 4 materialized suggestions")
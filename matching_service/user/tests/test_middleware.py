@@ -0,0 +1,45 @@
+import pytest
+from django.test import Client
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..authentication import issue_token
+from ..models import CustomUser
+
+
+class TestStatelessAPIMiddleware:
+
+    @pytest.fixture(scope="function")
+    def user(self):
+        return CustomUser.objects.create_user(username="user1", password="password1")
+
+    @pytest.mark.django_db
+    def test_api_requests_skip_browser_middleware(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {issue_token(user)}")
+        response = client.get(reverse('user-request-status'))
+        assert response.status_code == 200
+        assert not hasattr(response.wsgi_request, 'session')
+        assert 'X-Frame-Options' not in response
+        assert not response.cookies
+
+    @pytest.mark.django_db
+    def test_admin_keeps_browser_middleware(self):
+        response = Client().get(reverse('admin:login'))
+        assert hasattr(response.wsgi_request, 'session')
+        assert response['X-Frame-Options'] == 'DENY'
+        assert 'csrftoken' in response.cookies
+
+    @pytest.mark.django_db
+    def test_auth_endpoints_keep_sessions(self, user):
+        response = APIClient().post(reverse('login'), {'username': 'user1', 'password': 'password1'}, format='json')
+        assert response.status_code == 200
+        assert 'sessionid' in response.cookies
+
+    @pytest.mark.django_db
+    def test_browsable_api_keeps_browser_middleware(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {issue_token(user)}")
+        response = client.get(reverse('user-request-status'), HTTP_ACCEPT='text/html')
+        assert hasattr(response.wsgi_request, 'session')
+        assert response['X-Frame-Options'] == 'DENY'
@@ -0,0 +1,89 @@
+import json
+import queue
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..models import CustomUser, MatchEvent
+from ..utils.events import publish_match_event
+from ..utils.matching_algo import create_match_suggestion
+from ..utils.outbox import LocalQueueSink, dispatch_outbox
+
+
+class FailingSink:
+
+    def send(self, events):
+        raise ConnectionError("sink unavailable")
+
+
+class TestOutbox:
+
+    @pytest.fixture(scope="function")
+    def users(self):
+        users = []
+        for index in range(2):
+            user = CustomUser.objects.create_user(username=f"user{index}", password="password", age=20 + index)
+            create_match_suggestion(user)
+            users.append(user)
+        return users
+
+    def post_as(self, user, name, **kwargs):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client.post(reverse(name, kwargs=kwargs), format='json')
+
+    @pytest.mark.django_db
+    def test_transitions_write_events_in_order(self, users):
+        sender, receiver = users
+        self.post_as(sender, 'match-request-create', receiver_id=receiver.id)
+        self.post_as(receiver, 'match-request-accept', sender_id=sender.id)
+        assert list(MatchEvent.objects.order_by('id').values_list('event_type', 'recipients')) == [
+            ('request_received', [receiver.id]),
+            ('request_accepted', [sender.id]),
+            ('matched', [sender.id, receiver.id]),
+        ]
+
+    @pytest.mark.django_db
+    def test_rolled_back_transition_leaves_no_event(self, users):
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                publish_match_event('matched', [users[0].id, users[1].id])
+                raise RuntimeError
+        assert not MatchEvent.objects.exists()
+
+    @pytest.mark.django_db
+    def test_dispatch_drains_in_batches(self, users):
+        for index in range(5):
+            publish_match_event('request_received', [users[1].id], sender=index)
+        target = queue.Queue()
+        assert dispatch_outbox(LocalQueueSink(target), batch_size=2) == 5
+        assert [target.get_nowait()['data']['sender'] for _ in range(5)] == [0, 1, 2, 3, 4]
+        assert not MatchEvent.objects.filter(dispatched_at__isnull=True).exists()
+        assert dispatch_outbox(LocalQueueSink(target), batch_size=2) == 0
+
+    @pytest.mark.django_db
+    def test_failed_batch_is_retried(self, users):
+        publish_match_event('matched', [users[0].id, users[1].id])
+        with pytest.raises(ConnectionError):
+            dispatch_outbox(FailingSink())
+        assert MatchEvent.objects.filter(dispatched_at__isnull=True).count() == 1
+
+    @pytest.mark.django_db
+    def test_command_writes_log_sink(self, users, settings, tmp_path):
+        settings.MATCHING_OUTBOX_LOG_PATH = str(tmp_path / 'events.log')
+        publish_match_event('request_declined', [users[0].id], receiver=users[1].id)
+        call_command('dispatch_outbox', '--sink', 'log', stderr=StringIO())
+        lines = [json.loads(line) for line in (tmp_path / 'events.log').read_text().splitlines()]
+        assert [(line['type'], line['recipients'], line['data']) for line in lines] == [
+            ('request_declined', [users[0].id], {'receiver': users[1].id})]
+
+    @pytest.mark.django_db
+    def test_log_sink_defaults_to_stdout(self, users, capsys):
+        publish_match_event('matched', [users[0].id])
+        call_command('dispatch_outbox', '--sink', 'log', stderr=StringIO())
+        lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [line['type'] for line in lines] == ['matched']
@@ -0,0 +1,52 @@
+import pytest
+from asgiref.sync import async_to_sync
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from ..models import CustomUser
+from ..pagination import ProfileCursorPagination, _position, _reverse_ordering
+
+
+def test_reverse_ordering():
+    assert _reverse_ordering(('-created', 'uuid')) == ('created', '-uuid')
+    assert _reverse_ordering(('pk',)) == ('-pk',)
+
+
+def test_position_of_instances_and_values_rows():
+    assert _position({'pk': 7, 'age': 30}, ('pk',)) == '7'
+    assert _position(CustomUser(pk=7, age=30), ('-age', 'pk')) == '30'
+
+
+class TestAsyncCursorPagination:
+
+    @pytest.fixture(scope="function")
+    def queryset(self):
+        for index in range(5):
+            CustomUser.objects.create_user(username=f"user{index}", password="password")
+        return CustomUser.objects.values('pk', 'username')
+
+    def paginate(self, queryset, url):
+        request = Request(APIRequestFactory().get(url))
+        sync, asynchronous = ProfileCursorPagination(), ProfileCursorPagination()
+        page = sync.paginate_queryset(queryset, request)
+        apage = async_to_sync(asynchronous.apaginate_queryset)(queryset, request)
+        assert apage == page
+        assert asynchronous.get_links() == sync.get_links()
+        return page, sync.get_links()
+
+    @pytest.mark.django_db
+    def test_matches_paginate_queryset_in_both_directions(self, queryset):
+        url, seen = '/profiles/?page_size=2', []
+        while url:
+            page, links = self.paginate(queryset, url)
+            seen.append([row['pk'] for row in page])
+            url = links['next']
+        assert [pk for pks in seen for pk in pks] == sorted(queryset.values_list('pk', flat=True))
+
+        url = links['previous']
+        while url:
+            page, links = self.paginate(queryset, url)
+            assert [row['pk'] for row in page] == seen[-2]
+            seen.pop()
+            url = links['previous']
+        assert len(seen) == 1
@@ -0,0 +1,66 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from ..models import CustomUser, DeclinedMatch, MatchingRequest, MatchSuggestion
+from ..utils.matching_algo import create_match_suggestion, create_or_update_matching_criteria
+from ..utils.pairing import apply_pairs, greedy_pairing, load_pool
+
+
+class TestPairing:
+
+    @pytest.fixture(scope="function")
+    def users(self):
+        users = []
+        for index, (age, min_age, max_age) in enumerate([(20, 18, 30), (21, 18, 30), (22, 18, 30), (23, 18, 30),
+                                                         (40, 35, 45), (50, 18, 100)]):
+            user = CustomUser.objects.create_user(username=f"user{index}", password="password", age=age)
+            create_match_suggestion(user)
+            create_or_update_matching_criteria(user, min_age, max_age)
+            users.append(user)
+        return users
+
+    @pytest.mark.django_db
+    def test_pairs_closest_mutually_compatible_users(self, users):
+        pairs = greedy_pairing(load_pool(), {})
+        assert pairs == [(users[0].id, users[1].id), (users[2].id, users[3].id)]
+
+    @pytest.mark.django_db
+    def test_respects_declines_in_both_directions(self, users):
+        declined = {users[0].id: {users[1].id}, users[1].id: {users[0].id}}
+        pairs = greedy_pairing(load_pool(), declined)
+        # user1-user2 (1 year apart) is taken first, leaving user0 with user3.
+        assert sorted(pairs) == [(users[0].id, users[3].id), (users[1].id, users[2].id)]
+
+    @pytest.mark.django_db
+    def test_neighbor_limit_bounds_the_graph(self, users):
+        pairs = greedy_pairing(load_pool(), {}, neighbors=1, window=1)
+        assert pairs == [(users[0].id, users[1].id), (users[2].id, users[3].id)]
+
+    @pytest.mark.django_db
+    def test_apply_writes_requests_and_suggestions(self, users):
+        MatchingRequest.objects.create(sender=users[2], receiver=users[5], state='Declined')
+        written = apply_pairs([(users[0].id, users[1].id), (users[2].id, users[3].id)])
+        assert len(written) == 2
+        assert set(MatchingRequest.objects.filter(state='Pending').values_list('sender_id', 'receiver_id')) == {
+            (users[0].id, users[1].id), (users[2].id, users[3].id)}
+        assert dict(MatchSuggestion.objects.filter(state='Pending').values_list('user1_id', 'user2_id')) == {
+            users[0].id: users[1].id, users[1].id: users[0].id,
+            users[2].id: users[3].id, users[3].id: users[2].id,
+        }
+
+    @pytest.mark.django_db
+    def test_apply_skips_users_no_longer_unmatched(self, users):
+        MatchSuggestion.objects.filter(user1=users[1]).update(state='Pending')
+        written = apply_pairs([(users[0].id, users[1].id), (users[2].id, users[3].id)])
+        assert written == [(users[2].id, users[3].id)]
+        assert MatchSuggestion.objects.get(user1=users[0]).state == 'Unmatched'
+
+    @pytest.mark.django_db
+    def test_command_pairs_the_pool(self, users):
+        DeclinedMatch.objects.create(sender=users[0], receiver=users[1])
+        call_command('pair_matches', stderr=StringIO())
+        assert set(MatchingRequest.objects.values_list('sender_id', 'receiver_id')) == {
+            (users[0].id, users[3].id), (users[1].id, users[2].id)}
+        assert MatchSuggestion.objects.filter(state='Unmatched').count() == 2
@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+import numpy as np
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models import CustomUser
+from ..utils.matching_algo import create_match_suggestion, create_or_update_matching_criteria
+from ..utils.ranking import rank_candidates, top_k
+
+
+class TestRanking:
+
+    @pytest.fixture(scope="function")
+    def requester(self):
+        user = CustomUser.objects.create_user(username="requester", password="password", age=25)
+        create_or_update_matching_criteria(user, 18, 40)
+        return user
+
+    @pytest.fixture(scope="function")
+    def candidates(self):
+        now = timezone.now()
+        users = {}
+        # name: (age, criteria, joined days ago)
+        for name, (age, criteria, joined) in {
+            'rejects_requester': (25, (30, 40), 0),
+            'accepts_requester': (27, (20, 30), 100),
+            'no_criteria': (25, None, 50),
+            'accepts_farther_age': (31, (18, 60), 100),
+        }.items():
+            user = CustomUser.objects.create_user(username=name, password="password", age=age,
+                                                  date_joined=now - timedelta(days=joined))
+            create_match_suggestion(user)
+            if criteria:
+                create_or_update_matching_criteria(user, *criteria)
+            users[name] = user
+        return users
+
+    def test_top_k_orders_best_first_with_id_tiebreak(self):
+        ids = np.array([10, 11, 12, 13, 14])
+        scores = np.array([0.1, 0.9, 0.5, 0.9, 0.3])
+        assert top_k(ids, scores, 3) == [11, 13, 12]
+        assert top_k(ids, scores, 10) == [11, 13, 12, 14, 10]
+
+    @pytest.mark.django_db
+    def test_ranks_by_mutual_fit_age_and_recency(self, requester, candidates):
+        ranked = rank_candidates(CustomUser.objects.exclude(pk=requester.pk), requester, 10)
+        names = [CustomUser.objects.get(pk=user_id).username for user_id in ranked]
+        assert names == ['accepts_requester', 'accepts_farther_age', 'no_criteria', 'rejects_requester']
+
+    @pytest.mark.django_db
+    def test_score_ordering_on_get_a_match(self, requester, candidates):
+        client = APIClient()
+        client.force_authenticate(user=requester)
+        response = client.post(reverse('get-a-match') + '?ordering=score&page_size=2',
+                               {'min_age': 18, 'max_age': 40}, format='json')
+        # rejects_requester is filtered out before ranking, so no_criteria is now the newest join.
+        assert [match['username'] for match in response.data['possible_matches']] == [
+            'accepts_requester', 'no_criteria']
+        assert response.data['next'] is None
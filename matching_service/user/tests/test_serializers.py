@@ -0,0 +1,24 @@
+import pytest
+from rest_framework import serializers
+
+from ..models import CustomUser
+from ..serializers import UserProfileSerializer
+
+
+class TestUserProfileListSerializer:
+
+    @pytest.fixture(scope="function")
+    def users(self):
+        CustomUser.objects.create_user(username="user1", password="password1", first_name="User1", last_name="USER",
+                                       gender="M", age=20, phone_number="555-555-5555", email="user1@example.com")
+        CustomUser.objects.create_user(username="user2", password="password2")
+        return CustomUser.objects.order_by('pk')
+
+    @pytest.mark.django_db
+    def test_matches_model_serializer_output(self, users):
+        expected = serializers.ListSerializer(users, child=UserProfileSerializer()).data
+        from_queryset = UserProfileSerializer(users, many=True).data
+        from_values = UserProfileSerializer(list(users.values(*UserProfileSerializer.Meta.fields)), many=True).data
+        assert from_queryset == expected
+        assert from_values == expected
+        assert [list(row) for row in from_values] == [list(row) for row in expected]
@@ -4,9 +4,36 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
-from ..models import CustomUser, DeclinedMatch
-
-
+from ..models import CustomUser, DeclinedMatch, MatchingCriteria, MatchingRequest, MatchSuggestion
+from ..pagination import ProfileCursorPagination
+
+# Most queries each endpoint may run, whatever the number of users, requests or
+# candidates involved. Raise a budget only together with the change that needs it.
+QUERY_BUDGETS = {
+    'profile': 0,
+    # One match-state load, then the candidates themselves.
+    'get-a-match': 6,
+    # Includes loading the candidate pool and declined index, which tests start without;
+    # the user's own state is a single query.
+    'user-status': 4,
+    'user-request-status': 1,
+    'match-request-list': 1,
+    # Lock + state changes + one outbox insert, plus savepoints.
+    'match-request-create': 8,
+    'match-request-accept': 8,
+    'match-request-decline': 8,
+    'async-user-status': 4,
+    'async-user-request-status': 1,
+    'async-match-request-list': 1,
+}
+
+
+@pytest.fixture
+def query_budget(django_assert_max_num_queries):
+    """``with query_budget('url-name'):`` fails, listing the SQL, if the block exceeds QUERY_BUDGETS."""
+    def budget(endpoint):
+        return django_assert_max_num_queries(QUERY_BUDGETS[endpoint])
+    return budget
 
 
 class TestGetAMatchView:
@@ -131,7 +158,7 @@ class TestGetAMatchView:
         client.force_authenticate(user=user1)
         url = reverse('match-request-list')
         response = client.get(url, format='json')
-        username = response.data[0]['username']
+        username = response.data['results'][0]['username']
         assert username == 'user2'
 
         # Accept the match request
@@ -187,7 +214,8 @@ class TestGetAMatchView:
 
 
     @pytest.mark.django_db
-    def test_accept_state_transition(self, update_matching_users, client, check_user_status, check_request_status):
+    def test_accept_state_transition(self, update_matching_users, client, check_user_status, check_request_status,
+                                     django_capture_on_commit_callbacks):
         user1, user2, user3 = update_matching_users
         # user1 get a match
         user1_data = {
@@ -231,7 +259,8 @@ class TestGetAMatchView:
         # Decline the match request
         client.force_authenticate(user=user1)
         url = reverse('match-request-decline', kwargs={'sender_id': user2.id})
-        response = client.post(url, format='json')
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.post(url, format='json')
         assert response.data['message'] == 'Match request Declined successfully'
 
         # checks the status of a sent request
@@ -291,3 +320,143 @@ class TestGetAMatchView:
         possible_matches = user3_response_data['possible_matches']
         assert len(possible_matches) == 2
 
+
+class TestUserProfileView:
+
+    @pytest.fixture(scope="function")
+    def client(self):
+        return APIClient()
+
+    @pytest.mark.django_db
+    def test_profile_update_syncs_match_suggestion(self, client):
+        user = CustomUser.objects.create_user(username="user1", password="password1", age=20, gender="M")
+        MatchSuggestion.objects.create(user1=user, age=20, gender="M")
+        client.force_authenticate(user=user)
+        response = client.patch(reverse('profile'), {'age': 31, 'gender': 'F'}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        suggestion = MatchSuggestion.objects.get(user1=user)
+        assert (suggestion.age, suggestion.gender) == (31, 'F')
+
+
+class TestPossibleMatchesPagination:
+
+    @pytest.fixture(scope="function")
+    def client(self):
+        return APIClient()
+
+    @pytest.fixture(scope="function")
+    def pool_users(self):
+        users = []
+        for index in range(5):
+            user = CustomUser.objects.create_user(username=f"user{index}", password="password", age=20 + index)
+            MatchSuggestion.objects.create(user1=user, age=user.age)
+            users.append(user)
+        return users
+
+    @pytest.mark.django_db
+    def test_possible_matches_follow_cursor_in_pk_order(self, client, pool_users):
+        requester = CustomUser.objects.create_user(username="requester", password="password", age=22)
+        client.force_authenticate(user=requester)
+        url = reverse('get-a-match') + '?page_size=2'
+        seen = []
+        while url:
+            response = client.post(url, {'min_age': 18, 'max_age': 30}, format='json')
+            assert len(response.data['possible_matches']) <= 2
+            seen.extend(match['pk'] for match in response.data['possible_matches'])
+            url = response.data['next']
+        assert seen == [user.pk for user in pool_users]
+
+    @pytest.mark.django_db
+    def test_page_size_is_capped(self, client, pool_users, monkeypatch):
+        monkeypatch.setattr(ProfileCursorPagination, 'max_page_size', 3)
+        requester = CustomUser.objects.create_user(username="requester", password="password", age=22)
+        client.force_authenticate(user=requester)
+        response = client.post(reverse('get-a-match') + '?page_size=100', {'min_age': 18, 'max_age': 30},
+                               format='json')
+        assert len(response.data['possible_matches']) == 3
+        response = client.get(reverse('user-status') + '?page_size=100')
+        assert len(response.data['Possible Matches']) == 3
+        assert response.data['next'] is not None
+
+
+class TestTransitionRoundTrips:
+
+    @pytest.fixture(scope="function")
+    def client(self):
+        return APIClient()
+
+    @pytest.fixture(scope="function")
+    def pending_pair(self, client):
+        sender = CustomUser.objects.create_user(username="sender", password="password", age=20)
+        receiver = CustomUser.objects.create_user(username="receiver", password="password", age=21)
+        for user in (sender, receiver):
+            MatchSuggestion.objects.create(user1=user, age=user.age)
+        client.force_authenticate(user=sender)
+        client.post(reverse('match-request-create', kwargs={'receiver_id': receiver.id}), format='json')
+        client.force_authenticate(user=receiver)
+        return sender, receiver
+
+    @pytest.mark.django_db
+    def test_accept_round_trips(self, client, pending_pair, query_budget):
+        sender, receiver = pending_pair
+        with query_budget('match-request-accept'):
+            response = client.post(reverse('match-request-accept', kwargs={'sender_id': sender.id}), format='json')
+        assert response.status_code == status.HTTP_200_OK
+
+    @pytest.mark.django_db
+    def test_decline_round_trips(self, client, pending_pair, query_budget):
+        sender, receiver = pending_pair
+        with query_budget('match-request-decline'):
+            response = client.post(reverse('match-request-decline', kwargs={'sender_id': sender.id}), format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert set(MatchSuggestion.objects.values_list('state', 'user2')) == {('Unmatched', None)}
+
+    @pytest.mark.django_db
+    def test_accept_without_pending_request_conflicts(self, client, pending_pair):
+        sender, receiver = pending_pair
+        client.post(reverse('match-request-decline', kwargs={'sender_id': sender.id}), format='json')
+        response = client.post(reverse('match-request-accept', kwargs={'sender_id': sender.id}), format='json')
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+
+class TestQueryBudgets:
+    """Every endpoint against a user with many candidates and incoming requests, so N+1 queries show."""
+
+    @pytest.fixture(scope="function")
+    def client(self):
+        return APIClient()
+
+    @pytest.fixture(scope="function")
+    def busy_user(self, client):
+        users = CustomUser.objects.bulk_create(CustomUser(username=f"user{i}", age=20 + i) for i in range(12))
+        for user in users:
+            MatchSuggestion.objects.create(user1=user, age=user.age)
+        user = users[0]
+        MatchingCriteria.objects.create(user=user, min_age=18, max_age=40)
+        MatchingRequest.objects.bulk_create(MatchingRequest(sender=sender, receiver=user, state='Pending')
+                                            for sender in users[6:])
+        client.force_authenticate(user=user)
+        return user, users[1]
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('endpoint', ['profile', 'user-status', 'user-request-status', 'match-request-list',
+                                          'async-user-status', 'async-user-request-status',
+                                          'async-match-request-list'])
+    def test_read_endpoints(self, client, busy_user, query_budget, endpoint):
+        with query_budget(endpoint):
+            response = client.get(reverse(endpoint))
+        assert response.status_code == status.HTTP_200_OK
+
+    @pytest.mark.django_db
+    def test_get_a_match(self, client, busy_user, query_budget):
+        with query_budget('get-a-match'):
+            response = client.post(reverse('get-a-match'), {'min_age': 18, 'max_age': 40}, format='json')
+        assert len(response.data['possible_matches']) == 11
+
+    @pytest.mark.django_db
+    def test_send_request(self, client, busy_user, query_budget):
+        user, receiver = busy_user
+        with query_budget('match-request-create'):
+            response = client.post(reverse('match-request-create', kwargs={'receiver_id': receiver.id}),
+                                   format='json')
+        assert response.status_code == status.HTTP_201_CREATED
@@ -2,13 +2,15 @@ from django.urls import path
 from dj_rest_auth.registration.views import RegisterView
 from dj_rest_auth.views import LoginView, LogoutView
 
-from .views import UserProfileView, GetAMatch, MatchRequestListView, MatchRequestCreateView, \
-    MatchRequestAcceptDeclineView, user_match_status, user_match_request_status
+from . import async_views
+from .views import SignedTokenView, UserProfileView, GetAMatch, MatchRequestListView, MatchRequestCreateView, \
+    MatchRequestAcceptDeclineView, metrics, user_match_status, user_match_request_status
 
 urlpatterns = [
     path('auth/register/', RegisterView.as_view(), name='register'),
     path('auth/login/', LoginView.as_view(), name='login'),
     path('auth/logout/', LogoutView.as_view(), name='logout'),
+    path('auth/token/', SignedTokenView.as_view(), name='auth-token'),
     path('profile/', UserProfileView.as_view(), name='profile'),
     path('get-a-match/', GetAMatch.as_view(), name="get-a-match"),
     path('get-status/', user_match_status, name='user-status'),
@@ -19,4 +21,9 @@ urlpatterns = [
          name='match-request-accept'),
     path('api/match-requests/decline/<int:sender_id>/', MatchRequestAcceptDeclineView.as_view({'post': 'decline'}),
          name='match-request-decline'),
+    path('async/get-status/', async_views.user_match_status, name='async-user-status'),
+    path('async/get-request-status/', async_views.user_match_request_status, name='async-user-request-status'),
+    path('async/incoming-requests/', async_views.match_request_list, name='async-match-request-list'),
+    path('events/', async_views.match_events, name='match-events'),
+    path('metrics/', metrics, name='metrics'),
 ]
@@ -0,0 +1,71 @@
+from bisect import bisect_right
+from collections import defaultdict
+
+from django.db.models import Q
+
+from ..models import DeclinedMatch, MatchingCriteria, MatchSuggestion
+from .candidate_pool import accepts_age
+
+
+def load_declined_ids(user_ids=None):
+    """
+    Declined-in-either-direction user ids for every user in ``user_ids`` (everyone when
+    None), in one query.
+    """
+    declined = defaultdict(set)
+    rows = DeclinedMatch.objects.all()
+    if user_ids is not None:
+        rows = rows.filter(Q(sender_id__in=user_ids) | Q(receiver_id__in=user_ids))
+    rows = rows.values_list('sender_id', 'receiver_id')
+    for sender_id, receiver_id in rows.iterator():
+        declined[sender_id].add(receiver_id)
+        declined[receiver_id].add(sender_id)
+    return declined
+
+
+def batch_candidate_ids(criteria, declined=None):
+    """
+    Candidate ids for many users in one pass, with the same result per user as
+    ``candidate_ids``.
+
+    ``criteria`` is an iterable of ``(user_id, min_age, max_age, user_age)``. The
+    Unmatched pool is read once already sorted by age (with each member's own criteria
+    for the mutual check), the ranges are swept over it in ``min_age`` order (the start of
+    each window only moves forward) and declines for every user come from a single query,
+    so the whole batch is two queries however many users it covers. Pass ``declined``
+    (from load_declined_ids) to reuse an already loaded decline map.
+    """
+    criteria = sorted(criteria, key=lambda row: row[1])
+    pool = list(MatchSuggestion.objects.filter(
+        state='Unmatched', user1__isnull=False, age__isnull=False
+    ).order_by('age', 'user1_id').values_list(
+        'age', 'user1_id', 'user1__matching_criteria__min_age', 'user1__matching_criteria__max_age'
+    ))
+    ages = [row[0] for row in pool]
+    if declined is None:
+        declined = load_declined_ids([row[0] for row in criteria])
+
+    results = {}
+    start = 0
+    for user_id, min_age, max_age, user_age in criteria:
+        while start < len(ages) and ages[start] < min_age:
+            start += 1
+        end = bisect_right(ages, max_age, lo=start)
+        excluded = declined.get(user_id, ())
+        results[user_id] = [
+            candidate_id for age, candidate_id, accepts_min, accepts_max in pool[start:end]
+            if candidate_id != user_id and candidate_id not in excluded
+            and (user_age is None or accepts_age((accepts_min, accepts_max), user_age))
+        ]
+    return results
+
+
+def saved_criteria(user_ids=None):
+    """
+    ``(user_id, min_age, max_age, user_age)`` from MatchingCriteria, optionally limited
+    to ``user_ids``.
+    """
+    queryset = MatchingCriteria.objects.filter(min_age__isnull=False, max_age__isnull=False)
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+    return queryset.values_list('user_id', 'min_age', 'max_age', 'user__age')
@@ -0,0 +1,82 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+POOL_VERSION_KEY = 'matching:pool-version'
+# Ages per pool version key: a change at one age invalidates the cached lists whose range
+# overlaps its band, and a lookup reads one key per band its range overlaps.
+AGE_BAND = 5
+
+
+def _candidates_key(user_id):
+    return f'matching:candidates:{user_id}'
+
+
+def _band_version_key(band):
+    return f'{POOL_VERSION_KEY}:{band}'
+
+
+def _version_keys(min_age, max_age):
+    bands = range(min_age // AGE_BAND, max_age // AGE_BAND + 1)
+    return [POOL_VERSION_KEY, *(_band_version_key(band) for band in bands)]
+
+
+def lookup_candidate_ids(user_id, min_age, max_age):
+    """
+    ``(candidate ids, pool versions)`` for ``(user_id, min_age, max_age)``, with None for
+    the ids on a miss. Pass the versions to store_candidate_ids when caching the result.
+
+    Each user has one entry tagged with the age range and the versions of the pool-wide
+    key and of every age band the range overlaps, so a poll is a single ``get_many``.
+    Pool changes bump the bands of the ages involved; changes that only affect some
+    users delete their entries.
+    """
+    version_keys = _version_keys(min_age, max_age)
+    cached = cache.get_many([_candidates_key(user_id), *version_keys])
+    pool_versions = tuple(cached.get(key, 0) for key in version_keys)
+    entry = cached.get(_candidates_key(user_id))
+    if entry is not None and entry[:3] == (pool_versions, min_age, max_age):
+        return entry[3], pool_versions
+    return None, pool_versions
+
+
+def store_candidate_ids(user_id, min_age, max_age, pool_versions, candidate_ids):
+    cache.set(_candidates_key(user_id), (pool_versions, min_age, max_age, candidate_ids),
+              settings.MATCHING_CANDIDATE_CACHE_TIMEOUT)
+
+
+def _bump(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Missing or evicted: restart from a value no earlier entry can have been tagged with.
+            cache.set(key, time.time_ns(), None)
+
+
+def _delete_user_entries(user_ids):
+    cache.delete_many([_candidates_key(user_id) for user_id in user_ids])
+
+
+def invalidate_candidate_pool(*ages):
+    """
+    Pool members at these ages joined, left or changed: the cached lists whose range
+    covers one of them are stale. With no ages, every cached list is. Ages that are
+    None are skipped, since such members are in no list.
+    """
+    if ages:
+        keys = [_band_version_key(band) for band in {age // AGE_BAND for age in ages if age is not None}]
+    else:
+        keys = [POOL_VERSION_KEY]
+    # Once now, so the rest of this transaction reads fresh results, and again on commit,
+    # so a concurrent reader cannot re-cache the pre-commit state.
+    _bump(keys)
+    transaction.on_commit(lambda: _bump(keys))
+
+
+def invalidate_candidates_for(*user_ids):
+    """Something only these users' candidate lists depend on changed (e.g. a decline)."""
+    _delete_user_entries(user_ids)
+    transaction.on_commit(lambda: _delete_user_entries(user_ids))
@@ -0,0 +1,161 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+
+from django.conf import settings
+
+from ..models import MatchSuggestion
+
+
+def accepts_age(criteria, age):
+    """Whether MatchingCriteria bounds ``(min_age, max_age)`` accept ``age``; missing bounds are open."""
+    if criteria is None:
+        return True
+    min_age, max_age = criteria
+    return (min_age is None or min_age <= age) and (max_age is None or age <= max_age)
+
+
+class CandidatePool:
+    """
+    Process-local index of the Unmatched pool, kept as a list of ``(age, user_id)``
+    pairs sorted by age so an age range is two bisects and a slice. Each pool member's
+    own MatchingCriteria bounds are kept alongside, so the slice can be filtered down to
+    users who would also accept the requester.
+
+    The index is built from MatchSuggestion on first use and updated in place by the
+    views' state transitions once they commit. Transitions made by other processes are
+    picked up by a full rebuild once the index is older than
+    ``MATCHING_POOL_REFRESH_SECONDS``, run by one reader while the others keep using the
+    expired index. Updates made while a rebuild is reading the table are replayed onto
+    its result, so they are not lost when it is swapped in.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = []
+        # Every pool member's age, None for members whose age is unknown (not in _entries).
+        self._ages = {}
+        self._criteria = {}
+        self._loaded_at = None
+        # One list of (method, args) per rebuild in progress.
+        self._journals = []
+        # Held by the one thread rebuilding on behalf of readers (see _ensure_loaded).
+        self._rebuild_lock = threading.Lock()
+
+    def rebuild(self):
+        journal = []
+        with self._lock:
+            self._journals.append(journal)
+        try:
+            rows = self._read_rows()
+        except BaseException:
+            with self._lock:
+                self._journals.remove(journal)
+            raise
+        ages = {}
+        criteria = {}
+        for state, age, user_id, min_age, max_age in rows:
+            criteria[user_id] = (min_age, max_age)
+            if state == 'Unmatched':
+                ages[user_id] = age
+        entries = sorted((age, user_id) for user_id, age in ages.items() if age is not None)
+        with self._lock:
+            # Under the same lock as the swap, so no update lands between the replay and the swap.
+            self._journals.remove(journal)
+            self._entries = entries
+            self._ages = ages
+            self._criteria = criteria
+            self._loaded_at = time.monotonic()
+            for method, args in journal:
+                method(*args)
+
+    def _read_rows(self):
+        # Pending users' criteria are loaded too: a decline puts them back in the pool.
+        return list(MatchSuggestion.objects.filter(user1__isnull=False).values_list(
+            'state', 'age', 'user1_id', 'user1__matching_criteria__min_age', 'user1__matching_criteria__max_age'
+        ))
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+            self._ages = {}
+            self._criteria = {}
+            self._loaded_at = None
+
+    def _ensure_loaded(self):
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at <= settings.MATCHING_POOL_REFRESH_SECONDS:
+            return
+        # One thread rebuilds an expired index while the others keep serving it; only the
+        # first build makes readers wait.
+        if not self._rebuild_lock.acquire(blocking=loaded_at is None):
+            return
+        try:
+            if self._loaded_at == loaded_at:
+                self.rebuild()
+        finally:
+            self._rebuild_lock.release()
+
+    def _apply(self, method, *args):
+        with self._lock:
+            for journal in self._journals:
+                journal.append((method, args))
+            # An index that has not been built yet will read the rows from the database.
+            if self._loaded_at is not None:
+                method(*args)
+
+    def add(self, user_id, age):
+        self._apply(self._add, user_id, age)
+
+    def discard(self, *user_ids):
+        self._apply(self._discard, *user_ids)
+
+    def update_age(self, user_id, age):
+        self._apply(self._update_age, user_id, age)
+
+    def set_criteria(self, user_id, min_age, max_age):
+        self._apply(self._set_criteria, user_id, min_age, max_age)
+
+    def _add(self, user_id, age):
+        self._discard(user_id)
+        self._ages[user_id] = age
+        if age is not None:
+            insort(self._entries, (age, user_id))
+
+    def _discard(self, *user_ids):
+        for user_id in user_ids:
+            age = self._ages.pop(user_id, None)
+            if age is not None:
+                index = bisect_left(self._entries, (age, user_id))
+                del self._entries[index]
+
+    def _update_age(self, user_id, age):
+        if user_id in self._ages:
+            self._add(user_id, age)
+
+    def _set_criteria(self, user_id, min_age, max_age):
+        self._criteria[user_id] = (min_age, max_age)
+
+    def user_ids_in_range(self, min_age, max_age, accepting_age=None):
+        """
+        Pool members aged [min_age, max_age], in age order. With ``accepting_age``, only
+        those whose own criteria accept a user of that age.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            start = bisect_left(self._entries, (min_age,))
+            end = bisect_right(self._entries, (max_age, float('inf')))
+            if accepting_age is None:
+                return [user_id for age, user_id in self._entries[start:end]]
+            criteria = self._criteria
+            return [user_id for age, user_id in self._entries[start:end]
+                    if accepts_age(criteria.get(user_id), accepting_age)]
+
+    def __contains__(self, user_id):
+        return user_id in self._ages
+
+    def __len__(self):
+        return len(self._entries)
+
+
+candidate_pool = CandidatePool()
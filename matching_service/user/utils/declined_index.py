@@ -0,0 +1,99 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+
+from ..models import DeclinedMatch
+
+
+def _contains(sorted_ids, user_id):
+    index = bisect_left(sorted_ids, user_id)
+    return index < len(sorted_ids) and sorted_ids[index] == user_id
+
+
+class DeclinedIndex:
+    """
+    Process-local exclusion sets built from DeclinedMatch: for each user, a sorted
+    ``array('q')`` of everyone they declined or were declined by (8 bytes per id).
+
+    A user's array is loaded with one query the first time it is needed, kept in an LRU
+    of ``MATCHING_DECLINED_CACHE_SIZE`` users, updated in place by add_to_declined_matches
+    and reloaded once older than ``MATCHING_POOL_REFRESH_SECONDS``. Pairs added while a
+    user's array is being loaded are merged into it before it is stored, since the load
+    may have read the table before they committed.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._excluded = OrderedDict()
+        # user_id -> one set per load in progress, of the ids added for that user meanwhile.
+        self._loading = {}
+
+    def clear(self):
+        with self._lock:
+            self._excluded.clear()
+
+    def _load(self, user_id):
+        rows = DeclinedMatch.objects.filter(
+            Q(sender_id=user_id) | Q(receiver_id=user_id)
+        ).values_list('sender_id', 'receiver_id')
+        other_ids = {receiver_id if sender_id == user_id else sender_id for sender_id, receiver_id in rows}
+        return array('q', sorted(other_ids))
+
+    def excluded_ids(self, user_id):
+        with self._lock:
+            entry = self._excluded.get(user_id)
+            if entry is not None and time.monotonic() - entry[0] <= settings.MATCHING_POOL_REFRESH_SECONDS:
+                self._excluded.move_to_end(user_id)
+                return entry[1]
+            added = set()
+            self._loading.setdefault(user_id, []).append(added)
+        try:
+            excluded = self._load(user_id)
+        finally:
+            with self._lock:
+                self._stop_recording(user_id, added)
+        with self._lock:
+            if added:
+                excluded = array('q', sorted(added.union(excluded)))
+            self._excluded[user_id] = (time.monotonic(), excluded)
+            self._excluded.move_to_end(user_id)
+            while len(self._excluded) > settings.MATCHING_DECLINED_CACHE_SIZE:
+                self._excluded.popitem(last=False)
+        return excluded
+
+    def _stop_recording(self, user_id, added):
+        loads = self._loading[user_id]
+        del loads[next(index for index, load in enumerate(loads) if load is added)]
+        if not loads:
+            del self._loading[user_id]
+
+    def add(self, sender_id, receiver_id):
+        with self._lock:
+            for user_id, other_id in ((sender_id, receiver_id), (receiver_id, sender_id)):
+                for added in self._loading.get(user_id, ()):
+                    added.add(other_id)
+                entry = self._excluded.get(user_id)
+                if entry is None:
+                    continue
+                excluded = entry[1]
+                index = bisect_left(excluded, other_id)
+                if index == len(excluded) or excluded[index] != other_id:
+                    excluded.insert(index, other_id)
+
+    def subtract(self, user_id, candidate_ids):
+        """``candidate_ids`` without ``user_id`` and without anyone excluded for them."""
+        excluded = self.excluded_ids(user_id)
+        if not excluded:
+            return [candidate_id for candidate_id in candidate_ids if candidate_id != user_id]
+        return [
+            candidate_id for candidate_id in candidate_ids
+            if candidate_id != user_id and not _contains(excluded, candidate_id)
+        ]
+
+
+declined_index = DeclinedIndex()
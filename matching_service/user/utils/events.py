@@ -0,0 +1,109 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from ..models import MatchEvent
+
+# Event types pushed to subscribers of the match event stream.
+REQUEST_RECEIVED = 'request_received'
+REQUEST_ACCEPTED = 'request_accepted'
+REQUEST_DECLINED = 'request_declined'
+MATCHED = 'matched'
+
+
+class InProcessBroker:
+    """
+    Pub/sub between the views' transitions and the event stream, within one process.
+
+    Each subscriber gets an ``asyncio.Queue`` bound to its event loop. ``publish`` may be
+    called from any thread (the sync views run in worker threads), so events are handed
+    to each queue's loop with ``call_soon_threadsafe``. A subscriber that stops reading
+    loses its oldest events once its queue holds ``MATCHING_EVENT_QUEUE_SIZE``.
+
+    Only clients connected to the same process see an event. Deployments with several
+    processes set MATCHING_EVENT_BROKER to a class with the same three methods backed by
+    a shared channel.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(dict)
+
+    def subscribe(self, user_id):
+        """
+        A queue receiving ``(event_id, event_type, data)`` for ``user_id``; call from the
+        subscriber's event loop.
+        """
+        queue = asyncio.Queue(maxsize=settings.MATCHING_EVENT_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[user_id][queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self._lock:
+            queues = self._subscribers.get(user_id)
+            if queues is not None:
+                queues.pop(queue, None)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_id, event_id, event_type, data):
+        with self._lock:
+            queues = list(self._subscribers.get(user_id, {}).items())
+        for queue, loop in queues:
+            try:
+                loop.call_soon_threadsafe(_put_dropping_oldest, queue, (event_id, event_type, data))
+            except RuntimeError:
+                # The subscriber's loop has already closed; its stream is gone.
+                self.unsubscribe(user_id, queue)
+
+
+def _put_dropping_oldest(queue, event):
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The MATCHING_EVENT_BROKER instance for this process."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.MATCHING_EVENT_BROKER)()
+    return _broker
+
+
+def publish_match_event(event_type, recipient_ids, **data):
+    """Publish one event; see publish_match_events."""
+    publish_match_events([(event_type, recipient_ids, data)])
+
+
+def publish_match_events(events):
+    """
+    Record ``(event_type, recipient_ids, data)`` events in the MatchEvent outbox as part
+    of the current transaction, and push them to the recipients' streams once it commits.
+
+    The outbox row commits or rolls back with the transition that caused it, so
+    dispatch_outbox sees exactly the committed changes, in order. A rolled-back
+    transition is never announced on either path.
+    """
+    rows = MatchEvent.objects.bulk_create(
+        MatchEvent(event_type=event_type, recipients=list(recipient_ids), payload=data)
+        for event_type, recipient_ids, data in events
+    )
+
+    def publish():
+        broker = get_broker()
+        for row in rows:
+            for user_id in row.recipients:
+                broker.publish(user_id, row.id, row.event_type, row.payload)
+    transaction.on_commit(publish)
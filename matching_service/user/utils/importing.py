@@ -0,0 +1,229 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ..models import GENDER_SELECTION, CustomUser, DeclinedMatch, MatchingCriteria, MatchSuggestion
+from .candidate_cache import invalidate_candidate_pool
+from .materialized import mark_all_stale
+
+DEFAULT_BATCH_SIZE = 5000
+
+PROFILE_FIELDS = ('username', 'email', 'first_name', 'last_name', 'gender', 'phone_number')
+GENDERS = {value for value, label in GENDER_SELECTION}
+
+
+class RecordError(ValueError):
+    """A record that cannot be imported; the message names its line."""
+
+
+def read_records(stream, format):
+    """``(line, record dict)`` from a ``'csv'`` (with a header row) or ``'jsonl'`` stream."""
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif format == 'jsonl':
+        for line, text in enumerate(stream, start=1):
+            if text.strip():
+                try:
+                    yield line, json.loads(text)
+                except ValueError as error:
+                    raise RecordError(f'line {line}: {error}')
+    else:
+        raise ValueError(f'Unknown format {format!r}')
+
+
+def _int_or_none(record, field, line):
+    value = record.get(field)
+    if value in (None, ''):
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise RecordError(f'line {line}: {field} must be an integer, got {value!r}')
+    if value < 0:
+        raise RecordError(f'line {line}: {field} must not be negative')
+    return value
+
+
+def _flag(record, field, default):
+    value = record.get(field)
+    if value in (None, ''):
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'y', 't')
+    return bool(value)
+
+
+def parse_user(record, line):
+    """
+    A user record normalized for import. Recognised fields: the CustomUser profile fields
+    and ``age``; ``password`` (plain text) or ``password_hash`` (already hashed); ``min_age``
+    and ``max_age`` for MatchingCriteria; ``pool`` (default true) to add an Unmatched
+    MatchSuggestion. Unknown fields are ignored.
+    """
+    username = (record.get('username') or '').strip()
+    if not username:
+        raise RecordError(f'line {line}: username is required')
+    user = {field: str(record.get(field) or '') for field in PROFILE_FIELDS}
+    user['username'] = username
+    if user['gender'] and user['gender'] not in GENDERS:
+        raise RecordError(f'line {line}: gender must be one of {sorted(GENDERS)}, got {user["gender"]!r}')
+    user['age'] = _int_or_none(record, 'age', line)
+    min_age, max_age = _int_or_none(record, 'min_age', line), _int_or_none(record, 'max_age', line)
+    return {
+        'user': user,
+        'password': record.get('password') or None,
+        'password_hash': record.get('password_hash') or None,
+        'criteria': (min_age, max_age) if min_age is not None or max_age is not None else None,
+        'pool': _flag(record, 'pool', True),
+    }
+
+
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _copy_value(value):
+    if value is None:
+        return r'\N'
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def copy_rows(model, fields, rows):
+    """Load ``rows`` (tuples in ``fields`` order) into ``model``'s table with one COPY."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(value) for value in row) + '\n')
+    buffer.seek(0)
+    columns = ', '.join(connection.ops.quote_name(model._meta.get_field(field).column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.cursor.copy_expert(f'COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN',
+                                  buffer)
+
+
+def copy_available():
+    """Whether the default database can load with COPY (PostgreSQL through psycopg2)."""
+    if connection.vendor != 'postgresql':
+        return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    return not is_psycopg3
+
+
+class UserImporter:
+    """
+    Loads user records in batches, each batch in its own transaction: the users, then
+    their MatchingCriteria and Unmatched MatchSuggestion rows.
+
+    Rows are written with PostgreSQL COPY when ``use_copy`` (the default where
+    available) and with ``bulk_create`` otherwise. With ``shared_password`` every
+    imported user gets that password, hashed once, instead of a per-row hash of its
+    ``password`` field (per-row hashing costs the full PBKDF2 work factor each). Rows
+    without either get an unusable password.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, use_copy=None, shared_password=None, skip_existing=False):
+        self.batch_size = batch_size
+        self.use_copy = copy_available() if use_copy is None else use_copy
+        self.shared_hash = make_password(shared_password) if shared_password is not None else None
+        self.unusable_hash = make_password(None)
+        self.skip_existing = skip_existing
+        self.users = self.skipped = self.criteria = self.suggestions = 0
+
+    def password_hash(self, record):
+        if self.shared_hash is not None:
+            return self.shared_hash
+        if record['password_hash']:
+            return record['password_hash']
+        if record['password']:
+            return make_password(record['password'])
+        return self.unusable_hash
+
+    def import_users(self, records):
+        """Import ``(line, record)`` pairs; returns the number of users created."""
+        records = iter(records)
+        while batch := [parse_user(record, line) for line, record in islice(records, self.batch_size)]:
+            self.import_batch(batch)
+        invalidate_candidate_pool()
+        mark_all_stale()
+        return self.users
+
+    @transaction.atomic
+    def import_batch(self, batch):
+        if self.skip_existing:
+            existing = set(CustomUser.objects.filter(
+                username__in=[record['user']['username'] for record in batch]
+            ).values_list('username', flat=True))
+            self.skipped += sum(record['user']['username'] in existing for record in batch)
+            batch = [record for record in batch if record['user']['username'] not in existing]
+            if not batch:
+                return
+        now = timezone.now()
+        passwords = [self.password_hash(record) for record in batch]
+        if self.use_copy:
+            # Plain tuples: building model instances would cost more than the COPY itself.
+            fields = PROFILE_FIELDS + ('age', 'password', 'is_superuser', 'is_staff', 'is_active', 'date_joined')
+            copy_rows(CustomUser, fields, (
+                tuple(record['user'][field] for field in PROFILE_FIELDS) +
+                (record['user']['age'], password, False, False, True, now)
+                for record, password in zip(batch, passwords)
+            ))
+            ids = dict(CustomUser.objects.filter(username__in=[record['user']['username'] for record in batch])
+                       .values_list('username', 'id'))
+            user_ids = [ids[record['user']['username']] for record in batch]
+        else:
+            users = CustomUser.objects.bulk_create(
+                CustomUser(password=password, date_joined=now, **record['user'])
+                for record, password in zip(batch, passwords)
+            )
+            user_ids = [user.id for user in users]
+
+        criteria = [(user_id,) + record['criteria'] for user_id, record in zip(user_ids, batch)
+                    if record['criteria'] is not None]
+        suggestions = [(user_id, 'Unmatched', record['user']['age'], record['user']['gender'])
+                       for user_id, record in zip(user_ids, batch) if record['pool']]
+        if self.use_copy:
+            copy_rows(MatchingCriteria, ('user_id', 'min_age', 'max_age'), criteria)
+            copy_rows(MatchSuggestion, ('user1_id', 'state', 'age', 'gender'), suggestions)
+        else:
+            MatchingCriteria.objects.bulk_create(MatchingCriteria(user_id=user_id, min_age=min_age, max_age=max_age)
+                                                 for user_id, min_age, max_age in criteria)
+            MatchSuggestion.objects.bulk_create(MatchSuggestion(user1_id=user_id, state=state, age=age, gender=gender)
+                                                for user_id, state, age, gender in suggestions)
+        self.users += len(batch)
+        self.criteria += len(criteria)
+        self.suggestions += len(suggestions)
+
+    def import_declines(self, records):
+        """
+        Import ``(line, record)`` pairs with ``sender`` and ``receiver`` usernames as
+        DeclinedMatch rows (``receiver`` declined ``sender``). Returns how many were created.
+        """
+        created = 0
+        records = iter(records)
+        while batch := list(islice(records, self.batch_size)):
+            created += self.import_decline_batch(batch)
+        return created
+
+    @transaction.atomic
+    def import_decline_batch(self, batch):
+        usernames = {record.get(field) for line, record in batch for field in ('sender', 'receiver')}
+        ids = dict(CustomUser.objects.filter(username__in=usernames).values_list('username', 'id'))
+        rows = []
+        for line, record in batch:
+            try:
+                rows.append((ids[record.get('sender')], ids[record.get('receiver')]))
+            except KeyError as error:
+                raise RecordError(f'line {line}: unknown user {error.args[0]!r}')
+        now = timezone.now()
+        if self.use_copy:
+            copy_rows(DeclinedMatch, ('sender_id', 'receiver_id', 'timestamp'),
+                      ((sender_id, receiver_id, now) for sender_id, receiver_id in rows))
+        else:
+            DeclinedMatch.objects.bulk_create(DeclinedMatch(sender_id=sender_id, receiver_id=receiver_id)
+                                              for sender_id, receiver_id in rows)
+        return len(rows)
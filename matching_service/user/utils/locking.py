@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.db import OperationalError
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from ..models import MatchSuggestion
+
+
+class MatchStateConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Another request is changing the match state of these users, please retry.'
+    default_code = 'match_state_conflict'
+
+
+def lock_match_suggestions(*user_ids):
+    """
+    Lock the MatchSuggestion rows of ``user_ids`` for the rest of the transaction and
+    return them keyed by user id.
+
+    Every transition that touches a pair of users takes these locks first, always in
+    ascending user id order, so two transactions over the same users queue (or fail fast)
+    instead of deadlocking. With MATCHING_LOCK_NOWAIT a row already locked by another
+    transaction raises MatchStateConflict (HTTP 409) immediately rather than waiting.
+    """
+    user_ids = sorted(set(user_ids))
+    queryset = MatchSuggestion.objects.select_for_update(nowait=settings.MATCHING_LOCK_NOWAIT)
+    try:
+        return {suggestion.user1_id: suggestion
+                for suggestion in queryset.filter(user1_id__in=user_ids).order_by('user1_id')}
+    except OperationalError:
+        raise MatchStateConflict()
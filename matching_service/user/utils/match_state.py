@@ -0,0 +1,61 @@
+from dataclasses import dataclass
+
+from django.db.models import Exists, OuterRef, Q, Subquery
+
+from ..models import CustomUser, MatchingRequest, MatchSuggestion, MatchUsers
+
+
+@dataclass(frozen=True)
+class MatchState:
+    """
+    Where a user stands in the match lifecycle, as loaded by load_match_state: whether
+    they are matched, their MatchSuggestion state ('Unmatched' or 'Pending', None when
+    they are not in the pool), the state of the MatchingRequest they sent (None when
+    they have not sent one) and their saved MatchingCriteria ``(min_age, max_age)``
+    (None when they have none). Also their current age and gender, which matching
+    reads and MatchSuggestion copies.
+    """
+    matched: bool
+    suggestion_state: str | None
+    request_state: str | None
+    criteria: tuple | None
+    age: int | None
+    gender: str
+
+    def apply_profile(self, user):
+        """
+        Copy the age and gender read with this state onto ``user``. ``request.user`` may be
+        a snapshot from the authentication user cache, taken before a profile update.
+        """
+        user.age = self.age
+        user.gender = self.gender
+
+
+def match_state_query(user_id):
+    """
+    One row for ``user_id`` with everything MatchState needs: the match is an EXISTS,
+    the suggestion and sent request are scalar subqueries on their user indexes, the
+    criteria are a left join and the profile columns come from the user row itself.
+    """
+    return CustomUser.objects.filter(pk=user_id).annotate(
+        matched=Exists(MatchUsers.objects.filter(Q(sender_id=OuterRef('pk')) | Q(receiver_id=OuterRef('pk')))),
+        suggestion_state=Subquery(MatchSuggestion.objects.filter(user1_id=OuterRef('pk')).values('state')[:1]),
+        request_state=Subquery(MatchingRequest.objects.filter(sender_id=OuterRef('pk')).values('state')[:1]),
+    ).values_list('matched', 'suggestion_state', 'request_state', 'matching_criteria__id',
+                  'matching_criteria__min_age', 'matching_criteria__max_age', 'age', 'gender')
+
+
+def _match_state(row):
+    matched, suggestion_state, request_state, criteria_id, min_age, max_age, age, gender = row
+    return MatchState(matched=matched, suggestion_state=suggestion_state, request_state=request_state,
+                      criteria=(min_age, max_age) if criteria_id is not None else None, age=age, gender=gender)
+
+
+def load_match_state(user):
+    """``user``'s MatchState, in one query."""
+    return _match_state(match_state_query(user.pk).get())
+
+
+async def aload_match_state(user):
+    """load_match_state for async views."""
+    return _match_state(await match_state_query(user.pk).aget())
@@ -1,28 +1,156 @@
+from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.db import transaction
+from django.db.models import BigIntegerField, Exists, F, Lookup, OuterRef, Q, Value
+
 from ..models import DeclinedMatch, MatchingCriteria, MatchSuggestion, CustomUser
+from .candidate_cache import invalidate_candidate_pool, invalidate_candidates_for, lookup_candidate_ids, \
+    store_candidate_ids
+from .candidate_pool import candidate_pool
+from .declined_index import declined_index
+from .materialized import mark_pool_changed, mark_stale, materialized_candidate_ids
+
+# Columns read by UserProfileSerializer; candidates never load anything else.
+PROFILE_FIELDS = ('id', 'email', 'phone_number', 'gender', 'first_name', 'last_name', 'username', 'age')
+
+
+class AnyOf(Lookup):
+    """``lhs = ANY(rhs)`` for an array ``rhs``, bound as a single parameter."""
+    lookup_name = 'any'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} = ANY({rhs})', (*lhs_params, *rhs_params)
+
+
+def id_in(ids):
+    """``id = ANY(ids)``: unlike ``id__in``, the ids are bound as one array rather than one placeholder each."""
+    return AnyOf(F('id'), Value(ids, output_field=ArrayField(BigIntegerField())))
 
 
 def add_to_declined_matches(sender, receiver):
-    declined_match = DeclinedMatch.objects.create(sender=sender, receiver=receiver)
-    declined_match.save()
+    DeclinedMatch.objects.create(sender=sender, receiver=receiver)
+    # After commit, so a rolled back decline does not hide the pair from each other.
+    transaction.on_commit(lambda: declined_index.add(sender.id, receiver.id))
+    invalidate_candidates_for(sender.id, receiver.id)
+
+
+def create_or_update_matching_criteria(requested_user, min_age, max_age, state=None):
+    """
+    Save ``requested_user``'s criteria if they changed. Pass their MatchState to skip
+    looking the current criteria up again; the write is a single upsert either way.
+    """
+    if state is not None:
+        current = state.criteria
+    else:
+        current = MatchingCriteria.objects.filter(user=requested_user).values_list('min_age', 'max_age').first()
+    if current == (min_age, max_age):
+        return
+    MatchingCriteria.objects.bulk_create(
+        [MatchingCriteria(user=requested_user, min_age=min_age, max_age=max_age)],
+        update_conflicts=True, unique_fields=['user'], update_fields=['min_age', 'max_age'],
+    )
+    # Other users' candidate lists depend on this user's criteria through the mutual check.
+    transaction.on_commit(lambda: candidate_pool.set_criteria(requested_user.id, min_age, max_age))
+    invalidate_candidate_pool(requested_user.age)
+    mark_stale(requested_user.id)
+    mark_pool_changed(requested_user.age)
 
 
-def create_or_update_matching_criteria(requested_user, min_age, max_age):
-    matching_criteria, created = MatchingCriteria.objects.get_or_create(user=requested_user)
-    matching_criteria.min_age = min_age
-    matching_criteria.max_age = max_age
-    matching_criteria.save()
+def create_match_suggestion(user):
+    suggestion = MatchSuggestion.objects.create(user1=user, age=user.age, gender=user.gender)
+    age = user.age
+    transaction.on_commit(lambda: candidate_pool.add(user.id, age))
+    invalidate_candidate_pool(age)
+    mark_pool_changed(user.age)
+    return suggestion
+
+
+def sync_match_suggestion_profile(user, previous_age):
+    """Copy ``user``'s saved profile to their MatchSuggestion; ``previous_age`` is their age before the save."""
+    MatchSuggestion.objects.filter(user1=user).update(age=user.age, gender=user.gender)
+    age = user.age
+    transaction.on_commit(lambda: candidate_pool.update_age(user.id, age))
+    # Lists at both ages change, and the user's own list through the mutual check.
+    invalidate_candidate_pool(previous_age, age)
+    invalidate_candidates_for(user.id)
+    mark_pool_changed(user.age)
+
+
+def candidate_ids(min_age, max_age, user):
+    """
+    Ids of users in the Unmatched pool within [min_age, max_age] whose own MatchingCriteria
+    also accept ``user``'s age (when known), excluding ``user`` and anyone who declined or
+    was declined by ``user``.
+
+    With MATCHING_CANDIDATE_POOL = 'memory' the ids come from the process-local
+    candidate_pool and declined_index without touching the database. With 'database'
+    they come from one query (see available_candidates).
+    """
+    if settings.MATCHING_CANDIDATE_POOL == 'memory':
+        pool_ids = candidate_pool.user_ids_in_range(min_age, max_age, accepting_age=user.age)
+        return declined_index.subtract(user.id, pool_ids)
+    return list(available_candidates(min_age, max_age, user).values_list('id', flat=True))
+
+
+def available_candidates(min_age, max_age, user, ids=None):
+    """
+    The users candidate_ids returns, as a CustomUser queryset: in the Unmatched pool
+    within [min_age, max_age], accepting ``user``'s age, not ``user`` and not declined
+    either way. The pool is range-scanned on MatchSuggestion, the candidates' criteria
+    are a join and both DeclinedMatch directions are anti-joins. With ``ids``, only
+    those users are checked, so the query never reads the rest of the pool.
+    """
+    if ids is None:
+        pool = MatchSuggestion.objects.filter(state='Unmatched', age__gte=min_age, age__lte=max_age)
+        candidates = CustomUser.objects.all()
+    else:
+        # Probed per candidate rather than range-scanned; the age copy on CustomUser is checked
+        # instead. One placeholder per id would cost the ORM more than the query itself.
+        pool = MatchSuggestion.objects.filter(state='Unmatched')
+        candidates = CustomUser.objects.filter(id_in(ids), age__gte=min_age, age__lte=max_age)
+    declined_by_candidate = DeclinedMatch.objects.filter(sender_id=user.id, receiver=OuterRef('pk'))
+    declined_by_user = DeclinedMatch.objects.filter(receiver_id=user.id, sender=OuterRef('pk'))
+    candidates = candidates.filter(
+        id__in=pool.values('user1_id'),
+    )
+    if user.age is not None:
+        candidates = candidates.filter(
+            Q(matching_criteria__min_age__isnull=True) | Q(matching_criteria__min_age__lte=user.age),
+            Q(matching_criteria__max_age__isnull=True) | Q(matching_criteria__max_age__gte=user.age),
+        )
+    return candidates.exclude(
+        id=user.id
+    ).exclude(
+        Exists(declined_by_candidate)
+    ).exclude(
+        Exists(declined_by_user)
+    )
 
 
 def matching_algorithm(min_age, max_age, user):
-    decline_requests_by_receivers = DeclinedMatch.objects.filter(sender_id=user.id).values_list('receiver_id',
-                                                                                                flat=True)
-    decline_requests_by_sender = DeclinedMatch.objects.filter(receiver_id=user.id).values_list('sender_id', flat=True)
-    excluded_user_ids = set(decline_requests_by_receivers) | set(decline_requests_by_sender) | {user.id}
-    users_in_age_range = MatchSuggestion.objects.filter(
-        state='Unmatched',
-        user1__age__gte=min_age,
-        user1__age__lte=max_age
-    ).exclude(id__in=excluded_user_ids)
-    user1_ids = users_in_age_range.values_list('user1', flat=True)
-    custom_users_queryset = CustomUser.objects.filter(id__in=user1_ids)
-    return custom_users_queryset
+    """
+    Profiles of the users returned by candidate_ids. The id list is cached per user and
+    range until the pool within that range or the user's declines change, so repeated
+    polls only fetch the profiles by primary key, with the ids bound as one array. With
+    the cache disabled, the database pool stays a subquery of the profile query instead.
+
+    On a cache miss, a MaterializedSuggestion row for this range stands in for
+    recomputing the list: its stored ids are re-checked by available_candidates in the
+    profile query, so users who left the pool or were declined since the last refresh
+    are dropped, and the read costs the same whatever the size of the pool. The row
+    holds at most ``MATCHING_MATERIALIZED_CANDIDATES`` ids, the best ranked at its last
+    refresh, so the result is that subset of the live candidates rather than all of
+    them, and lacks users who joined since.
+    """
+    if settings.MATCHING_CANDIDATE_CACHE_TIMEOUT == 0 and settings.MATCHING_CANDIDATE_POOL != 'memory':
+        return available_candidates(min_age, max_age, user).only(*PROFILE_FIELDS)
+    ids, pool_versions = lookup_candidate_ids(user.id, min_age, max_age)
+    if ids is None:
+        materialized_ids = materialized_candidate_ids(user.id, min_age, max_age)
+        if materialized_ids is not None:
+            return available_candidates(min_age, max_age, user, ids=materialized_ids).only(*PROFILE_FIELDS)
+        ids = candidate_ids(min_age, max_age, user)
+        store_candidate_ids(user.id, min_age, max_age, pool_versions, ids)
+    return CustomUser.objects.filter(id_in(ids)).only(*PROFILE_FIELDS)
@@ -0,0 +1,195 @@
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from ..models import CustomUser, MatchingCriteria, MatchSuggestion, MaterializedSuggestion, PoolChange
+from .batch_matching import load_declined_ids
+from .ranking import load_candidate_columns, score_candidates, top_k
+
+
+def mark_pool_changed(*ages):
+    """
+    Users joined the Unmatched pool (or changed their criteria) at these ages: every
+    materialized list whose range covers one of them may be missing a candidate.
+    Recorded as PoolChange rows, a single INSERT, rather than by touching those lists here.
+    """
+    if settings.MATCHING_MATERIALIZED_SUGGESTIONS:
+        PoolChange.objects.bulk_create(PoolChange(age=age) for age in set(ages) if age is not None)
+
+
+def mark_stale(*user_ids):
+    """Something only these users' own lists depend on changed (their criteria, a decline)."""
+    if settings.MATCHING_MATERIALIZED_SUGGESTIONS:
+        MaterializedSuggestion.objects.filter(user_id__in=user_ids, stale=False).update(stale=True)
+
+
+def mark_all_stale():
+    """Every list needs recomputing, e.g. after a bulk import."""
+    MaterializedSuggestion.objects.filter(stale=False).update(stale=True)
+
+
+def materialized_candidate_ids(user_id, min_age, max_age):
+    """
+    The candidate ids stored for ``user_id`` if they were computed for
+    ``[min_age, max_age]``, else None. Stale lists are still returned: callers re-check
+    every id against the live pool, so staleness only means recent joiners are missing.
+    """
+    if not settings.MATCHING_MATERIALIZED_SUGGESTIONS:
+        return None
+    return MaterializedSuggestion.objects.filter(
+        user_id=user_id, min_age=min_age, max_age=max_age
+    ).values_list('candidate_ids', flat=True).first()
+
+
+def load_pool():
+    """The Unmatched pool as ranking columns (see load_candidate_columns), sorted by age."""
+    return load_candidate_columns(CustomUser.objects.filter(
+        id__in=MatchSuggestion.objects.filter(state='Unmatched').values('user1_id'), age__isnull=False
+    ).order_by('age', 'id'))
+
+
+def ranked_candidate_ids(pool, user_id, min_age, max_age, user_age, declined, k):
+    """
+    The ``k`` best candidate ids for one user from ``load_pool`` columns: the age range is
+    two binary searches, then self, ``declined`` and candidates whose own criteria reject
+    ``user_age`` are masked out before scoring. Same candidates as ``candidate_ids``.
+    """
+    start, end = np.searchsorted(pool['age'], min_age, 'left'), np.searchsorted(pool['age'], max_age, 'right')
+    columns = {name: column[start:end] for name, column in pool.items()}
+    keep = columns['id'] != user_id
+    if declined:
+        keep &= ~np.isin(columns['id'], np.fromiter(declined, dtype=np.int64, count=len(declined)))
+    if user_age is not None:
+        keep &= np.isnan(columns['min_age']) | (columns['min_age'] <= user_age)
+        keep &= np.isnan(columns['max_age']) | (columns['max_age'] >= user_age)
+    columns = {name: column[keep] for name, column in columns.items()}
+    if not columns['id'].size:
+        return []
+    return top_k(columns['id'], score_candidates(columns, user_age), k)
+
+
+def _age_runs(ages):
+    """Sorted distinct ``ages`` collapsed into ``(first, last)`` runs of consecutive values."""
+    runs = []
+    for age in sorted(set(ages)):
+        if runs and runs[-1][1] == age - 1:
+            runs[-1][1] = age
+        else:
+            runs.append([age, age])
+    return runs
+
+
+class SuggestionRefresher:
+    """
+    Keeps MaterializedSuggestion up to date. Each ``run`` is one incremental pass:
+
+    * add a (stale) row for every user with a MatchSuggestion and complete criteria that
+      has none, and delete the rows of users who have left the pool for good
+    * consume the PoolChange log, marking stale the fresh rows whose range covers a
+      changed age
+    * claim stale rows ``batch_size`` at a time with SKIP LOCKED (so several refreshers
+      can share the work) and recompute them against the pool, read once per pass
+
+    A row is marked fresh when claimed, before it is recomputed, so a change that lands
+    meanwhile marks it stale again for the next pass instead of being lost. If
+    recomputing a claimed batch fails, its rows are marked stale again before the error
+    propagates, so they are not left fresh with their old lists.
+    """
+
+    def __init__(self, batch_size=None, candidates=None):
+        self.batch_size = batch_size or settings.MATCHING_MATERIALIZED_BATCH_SIZE
+        self.candidates = candidates or settings.MATCHING_MATERIALIZED_CANDIDATES
+        self.created = self.deleted = self.marked = self.refreshed = 0
+
+    def run(self):
+        """One pass; returns how many rows were recomputed."""
+        refreshed = self.refreshed
+        self.create_missing_rows()
+        self.delete_departed_rows()
+        self.apply_pool_changes()
+        pool = None
+        while batch := self.claim_stale():
+            try:
+                if pool is None:
+                    pool = load_pool()
+                self.refresh(batch, pool)
+            except BaseException:
+                self.release(batch)
+                raise
+        return self.refreshed - refreshed
+
+    def create_missing_rows(self):
+        missing = MatchingCriteria.objects.filter(
+            Exists(MatchSuggestion.objects.filter(user1_id=OuterRef('user_id'))),
+            min_age__isnull=False, max_age__isnull=False,
+        ).exclude(
+            Exists(MaterializedSuggestion.objects.filter(user_id=OuterRef('user_id')))
+        ).values_list('user_id', flat=True)
+        created = MaterializedSuggestion.objects.bulk_create(
+            [MaterializedSuggestion(user_id=user_id) for user_id in missing],
+            batch_size=self.batch_size, ignore_conflicts=True,
+        )
+        self.created += len(created)
+
+    def delete_departed_rows(self):
+        deleted, _ = MaterializedSuggestion.objects.exclude(
+            Exists(MatchSuggestion.objects.filter(user1_id=OuterRef('user_id')))
+        ).delete()
+        self.deleted += deleted
+
+    def apply_pool_changes(self):
+        # One DELETE ... RETURNING, so a change committed while it runs is left for the next pass.
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {connection.ops.quote_name(PoolChange._meta.db_table)} RETURNING age')
+            ages = [age for age, in cursor.fetchall()]
+        if not ages:
+            return
+        covers = Q()
+        for first, last in _age_runs(ages):
+            covers |= Q(min_age__lte=last, max_age__gte=first)
+        self.marked += MaterializedSuggestion.objects.filter(covers, stale=False).update(stale=True)
+
+    @transaction.atomic
+    def claim_stale(self):
+        """Up to ``batch_size`` stale rows as ``(user_id, min_age, max_age, user_age)``, now marked fresh."""
+        batch = list(MaterializedSuggestion.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+            stale=True, user__matching_criteria__min_age__isnull=False, user__matching_criteria__max_age__isnull=False,
+        ).values_list(
+            'user_id', 'user__matching_criteria__min_age', 'user__matching_criteria__max_age', 'user__age'
+        )[:self.batch_size])
+        MaterializedSuggestion.objects.filter(user_id__in=[row[0] for row in batch]).update(stale=False)
+        return batch
+
+    def release(self, batch):
+        """Mark a claimed batch stale again, for a later pass to recompute."""
+        MaterializedSuggestion.objects.filter(user_id__in=[row[0] for row in batch], stale=False).update(stale=True)
+
+    def refresh(self, batch, pool):
+        declined = load_declined_ids([row[0] for row in batch])
+        lists = [
+            ranked_candidate_ids(pool, user_id, min_age, max_age, user_age, declined.get(user_id, ()), self.candidates)
+            for user_id, min_age, max_age, user_age in batch
+        ]
+        write_lists([row[0] for row in batch], [row[1] for row in batch], [row[2] for row in batch], lists)
+        self.refreshed += len(batch)
+
+
+def write_lists(user_ids, min_ages, max_ages, lists):
+    """
+    Store freshly computed candidate id lists in one UPDATE joined to the unnested
+    arrays. Each list is sent as an array literal, since lists of different lengths do
+    not fit one two-dimensional array. ``bulk_update`` builds a CASE per column and row
+    instead, which costs more than computing the lists.
+    """
+    table = connection.ops.quote_name(MaterializedSuggestion._meta.db_table)
+    literals = ['{' + ','.join(map(str, ids)) + '}' for ids in lists]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {table} SET min_age = v.min_age, max_age = v.max_age, candidate_ids = v.candidate_ids::bigint[], '
+            f'refreshed_at = %s '
+            f'FROM unnest(%s::bigint[], %s::integer[], %s::integer[], %s::text[]) '
+            f'AS v(user_id, min_age, max_age, candidate_ids) WHERE {table}.user_id = v.user_id',
+            [timezone.now(), user_ids, min_ages, max_ages, literals],
+        )
@@ -0,0 +1,106 @@
+import json
+import queue
+import sys
+import urllib.request
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import MatchEvent
+
+
+def serialize_event(event):
+    return {
+        'id': event.id,
+        'type': event.event_type,
+        'recipients': event.recipients,
+        'data': event.payload,
+        'created_at': event.created_at.isoformat(),
+    }
+
+
+class LogFileSink:
+    """Appends each event as a JSON line to MATCHING_OUTBOX_LOG_PATH, or to stdout when it is empty."""
+
+    def __init__(self, path=None):
+        self.path = path or settings.MATCHING_OUTBOX_LOG_PATH
+
+    def send(self, events):
+        if not self.path:
+            sys.stdout.writelines(json.dumps(event) + '\n' for event in events)
+            sys.stdout.flush()
+            return
+        with open(self.path, 'a') as log:
+            log.writelines(json.dumps(event) + '\n' for event in events)
+
+
+# Consumers running in the dispatcher's process read events from here.
+local_queue = queue.Queue()
+
+
+class LocalQueueSink:
+    """Puts each event on ``local_queue``."""
+
+    def __init__(self, target=None):
+        self.queue = local_queue if target is None else target
+
+    def send(self, events):
+        for event in events:
+            self.queue.put(event)
+
+
+class WebhookSink:
+    """
+    POSTs each batch as ``{"events": [...]}`` to MATCHING_OUTBOX_WEBHOOK_URL. Any
+    error, including a non-2xx response, fails the batch so it is retried.
+    """
+
+    def __init__(self, url=None, timeout=10):
+        self.url = url or settings.MATCHING_OUTBOX_WEBHOOK_URL
+        self.timeout = timeout
+
+    def send(self, events):
+        request = urllib.request.Request(self.url, data=json.dumps({'events': events}).encode(),
+                                         headers={'Content-Type': 'application/json'}, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+SINKS = {
+    'log': LogFileSink,
+    'queue': LocalQueueSink,
+    'webhook': WebhookSink,
+}
+
+
+@transaction.atomic
+def dispatch_batch(sink, batch_size):
+    """
+    Hand the oldest ``batch_size`` undispatched events to ``sink`` and mark them
+    dispatched. Returns how many were sent.
+
+    Rows are claimed with SKIP LOCKED, so several dispatchers can drain the outbox at
+    once. Events then stay ordered within a batch but not across dispatchers. If the
+    sink raises, the transaction rolls back and the batch is retried on the next run,
+    so sinks see each event at least once.
+    """
+    events = list(MatchEvent.objects.select_for_update(skip_locked=True).filter(
+        dispatched_at__isnull=True
+    ).order_by('id')[:batch_size])
+    if not events:
+        return 0
+    sink.send([serialize_event(event) for event in events])
+    MatchEvent.objects.filter(id__in=[event.id for event in events]).update(dispatched_at=timezone.now())
+    return len(events)
+
+
+def dispatch_outbox(sink, batch_size=None):
+    """Dispatch batches until the outbox is drained. Returns how many events were sent."""
+    batch_size = batch_size or settings.MATCHING_OUTBOX_BATCH_SIZE
+    total = 0
+    while True:
+        sent = dispatch_batch(sink, batch_size)
+        total += sent
+        if sent < batch_size:
+            return total
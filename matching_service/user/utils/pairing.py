@@ -0,0 +1,137 @@
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from ..models import MatchingRequest, MatchSuggestion
+from .batch_matching import load_declined_ids
+from .candidate_cache import invalidate_candidate_pool
+from .candidate_pool import accepts_age, candidate_pool
+from .events import REQUEST_RECEIVED, publish_match_events
+
+# How many compatible partners each user keeps in the graph, and how many of the
+# following (equal or older) pool members are inspected to find them.
+DEFAULT_NEIGHBORS = 5
+DEFAULT_WINDOW = 200
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def load_pool():
+    """Every Unmatched user as ``(age, user_id, min_age, max_age)``, sorted by age then id (one query)."""
+    return list(MatchSuggestion.objects.filter(
+        state='Unmatched', user1__isnull=False, age__isnull=False
+    ).order_by('age', 'user1_id').values_list(
+        'age', 'user1_id', 'user1__matching_criteria__min_age', 'user1__matching_criteria__max_age'
+    ))
+
+
+def compatible_edges(pool, declined, neighbors=DEFAULT_NEIGHBORS, window=DEFAULT_WINDOW):
+    """
+    Edges ``(age_gap, user_id, other_id)`` of the compatibility graph over ``pool``.
+
+    Two users are compatible when each one's MatchingCriteria accepts the other's age
+    and neither declined the other. Because ``pool`` is sorted by age, each user only
+    looks forward at the next ``window`` entries and keeps the first ``neighbors``
+    compatible ones, which are also its closest in age. Pairs with a younger partner
+    come from that partner's own forward scan. This keeps the graph at most
+    ``neighbors * len(pool)`` edges instead of quadratic.
+    """
+    edges = []
+    for index, (age, user_id, min_age, max_age) in enumerate(pool):
+        excluded = declined.get(user_id, ())
+        found = 0
+        for other_age, other_id, other_min, other_max in pool[index + 1:index + 1 + window]:
+            if max_age is not None and other_age > max_age:
+                break
+            if (other_id not in excluded and accepts_age((min_age, max_age), other_age)
+                    and accepts_age((other_min, other_max), age)):
+                edges.append((other_age - age, user_id, other_id))
+                found += 1
+                if found == neighbors:
+                    break
+    return edges
+
+
+def greedy_pairing(pool, declined, neighbors=DEFAULT_NEIGHBORS, window=DEFAULT_WINDOW):
+    """
+    A global pairing of ``pool`` as ``(user_id, other_id)`` pairs, each user in at most one.
+
+    Greedy maximum-weight matching, with closer ages weighing more. Edges are taken
+    in ascending age gap (ties by user ids, so runs are deterministic) whenever both ends
+    are still free.
+    """
+    edges = compatible_edges(pool, declined, neighbors=neighbors, window=window)
+    edges.sort()
+    paired = set()
+    pairs = []
+    for gap, user_id, other_id in edges:
+        if user_id in paired or other_id in paired:
+            continue
+        paired.add(user_id)
+        paired.add(other_id)
+        pairs.append((user_id, other_id))
+    return pairs
+
+
+@transaction.atomic
+def apply_pairs(pairs):
+    """
+    Write ``pairs`` as Pending MatchingRequests (first user is the sender) and Pending
+    MatchSuggestions, the same state the send-request view leaves behind. Returns the
+    pairs that were written.
+
+    Suggestion rows are locked with SKIP LOCKED so live requests are never blocked; a
+    pair is dropped if either user is locked, is no longer Unmatched, or the sender
+    already has a request that is not Declined.
+    """
+    user_ids = [user_id for pair in pairs for user_id in pair]
+    available = dict(MatchSuggestion.objects.select_for_update(skip_locked=True).filter(
+        user1_id__in=user_ids, state='Unmatched'
+    ).order_by('user1_id').values_list('user1_id', 'age'))
+    existing = dict(MatchingRequest.objects.filter(
+        sender_id__in=[sender_id for sender_id, receiver_id in pairs]
+    ).values_list('sender_id', 'state'))
+    pairs = [(sender_id, receiver_id) for sender_id, receiver_id in pairs
+             if sender_id in available and receiver_id in available
+             and existing.get(sender_id, 'Declined') == 'Declined']
+    if not pairs:
+        return []
+
+    senders = [sender_id for sender_id, receiver_id in pairs]
+    receivers = [receiver_id for sender_id, receiver_id in pairs]
+    # A sender's Declined request is replaced rather than rewritten pair by pair, so the whole
+    # batch is one delete, one insert and one update per side.
+    MatchingRequest.objects.filter(sender_id__in=senders, state='Declined').delete()
+    MatchingRequest.objects.bulk_create(
+        MatchingRequest(sender_id=sender_id, receiver_id=receiver_id, state='Pending')
+        for sender_id, receiver_id in pairs
+    )
+    sent = MatchingRequest.objects.filter(state='Pending')
+    MatchSuggestion.objects.filter(user1_id__in=senders, state='Unmatched').update(
+        user2_id=Subquery(sent.filter(sender_id=OuterRef('user1_id')).values('receiver_id')[:1]),
+        state='Pending'
+    )
+    MatchSuggestion.objects.filter(user1_id__in=receivers, state='Unmatched').update(
+        user2_id=Subquery(sent.filter(receiver_id=OuterRef('user1_id')).values('sender_id')[:1]),
+        state='Pending'
+    )
+
+    transaction.on_commit(lambda: candidate_pool.discard(*senders, *receivers))
+    invalidate_candidate_pool(*(available[user_id] for user_id in senders + receivers))
+    publish_match_events((REQUEST_RECEIVED, [receiver_id], {'sender': sender_id}) for sender_id, receiver_id in pairs)
+    return pairs
+
+
+def run_pairing(neighbors=DEFAULT_NEIGHBORS, window=DEFAULT_WINDOW, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """
+    Pair the whole Unmatched pool in one run: read the pool and every decline (two
+    queries), compute a greedy pairing in memory and write it in ``batch_size``
+    transactions. Returns ``(pool, proposed pairs, written pairs)``.
+    """
+    pool = load_pool()
+    declined = load_declined_ids()
+    pairs = greedy_pairing(pool, declined, neighbors=neighbors, window=window)
+    written = []
+    if not dry_run:
+        for start in range(0, len(pairs), batch_size):
+            written.extend(apply_pairs(pairs[start:start + batch_size]))
+    return pool, pairs, written
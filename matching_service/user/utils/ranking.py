@@ -0,0 +1,85 @@
+import numpy as np
+
+from ..models import CustomUser
+
+# Relative weight of each signal in a candidate's score; every signal is scaled to [0, 1].
+MUTUAL_FIT_WEIGHT = 0.5
+AGE_DISTANCE_WEIGHT = 0.3
+RECENCY_WEIGHT = 0.2
+
+# Age gap (in years) at which the age-distance signal reaches zero.
+MAX_AGE_GAP = 20.0
+
+COLUMNS = ('id', 'age', 'date_joined', 'matching_criteria__min_age', 'matching_criteria__max_age')
+
+
+def load_candidate_columns(queryset):
+    """The ranking inputs for ``queryset`` as NumPy columns (one query); missing values are NaN."""
+    rows = list(queryset.values_list(*COLUMNS))
+    count = len(rows)
+
+    def column(index, dtype=np.float64, convert=None):
+        values = (row[index] for row in rows)
+        if convert is not None:
+            values = map(convert, values)
+        return np.fromiter((np.nan if value is None else value for value in values), dtype=dtype, count=count)
+
+    return {
+        'id': np.fromiter((row[0] for row in rows), dtype=np.int64, count=count),
+        'age': column(1),
+        'joined': column(2, convert=lambda joined: joined.timestamp()),
+        'min_age': column(3),
+        'max_age': column(4),
+    }
+
+
+def score_candidates(columns, user_age):
+    """
+    Score every candidate in one vectorized pass:
+
+    * mutual fit: 1 when the candidate's own MatchingCriteria accepts ``user_age``,
+      0 when it rejects it, 0.5 when either side is unknown
+    * age distance: 1 for the same age, falling linearly to 0 at MAX_AGE_GAP years
+    * recency: newest join date 1, oldest 0
+    """
+    min_age, max_age, age = columns['min_age'], columns['max_age'], columns['age']
+    if user_age is None:
+        mutual_fit = np.full(age.shape, 0.5)
+        age_fit = np.zeros(age.shape)
+    else:
+        known = ~(np.isnan(min_age) | np.isnan(max_age))
+        accepts = (min_age <= user_age) & (user_age <= max_age)
+        mutual_fit = np.where(known, accepts.astype(np.float64), 0.5)
+        age_fit = np.nan_to_num(np.clip(1.0 - np.abs(age - user_age) / MAX_AGE_GAP, 0.0, 1.0))
+
+    joined = columns['joined']
+    span = joined.max() - joined.min() if joined.size else 0.0
+    recency = (joined - joined.min()) / span if span > 0 else np.ones(joined.shape)
+
+    return MUTUAL_FIT_WEIGHT * mutual_fit + AGE_DISTANCE_WEIGHT * age_fit + RECENCY_WEIGHT * recency
+
+
+def top_k(ids, scores, k):
+    """The ``k`` best ids, best first (ties broken by id), via argpartition rather than a full sort."""
+    if k < len(ids):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(ids))
+    order = np.lexsort((ids[candidates], -scores[candidates]))
+    return ids[candidates[order]].tolist()
+
+
+def rank_candidates(queryset, user, k):
+    """Ids of the ``k`` best-scoring users in ``queryset`` for ``user``, best first."""
+    columns = load_candidate_columns(queryset)
+    if not columns['id'].size or k <= 0:
+        return []
+    scores = score_candidates(columns, user.age)
+    return top_k(columns['id'], scores, k)
+
+
+def ranked_profiles(queryset, user, k, fields):
+    """``queryset.values(*fields)`` rows for the top ``k`` candidates, in rank order."""
+    ranked_ids = rank_candidates(queryset, user, k)
+    rows = {row['pk']: row for row in CustomUser.objects.filter(id__in=ranked_ids).values(*fields)}
+    return [rows[user_id] for user_id in ranked_ids if user_id in rows]
@@ -1,19 +1,75 @@
+import functools
+
+from django.conf import settings
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Case, Value, When
+from django.http import HttpResponse
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
+from rest_framework.authtoken.serializers import AuthTokenSerializer
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.generics import RetrieveUpdateAPIView, ListAPIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
-from .models import MatchUsers, CustomUser, MatchingCriteria, MatchSuggestion, MatchingRequest
+from matching_service.db.backends.pooled_postgresql.base import pool_stats
+
+from .authentication import issue_token, user_cache
+from .instrumentation import endpoint_metrics
+from .models import MatchUsers, CustomUser, MatchSuggestion, MatchingRequest
+from .pagination import ProfileCursorPagination
 from .serializers import UserProfileSerializer, AgeRangeSerializer
 
+from .utils.candidate_cache import invalidate_candidate_pool
+from .utils.candidate_pool import candidate_pool
+from .utils.events import MATCHED, REQUEST_ACCEPTED, REQUEST_DECLINED, REQUEST_RECEIVED, \
+    publish_match_event, publish_match_events
+from .utils.locking import MatchStateConflict, lock_match_suggestions
+from .utils.match_state import load_match_state
+from .utils.materialized import mark_pool_changed
+from .utils.ranking import ranked_profiles
 from .utils.matching_algo import matching_algorithm, add_to_declined_matches, \
-    create_or_update_matching_criteria
+    create_or_update_matching_criteria, create_match_suggestion, sync_match_suggestion_profile
+
+
+def possible_matches_page(request, queryset, view=None):
+    """
+    One page of ``queryset`` serialized with UserProfileSerializer, plus cursor links.
+    ``?ordering=score`` returns the top page_size candidates ranked for the user instead
+    (a single page, so both links are None).
+    """
+    paginator = ProfileCursorPagination()
+    fields = UserProfileSerializer.Meta.fields
+    if request.query_params.get('ordering') == 'score':
+        page = ranked_profiles(queryset, request.user, paginator.get_page_size(request), fields)
+        links = {'next': None, 'previous': None}
+    else:
+        page = paginator.paginate_queryset(queryset.values(*fields), request, view=view)
+        links = paginator.get_links()
+    return UserProfileSerializer(page, many=True).data, links
+
+
+class SignedTokenView(APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    serializer_class = AuthTokenSerializer
+
+    @swagger_auto_schema(request_body=AuthTokenSerializer)
+    def post(self, request, *args, **kwargs):
+        serializer = AuthTokenSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        token = issue_token(serializer.validated_data['user'])
+        return Response({'token': token, 'expires_in': settings.MATCHING_AUTH_TOKEN_MAX_AGE}, status=status.HTTP_200_OK)
+
+
+@swagger_auto_schema(method='get', auto_schema=None)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    """Per-endpoint request, query and timing totals for Prometheus to scrape."""
+    return HttpResponse(endpoint_metrics.render(pool_stats()), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 class UserProfileView(RetrieveUpdateAPIView):
@@ -21,16 +77,23 @@ class UserProfileView(RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated, ]
 
     def get_object(self):
-        return self.request.user
+        if self.request.method in SAFE_METHODS:
+            return self.request.user
+        # request.user may be a cached snapshot; saving it would write back stale columns.
+        return CustomUser.objects.get(pk=self.request.user.pk)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        previous_age = serializer.instance.age
+        user = serializer.save()
+        sync_match_suggestion_profile(user, previous_age)
+        transaction.on_commit(lambda: user_cache.evict(user.pk))
 
 
 class GetAMatch(APIView):
     permission_classes = [IsAuthenticated]
     serializer_class = AgeRangeSerializer
 
-    def is_user_in_match_suggestion(self, user):
-        return MatchSuggestion.objects.filter(Q(user1=user)).exists()
-
     @swagger_auto_schema(
         request_body=AgeRangeSerializer,
         responses={200: UserProfileSerializer(many=True)}
@@ -38,51 +101,50 @@ class GetAMatch(APIView):
     @transaction.atomic
     def post(self, request, *args, **kwargs):
         user = request.user
-        matched_users = MatchUsers.objects.filter(Q(sender=user) | Q(receiver=user)).exists()
-        if matched_users:
+        state = load_match_state(user)
+        state.apply_profile(user)
+        if state.matched:
             return Response({'status': "Matched"}, status=status.HTTP_201_CREATED)
         serializer = AgeRangeSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         min_age = serializer.validated_data.get("min_age")
         max_age = serializer.validated_data.get("max_age")
-        create_or_update_matching_criteria(user, min_age, max_age)
+        create_or_update_matching_criteria(user, min_age, max_age, state=state)
         queryset = matching_algorithm(min_age, max_age, user)
-        matches_serializer = UserProfileSerializer(queryset, many=True)
-        if self.is_user_in_match_suggestion(user=user):
-            user_match = MatchSuggestion.objects.filter(Q(user1=user)).first()
-            return Response({'Status': user_match.state, 'possible_matches': matches_serializer.data},
+        possible_matches, links = possible_matches_page(request, queryset, view=self)
+        if state.suggestion_state is not None:
+            return Response({'Status': state.suggestion_state, 'possible_matches': possible_matches, **links},
                             status=status.HTTP_201_CREATED)
         else:
-            initialize_match = MatchSuggestion.objects.create(user1=user)
-            initialize_match.save()
-            return Response({'possible_matches': matches_serializer.data}, status=status.HTTP_201_CREATED)
+            create_match_suggestion(user)
+            return Response({'possible_matches': possible_matches, **links}, status=status.HTTP_201_CREATED)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_match_status(request):
-    user = request.user
-    is_matched = MatchUsers.objects.filter(Q(sender=user) | Q(receiver=user)).exists()
-    if is_matched:
+    state = load_match_state(request.user)
+    state.apply_profile(request.user)
+    if state.matched:
         return Response({"status": "Matched", "detail": "You are currently Matched"}, status=status.HTTP_200_OK)
-    try:
-        match = MatchSuggestion.objects.get(Q(user1=user))
-        user_status = match.state
-    except MatchSuggestion.DoesNotExist:
+    if state.suggestion_state is None:
         return Response({"detail": "You are currently No Available for Matching"}, status=status.HTTP_200_OK)
-    criteria = MatchingCriteria.objects.get(user=user)
-    queryset = matching_algorithm(criteria.min_age, criteria.max_age, user)
-    serializer = UserProfileSerializer(queryset, many=True)
-    return Response({'status': user_status, 'Possible Matches': serializer.data}, status=status.HTTP_200_OK)
+    if state.criteria is None:
+        # Imported straight into the pool without criteria; get-a-match saves them.
+        return Response({'status': state.suggestion_state, 'Possible Matches': [], 'next': None, 'previous': None},
+                        status=status.HTTP_200_OK)
+    queryset = matching_algorithm(*state.criteria, request.user)
+    possible_matches, links = possible_matches_page(request, queryset)
+    return Response({'status': state.suggestion_state, 'Possible Matches': possible_matches, **links},
+                    status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_match_request_status(request):
-    user = request.user
-    user_request: MatchingRequest = MatchingRequest.objects.filter(sender=user).first()
-    if user_request:
-        return Response({"status": user_request.state}, status=status.HTTP_200_OK)
+    state = load_match_state(request.user)
+    if state.request_state is not None:
+        return Response({"status": state.request_state}, status=status.HTTP_200_OK)
     else:
         return Response({'status': "no request sent to any user"}, status=status.HTTP_200_OK)
 
@@ -91,30 +153,35 @@ class MatchRequestCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
     def create_match_request(self, sender, receiver):
-        matching_request = MatchingRequest.objects.create(
+        return MatchingRequest.objects.create(
             sender=sender,
             receiver=receiver,
             state='Pending'
         )
-        matching_request.save()
-        return matching_request
 
     def update_match_request(self, sender, new_receiver):
-        existing_request: MatchingRequest = MatchingRequest.objects.get(sender=sender)
-        existing_request.receiver = new_receiver
-        existing_request.state = 'Pending'
-        existing_request.save()
-        return existing_request
-
-    def update_suggestion_state(self, sender, receiver):
-        sender_suggestion: MatchSuggestion = MatchSuggestion.objects.get(user1=sender)
-        sender_suggestion.user2 = receiver
-        sender_suggestion.state = 'Pending'
-        sender_suggestion.save()
-        receiver_suggestion: MatchSuggestion = MatchSuggestion.objects.get(user1=receiver)
-        receiver_suggestion.user2 = sender
-        receiver_suggestion.state = 'Pending'
-        receiver_suggestion.save()
+        updated = MatchingRequest.objects.filter(sender=sender, state='Declined').update(
+            receiver=new_receiver,
+            state='Pending'
+        )
+        if updated != 1:
+            raise MatchStateConflict('Your previous match request is no longer declined')
+
+    def update_suggestion_state(self, suggestions, sender, receiver):
+        updated = MatchSuggestion.objects.filter(user1__in=[sender, receiver], state='Unmatched').update(
+            user2=Case(When(user1=sender, then=Value(receiver.id)), default=Value(sender.id)),
+            state='Pending'
+        )
+        if updated != 2:
+            raise MatchStateConflict('Users are no longer available for matching')
+        transaction.on_commit(lambda: candidate_pool.discard(sender.id, receiver.id))
+        invalidate_candidate_pool(*(suggestion.age for suggestion in suggestions.values()))
+
+    def check_users_unmatched(self, suggestions, sender, receiver):
+        for user in (sender, receiver):
+            suggestion = suggestions.get(user.id)
+            if suggestion is None or suggestion.state != 'Unmatched':
+                raise MatchStateConflict(f'{user.username} is not available for matching')
 
     @transaction.atomic()
     def post(self, request, receiver_id, *args, **kwargs):
@@ -123,20 +190,24 @@ class MatchRequestCreateView(APIView):
         if sender.id == receiver_id:
             return Response({'message': 'Sender and receiver cannot be the same user'},
                             status=status.HTTP_400_BAD_REQUEST)
-        user_exists_in_requests = MatchingRequest.objects.filter(sender=sender).exists()
-        if user_exists_in_requests:
-            matching_request = MatchingRequest.objects.get(sender=sender)
-            if matching_request.state == 'Declined':
-                self.update_suggestion_state(sender, receiver)
-                updated_request = self.update_match_request(sender, receiver)
-                state = updated_request.state
-            else:
-                state = matching_request.state
+        suggestions = lock_match_suggestions(sender.id, receiver.id)
+        # Loaded under the locks, which every transition of the sender's request takes first.
+        match_state = load_match_state(sender)
+        if match_state.request_state is not None:
+            state = match_state.request_state
+            if state == 'Declined':
+                self.check_users_unmatched(suggestions, sender, receiver)
+                self.update_suggestion_state(suggestions, sender, receiver)
+                self.update_match_request(sender, receiver)
+                publish_match_event(REQUEST_RECEIVED, [receiver.id], sender=sender.id)
+                state = 'Pending'
             response_data = {'state': state}
             return Response(response_data, status=status.HTTP_201_CREATED)
 
-        self.update_suggestion_state(sender, receiver)
+        self.check_users_unmatched(suggestions, sender, receiver)
+        self.update_suggestion_state(suggestions, sender, receiver)
         match_request = self.create_match_request(sender, receiver)
+        publish_match_event(REQUEST_RECEIVED, [receiver.id], sender=sender.id)
         response_data = {
             'message': 'Matching Request Successfully Sent to User',
             'state': match_request.state,
@@ -147,10 +218,11 @@ class MatchRequestCreateView(APIView):
 class MatchRequestListView(ListAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ProfileCursorPagination
 
     def get_match_requests(self, receiver, state):
         match_request = MatchingRequest.objects.filter(receiver=receiver, state=state).values_list('sender', flat=True)
-        return CustomUser.objects.filter(id__in=match_request)
+        return CustomUser.objects.filter(id__in=match_request).values(*UserProfileSerializer.Meta.fields)
 
     def get_queryset(self):
         receiver = self.request.user
@@ -162,61 +234,59 @@ class MatchRequestListView(ListAPIView):
 class MatchRequestAcceptDeclineView(ModelViewSet):
     permission_classes = [IsAuthenticated]
 
-    def get_sender_request(self, sender):
-        state = 'Pending'
-        match_request = MatchingRequest.objects.get(sender=sender, state=state)
-        return match_request
+    def update_sender_request(self, sender_id, receiver, state):
+        updated = MatchingRequest.objects.filter(sender_id=sender_id, receiver=receiver, state='Pending').update(
+            state=state
+        )
+        if updated != 1:
+            raise MatchStateConflict('There is no pending match request from this user')
 
-    def update_request_to_accepted(self, sender_request: MatchingRequest):
-        sender_request.state = "Accepted"
-        sender_request.save()
+    def update_request_to_accepted(self, sender_id):
         receiver = self.request.user
-        receiver_request = MatchingRequest.objects.filter(receiver=receiver).first()
-        if receiver_request is not None:
-            receiver_request.state = "Accepted"
-            receiver_request.receiver = sender_request.sender
-            receiver_request.save()
-
-    def create_match(self, sender, receiver):
-        MatchUsers.objects.create(sender=sender, receiver=receiver)
-
-    def remove_users_from_suggestions(self, sender, receiver):
-        sender_matching_suggestions = MatchSuggestion.objects.filter(user1=sender)
-        sender_matching_suggestions.delete()
-        receiver_matching_suggestions = MatchSuggestion.objects.filter(user1=receiver)
-        receiver_matching_suggestions.delete()
-
-    def update_request_state(self, sender_request: MatchingRequest, receiver):
-        sender_request.state = 'Declined'
-        sender_request.save()
-
-    def update_match_suggestions(self, sender, receiver):
-        sender_matching_suggestions: MatchSuggestion = MatchSuggestion.objects.get(user1=sender)
-        sender_matching_suggestions.user2 = None
-        sender_matching_suggestions.state = 'Unmatched'
-        sender_matching_suggestions.save()
-        receiver_matching_suggestions: MatchSuggestion = MatchSuggestion.objects.get(user1=receiver)
-        receiver_matching_suggestions.user2 = None
-        receiver_matching_suggestions.state = 'Unmatched'
-        receiver_matching_suggestions.save()
-
+        self.update_sender_request(sender_id, receiver, 'Accepted')
+        MatchingRequest.objects.filter(sender=receiver).update(state='Accepted', receiver_id=sender_id)
+
+    def create_match(self, sender_id, receiver):
+        MatchUsers.objects.create(sender_id=sender_id, receiver=receiver)
+
+    def remove_users_from_suggestions(self, suggestions, sender_id, receiver):
+        MatchSuggestion.objects.filter(user1__in=[sender_id, receiver.id]).delete()
+        transaction.on_commit(lambda: candidate_pool.discard(sender_id, receiver.id))
+        invalidate_candidate_pool(*(suggestion.age for suggestion in suggestions.values()))
+
+    def update_request_state(self, sender_id, receiver):
+        self.update_sender_request(sender_id, receiver, 'Declined')
+
+    def update_match_suggestions(self, suggestions):
+        updated = MatchSuggestion.objects.filter(id__in=[suggestion.id for suggestion in suggestions],
+                                                 state='Pending').update(user2=None, state='Unmatched')
+        if updated != 2:
+            raise MatchStateConflict('Users are no longer waiting on this match request')
+        for suggestion in suggestions:
+            transaction.on_commit(functools.partial(candidate_pool.add, suggestion.user1_id, suggestion.age))
+        invalidate_candidate_pool(*(suggestion.age for suggestion in suggestions))
+        mark_pool_changed(*(suggestion.age for suggestion in suggestions))
 
     @action(detail=True, methods=['post'])
     @transaction.atomic
     def accept(self, request, sender_id):
-        sender = CustomUser.objects.get(id=sender_id)
-        sender_match_request = self.get_sender_request(sender)
-        self.update_request_to_accepted(sender_match_request)
-        self.create_match(sender, request.user)
-        self.remove_users_from_suggestions(sender, request.user)
+        suggestions = lock_match_suggestions(sender_id, request.user.id)
+        self.update_request_to_accepted(sender_id)
+        self.create_match(sender_id, request.user)
+        self.remove_users_from_suggestions(suggestions, sender_id, request.user)
+        publish_match_events([
+            (REQUEST_ACCEPTED, [sender_id], {'receiver': request.user.id}),
+            (MATCHED, [sender_id, request.user.id], {'users': [sender_id, request.user.id]}),
+        ])
         return Response({"message": "Match request Accepted successfully"}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
     @transaction.atomic
     def decline(self, request, sender_id):
         sender = CustomUser.objects.get(id=sender_id)
+        suggestions = lock_match_suggestions(sender_id, request.user.id)
+        self.update_request_state(sender_id, request.user)
         add_to_declined_matches(sender=sender, receiver=request.user)
-        sender_match_request = self.get_sender_request(sender_id)
-        self.update_request_state(sender_match_request, self.request.user)
-        self.update_match_suggestions(sender, request.user)
+        self.update_match_suggestions(suggestions.values())
+        publish_match_event(REQUEST_DECLINED, [sender_id], receiver=request.user.id)
         return Response({"message": "Match request Declined successfully"}, status=status.HTTP_200_OK)